@@ -0,0 +1,276 @@
+"""Continuous archive of the annotated stream in fixed-length, indexed segments.
+
+``VideoArchive`` writes the pipeline's output into Motion JPEG segments of
+``segment_seconds`` (aligned to the wall clock), at most ``fps`` frames per
+second and ``width`` pixels wide. Every MJPEG frame is a keyframe, so
+each segment's ``.idx`` file maps timestamps straight to byte offsets:
+
+  <root>/<YYYY-MM-DD>/<HHMMSS>.mjpeg   concatenated JPEGs
+  <root>/<YYYY-MM-DD>/<HHMMSS>.idx     INDEX_RECORD per frame: unix time,
+                                       byte offset, size (little-endian)
+
+Each segment is also a ``VideoSegment`` row in the detections database, so
+finding the moment a detection started is one indexed query, one binary
+search over the index and one seek - no file is scanned (``read_frames``).
+Retention deletes whole segments, oldest first, past ``retention_hours`` or
+``max_bytes``.
+
+As with ``recorder.py``, the capture loop only hands frames over: encoding,
+writing and retention run on the archive's own thread, and frames are
+dropped rather than queued when it falls behind.
+"""
+import bisect
+import datetime
+import logging
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import cv2
+from sqlmodel import Session, func, select
+
+from database import engine
+from metrics import REGISTRY
+from models import VideoSegment
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.mjpeg'
+INDEX_SUFFIX = '.idx'
+INDEX_RECORD = struct.Struct('<dQI')
+FLUSH_INTERVAL = 1.0  # seconds; bounds how far behind readers of the open segment are
+
+ARCHIVE_BYTES = REGISTRY.gauge('drone_archive_bytes', "Bytes of video kept in the archive")
+ARCHIVE_FRAMES = REGISTRY.counter('drone_archive_frames_total', "Frames written to the archive")
+ARCHIVE_DROPPED_FRAMES = REGISTRY.counter('drone_archive_dropped_frames_total', "Frames skipped because the archive writer was behind")
+ARCHIVE_DELETED_SEGMENTS = REGISTRY.counter('drone_archive_deleted_segments_total', "Segments removed by retention")
+
+
+def read_index(path: Path):
+    """(timestamps, offsets, sizes) of a segment index; a torn last record is ignored"""
+    data = path.read_bytes()
+    count = len(data) // INDEX_RECORD.size
+    records = [INDEX_RECORD.unpack_from(data, i * INDEX_RECORD.size) for i in range(count)]
+    return [r[0] for r in records], [r[1] for r in records], [r[2] for r in records]
+
+
+def find_segments(start: datetime.datetime, end: datetime.datetime, limit: int = 1000):
+    """Segments overlapping [start, end], oldest first"""
+    with Session(engine) as session:
+        # The segment that contains ``start`` began at or before it
+        first = session.exec(
+            select(VideoSegment).where(VideoSegment.start_time <= start)
+            .order_by(VideoSegment.start_time.desc()).limit(1)
+        ).first()
+        later = session.exec(
+            select(VideoSegment).where(VideoSegment.start_time > start, VideoSegment.start_time <= end)
+            .order_by(VideoSegment.start_time).limit(limit)
+        ).all()
+    segments = [first] if first is not None and (first.end_time is None or first.end_time >= start) else []
+    return segments + list(later)
+
+
+def read_frames(root, start: datetime.datetime, end: datetime.datetime):
+    """Yield (unix time, jpeg bytes) of archived frames from ``start`` to ``end``"""
+    root = Path(root)
+    start_ts, end_ts = start.timestamp(), end.timestamp()
+    for segment in find_segments(start, end):
+        path = root / segment.path
+        try:
+            timestamps, offsets, sizes = read_index(path.with_suffix(INDEX_SUFFIX))
+            f = open(path, 'rb')
+        except OSError:
+            continue  # deleted by retention in the meantime
+        with f:
+            # Begin at the last frame at or before start, so the first image is what was on screen
+            first = max(bisect.bisect_right(timestamps, start_ts) - 1, 0)
+            for timestamp, offset, size in zip(timestamps[first:], offsets[first:], sizes[first:]):
+                if timestamp > end_ts:
+                    return
+                f.seek(offset)
+                jpeg = f.read(size)
+                if len(jpeg) < size:
+                    break  # index flushed ahead of the data
+                yield timestamp, jpeg
+
+
+class VideoArchive:
+    """Segmented MJPEG archive fed by the capture loop"""
+
+    def __init__(self, root, segment_seconds: int = 60, fps: float = 10.0, width: Optional[int] = 960,
+                 jpeg_quality: int = 75, retention_hours: float = 72.0, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.segment_seconds = segment_seconds
+        self.frame_interval = 1.0 / fps if fps else 0.0
+        self.width = width
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.retention_seconds = retention_hours * 3600 if retention_hours else None
+        self.max_bytes = max_bytes
+
+        self._frames = queue.Queue(maxsize=4)
+        self._thread = None
+        self._next_frame_at = 0.0
+        # Open segment, only touched by the archive thread
+        self._segment: Optional[VideoSegment] = None
+        self._segment_end = 0.0
+        self._data = None
+        self._index = None
+        self._last_flush = 0.0
+
+    def start(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._close_orphans()
+        self._thread = threading.Thread(target=self._run, name="video-archive", daemon=True)
+        self._thread.start()
+
+    def wants_frame(self) -> bool:
+        """Whether a frame pushed now would be kept rather than decimated away"""
+        return time.time() >= self._next_frame_at
+
+    def push(self, buffer, jpeg: Optional[bytes] = None):
+        """Archive the current frame, a retained ``FrameBuffer`` this takes over.
+
+        ``jpeg`` is the frame already encoded for viewers; it is stored as is
+        unless the frame is wider than the archive's ``width``.
+        """
+        now = time.time()
+        if now < self._next_frame_at:
+            buffer.release()
+            return
+        self._next_frame_at = max(self._next_frame_at + self.frame_interval, now)
+        try:
+            self._frames.put_nowait((now, buffer, jpeg))
+        except queue.Full:
+            ARCHIVE_DROPPED_FRAMES.inc()
+            buffer.release()
+
+    def _run(self):
+        while True:
+            item = self._frames.get()
+            if item is None:
+                break
+            timestamp, buffer, jpeg = item
+            try:
+                if jpeg is None or (self.width and buffer.array.shape[1] > self.width):
+                    jpeg = self._encode(buffer.array)
+                if jpeg is not None:
+                    self._write(timestamp, jpeg)
+            except Exception as e:
+                logger.error(f"Archive write failed: {e}")
+            finally:
+                buffer.release()
+        self._close_segment()
+
+    def _encode(self, frame) -> Optional[bytes]:
+        height, width = frame.shape[:2]
+        if self.width and width > self.width:
+            frame = cv2.resize(frame, (self.width, round(height * self.width / width)), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', frame, self.encode_params)
+        return encoded.tobytes() if ok else None
+
+    def _write(self, timestamp: float, jpeg: bytes):
+        if self._segment is None or timestamp >= self._segment_end:
+            self._close_segment()
+            self._open_segment(timestamp)
+            self._apply_retention()
+        offset = self._data.tell()
+        self._data.write(jpeg)
+        self._index.write(INDEX_RECORD.pack(timestamp, offset, len(jpeg)))
+        self._segment.frames += 1
+        ARCHIVE_FRAMES.inc()
+        ARCHIVE_BYTES.inc(len(jpeg) + INDEX_RECORD.size)
+        if timestamp - self._last_flush >= FLUSH_INTERVAL:
+            # Data before index, so a reader never finds an offset that isn't on disk yet
+            self._data.flush()
+            self._index.flush()
+            self._last_flush = timestamp
+
+    def _open_segment(self, timestamp: float):
+        segment_start = timestamp - timestamp % self.segment_seconds
+        started = datetime.datetime.fromtimestamp(segment_start)
+        relative = Path(started.strftime('%Y-%m-%d')) / (started.strftime('%H%M%S') + SEGMENT_SUFFIX)
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Appending keeps an earlier part of the same slot (e.g. after a camera restart) seekable
+        self._data = open(path, 'ab')
+        self._index = open(path.with_suffix(INDEX_SUFFIX), 'ab')
+        with Session(engine) as session:
+            segment = session.exec(select(VideoSegment).where(VideoSegment.path == str(relative))).first()
+            if segment is None:
+                segment = VideoSegment(path=str(relative), start_time=started)
+            segment.end_time = None
+            session.add(segment)
+            session.commit()
+            session.refresh(segment)
+        self._segment = segment
+        self._segment_end = segment_start + self.segment_seconds
+
+    def _close_segment(self):
+        if self._segment is None:
+            return
+        segment, self._segment = self._segment, None
+        self._data.close()
+        self._index.close()
+        path = self.root / segment.path
+        timestamps, _, _ = read_index(path.with_suffix(INDEX_SUFFIX))
+        with Session(engine) as session:
+            segment = session.merge(segment)
+            segment.frames = len(timestamps)
+            segment.bytes = path.stat().st_size + path.with_suffix(INDEX_SUFFIX).stat().st_size
+            segment.end_time = datetime.datetime.fromtimestamp(timestamps[-1]) if timestamps else segment.start_time
+            session.add(segment)
+            session.commit()
+
+    def _close_orphans(self):
+        """Finish segments left open by a crash, from their index files"""
+        with Session(engine) as session:
+            orphans = session.exec(select(VideoSegment).where(VideoSegment.end_time == None)).all()  # noqa: E711
+            for segment in orphans:
+                path = self.root / segment.path
+                try:
+                    timestamps, _, _ = read_index(path.with_suffix(INDEX_SUFFIX))
+                    segment.bytes = path.stat().st_size + path.with_suffix(INDEX_SUFFIX).stat().st_size
+                except OSError:
+                    session.delete(segment)
+                    continue
+                segment.frames = len(timestamps)
+                segment.end_time = datetime.datetime.fromtimestamp(timestamps[-1]) if timestamps else segment.start_time
+                session.add(segment)
+            session.commit()
+            total = session.exec(select(func.sum(VideoSegment.bytes))).one() or 0
+        ARCHIVE_BYTES.set(total)
+
+    def _apply_retention(self):
+        """Delete the oldest closed segments past the age or size limit"""
+        with Session(engine) as session:
+            closed = session.exec(
+                select(VideoSegment).where(VideoSegment.end_time != None)  # noqa: E711
+                .order_by(VideoSegment.start_time)
+            ).all()
+            total = sum(segment.bytes for segment in closed)
+            cutoff = (datetime.datetime.now() - datetime.timedelta(seconds=self.retention_seconds)
+                      if self.retention_seconds else None)
+            for segment in closed:
+                expired = cutoff is not None and segment.end_time < cutoff
+                over_quota = self.max_bytes is not None and total > self.max_bytes
+                if not expired and not over_quota:
+                    break
+                path = self.root / segment.path
+                path.unlink(missing_ok=True)
+                path.with_suffix(INDEX_SUFFIX).unlink(missing_ok=True)
+                total -= segment.bytes
+                session.delete(segment)
+                ARCHIVE_DELETED_SEGMENTS.inc()
+                logger.info(f"Archive retention removed {segment.path}")
+            session.commit()
+        ARCHIVE_BYTES.set(total + (self._data.tell() if self._data else 0))
+
+    def stop(self):
+        """Write out queued frames and close the open segment"""
+        if self._thread is not None:
+            self._frames.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
@@ -0,0 +1,215 @@
+"""Content-addressed cache of the model in its optimized forms.
+
+``ArtifactCache.resolve(model_path, fmt, imgsz)`` returns a path YOLO can
+load: the source weights for ``source``, otherwise a cached artifact built
+once and reused on every later start:
+
+  fused        the .pt checkpoint with Conv+BN already fused and the
+               optimizer/EMA state stripped, so loading reads less and skips
+               fusion
+  torchscript  TorchScript export
+  onnx         ONNX export (ONNX Runtime memory-maps it on load)
+  openvino     OpenVINO IR export (weights are memory-mapped by the runtime)
+  int8         ONNX export with dynamic INT8 weight quantization
+
+Artifacts live under ``<root>/<weights sha256[:16]>/<fmt>-<imgsz>-<tag>/``
+where the tag hashes the versions of the libraries that produced them. When
+the file at a model path changes its old hash directory is removed, and a
+library upgrade replaces the matching variant. Hashing reuses the stored
+digest while the file's size and mtime are unchanged, so a warm start only
+stats the weights.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMATS = ('source', 'fused', 'torchscript', 'onnx', 'openvino', 'int8')
+INDEX_FILE = 'index.json'
+
+
+def _library_versions(fmt: str) -> dict:
+    """Versions that change what an export produces"""
+    versions = {}
+    for name in ('ultralytics', 'torch') + (('onnxruntime', 'onnx') if fmt == 'int8' else ()):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return versions
+
+
+def _build_fused(source: Path, work_dir: Path, imgsz: int) -> Path:
+    import torch
+    from ultralytics import YOLO
+
+    yolo = YOLO(str(source))
+    yolo.model.fuse()
+    checkpoint = dict(yolo.ckpt or {})
+    # Training state is never used for inference and can be most of the file
+    for key in ('ema', 'optimizer', 'updates'):
+        checkpoint.pop(key, None)
+    checkpoint['model'] = yolo.model
+    target = work_dir / source.name
+    torch.save(checkpoint, target)
+    return target
+
+
+def _build_export(source: Path, work_dir: Path, imgsz: int, fmt: str) -> Path:
+    from ultralytics import YOLO
+
+    # Export next to a private copy so nothing is written beside the source weights
+    local_copy = work_dir / source.name
+    shutil.copy2(source, local_copy)
+    kwargs = {'simplify': True} if fmt == 'onnx' else {}
+    exported = Path(YOLO(str(local_copy)).export(format=fmt, imgsz=imgsz, **kwargs))
+    local_copy.unlink()
+    return exported
+
+
+def _build_int8(source: Path, work_dir: Path, imgsz: int) -> Path:
+    """Export to ONNX and apply dynamic INT8 quantization to the weights"""
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    onnx_path = _build_export(source, work_dir, imgsz, 'onnx')
+    int8_path = work_dir / f"{source.stem}_int8.onnx"
+    quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QUInt8)
+
+    # Keep the ultralytics metadata (task, names, imgsz) so YOLO() can load the result
+    exported, quantized = onnx.load(str(onnx_path)), onnx.load(str(int8_path))
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(exported.metadata_props)
+    onnx.save(quantized, str(int8_path))
+    onnx_path.unlink()
+    return int8_path
+
+
+class ArtifactCache:
+    """Model artifacts keyed by the content hash of the source weights"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+        self.last_resolve_seconds = None
+
+    def _load_index(self) -> dict:
+        try:
+            return json.loads((self.root / INDEX_FILE).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{INDEX_FILE}.tmp"
+        tmp.write_text(json.dumps(index, indent=2))
+        os.replace(tmp, self.root / INDEX_FILE)
+
+    def digest(self, path) -> str:
+        """SHA-256 of the file, recomputed only when its size or mtime changed"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(str(path))
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                return entry['sha256']
+
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    hasher.update(chunk)
+            sha256 = hasher.hexdigest()
+            previous = entry['sha256'] if entry else None
+            index[str(path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+            self._save_index(index)
+
+            # The weights at this path changed: drop artifacts of the old version
+            # unless another model path still refers to them
+            still_used = {e['sha256'] for e in index.values()}
+            if previous and previous != sha256 and previous not in still_used:
+                logger.info(f"Model at {path} changed, removing cached artifacts for {previous[:12]}")
+                shutil.rmtree(self.root / previous[:16], ignore_errors=True)
+            return sha256
+
+    def resolve(self, model_path, fmt: str = 'fused', imgsz: int = 640) -> str:
+        """Path to load for ``model_path`` in format ``fmt``, building it on a miss"""
+        if fmt not in ARTIFACT_FORMATS:
+            raise ValueError(f"Unknown model format '{fmt}', expected one of {ARTIFACT_FORMATS}")
+        if fmt == 'source':
+            return str(model_path)
+
+        started = time.perf_counter()
+        source = Path(model_path)
+        versions = _library_versions(fmt)
+        tag = hashlib.sha256(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:8]
+        variant = f"{fmt}-{imgsz}"
+        model_dir = self.root / self.digest(source)[:16]
+        variant_dir = model_dir / f"{variant}-{tag}"
+
+        artifact = self._lookup(variant_dir)
+        if artifact is not None:
+            self.hits += 1
+        else:
+            artifact = self._build(source, fmt, imgsz, model_dir, variant, variant_dir, versions)
+            self.builds += 1
+        self.last_resolve_seconds = time.perf_counter() - started
+        return str(artifact)
+
+    def _lookup(self, variant_dir: Path) -> Optional[Path]:
+        try:
+            manifest = json.loads((variant_dir / 'manifest.json').read_text())
+        except (OSError, ValueError):
+            return None
+        artifact = variant_dir / manifest['artifact']
+        return artifact if artifact.exists() else None
+
+    def _build(self, source: Path, fmt: str, imgsz: int, model_dir: Path, variant: str,
+               variant_dir: Path, versions: dict) -> Path:
+        logger.info(f"Building {fmt} artifact for {source} (imgsz={imgsz}), this only happens once")
+        model_dir.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory(dir=model_dir, prefix='.build-') as tmp:
+            work_dir = Path(tmp)
+            if fmt == 'fused':
+                built = _build_fused(source, work_dir, imgsz)
+            elif fmt == 'int8':
+                built = _build_int8(source, work_dir, imgsz)
+            else:
+                built = _build_export(source, work_dir, imgsz, fmt)
+
+            staging = work_dir / 'variant'
+            staging.mkdir()
+            shutil.move(str(built), staging / built.name)
+            (staging / 'manifest.json').write_text(json.dumps({
+                'source': str(source.resolve()),
+                'format': fmt,
+                'imgsz': imgsz,
+                'artifact': built.name,
+                'versions': versions,
+                'build_seconds': round(time.perf_counter() - started, 3),
+            }, indent=2))
+
+            # Artifacts from other library versions are stale now
+            for stale in model_dir.glob(f"{variant}-*"):
+                shutil.rmtree(stale, ignore_errors=True)
+            os.replace(staging, variant_dir)
+        return variant_dir / built.name
+
+    def get_stats(self):
+        return {
+            "root": str(self.root),
+            "hits": self.hits,
+            "builds": self.builds,
+            "last_resolve_seconds": self.last_resolve_seconds,
+        }
@@ -0,0 +1,287 @@
+"""Video capture backends for the tracker's input.
+
+``OpenCVCapture`` wraps ``cv2.VideoCapture`` and is what the tracker has
+always used. ``PyAVCapture`` decodes with FFmpeg through PyAV on a
+background thread (with FFmpeg's own frame/slice threading enabled) and
+hands finished BGR frames to the reader through a small queue, so decoding
+the next frame overlaps with detection on the current one.
+
+Both backends share the ``read() -> (ret, frame)`` / ``isOpened()`` /
+``release()`` interface of ``cv2.VideoCapture`` and two modes:
+
+* ``latency``: keep at most ``buffer_size`` frames and drop the oldest when
+  the consumer falls behind, so a live stream never lags behind real time.
+* ``throughput``: never drop; the decoder waits for the consumer. Use this
+  for files, where every frame should be processed.
+
+Without an explicit mode, live sources (cameras, network streams) use
+``latency`` and files use ``throughput``.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Optional, Tuple, Union
+
+import cv2
+
+from metrics import REGISTRY
+
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_BACKENDS = ('opencv', 'pyav')
+CAPTURE_MODES = ('latency', 'throughput')
+
+# FFmpeg options that stop network demuxers from buffering ahead
+LOW_LATENCY_OPTIONS = {'fflags': 'nobuffer', 'flags': 'low_delay'}
+# Socket I/O timeout for network sources, so a camera that stalls without
+# closing the connection ends demuxing instead of blocking it forever
+NETWORK_TIMEOUT_SECONDS = 5.0
+# A reader gives up waiting for the next decoded frame after this long
+READ_TIMEOUT_SECONDS = 10.0
+DROPPED_FRAMES = REGISTRY.counter(
+    'drone_capture_dropped_frames_total', "Decoded frames discarded because the pipeline fell behind")
+
+NETWORK_SCHEMES = ('rtsp://', 'rtmp://', 'http://', 'https://', 'udp://', 'tcp://')
+
+
+def is_network_source(source) -> bool:
+    return isinstance(source, str) and source.lower().startswith(NETWORK_SCHEMES)
+
+
+class CaptureStats:
+    """Frame counters shared by the capture backends"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.frames_decoded = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def as_dict(self):
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "frames_decoded": self.frames_decoded,
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_dropped,
+            "decode_fps": self.frames_decoded / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class OpenCVCapture:
+    """``cv2.VideoCapture`` with the same modes as the PyAV backend"""
+
+    name = 'opencv'
+
+    def __init__(self, source: Union[int, str], mode: str = 'latency', buffer_size: int = 2,
+                 output_size: Optional[Tuple[int, int]] = None):
+        self.source = source
+        self.mode = mode
+        self.output_size = output_size
+        self.stats = CaptureStats()
+        self.cap = cv2.VideoCapture(source)
+        # Decoded frames can land in a caller-provided array unless they get resized
+        self.reads_into = output_size is None
+        if mode == 'latency':
+            # Honoured by V4L2/GStreamer/some FFmpeg builds, ignored elsewhere
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        """Like cv2.VideoCapture.read; a matching ``image`` array is filled in place"""
+        ret, frame = self.cap.read(image) if image is not None and self.reads_into else self.cap.read()
+        if not ret:
+            return False, None
+        if self.output_size is not None:
+            frame = cv2.resize(frame, self.output_size, interpolation=cv2.INTER_AREA)
+        self.stats.frames_decoded += 1
+        self.stats.frames_read += 1
+        return True, frame
+
+    def queue_depth(self) -> int:
+        return 0  # OpenCV keeps its buffer internal
+
+    def release(self):
+        self.cap.release()
+
+    def get_stats(self):
+        return {"backend": self.name, "mode": self.mode, **self.stats.as_dict()}
+
+
+class PyAVCapture:
+    """FFmpeg decode on a background thread, handing BGR frames to the reader"""
+
+    name = 'pyav'
+    reads_into = False  # frames are allocated by the decode thread
+    _END = object()
+
+    def __init__(self, source: str, mode: str = 'latency', buffer_size: int = 2,
+                 output_size: Optional[Tuple[int, int]] = None, decoder_threads: int = 0,
+                 read_timeout: float = READ_TIMEOUT_SECONDS):
+        if not PYAV_AVAILABLE:
+            raise RuntimeError("PyAV is not installed; pip install av or use the 'opencv' capture backend")
+        self.source = source
+        self.mode = mode
+        self.output_size = output_size
+        self.read_timeout = read_timeout
+        self.stats = CaptureStats()
+        self.frames = queue.Queue(maxsize=max(1, buffer_size))
+        self.container = None
+        self.error = None
+        self._stopped = threading.Event()
+        # Set by release() when the decode thread is still inside FFmpeg; it closes the container on exit
+        self._close_on_exit = False
+        self._close_lock = threading.Lock()
+
+        options = dict(LOW_LATENCY_OPTIONS) if mode == 'latency' and is_network_source(source) else {}
+        if isinstance(source, str) and source.lower().startswith('rtsp://'):
+            # Interleaved TCP avoids the smeared frames UDP packet loss causes
+            options['rtsp_transport'] = 'tcp'
+        if is_network_source(source):
+            # Microseconds; read by the rtsp, http and tcp protocols
+            options['timeout'] = str(int(NETWORK_TIMEOUT_SECONDS * 1_000_000))
+        try:
+            self.container = av.open(source, options=options)
+            self.stream = self.container.streams.video[0]
+            # Let FFmpeg decode with frame and slice threads ('AUTO')
+            self.stream.thread_type = 'AUTO'
+            if decoder_threads:
+                self.stream.codec_context.thread_count = decoder_threads
+        except (av.FFmpegError, IndexError) as e:
+            logger.error(f"PyAV could not open {source}: {e}")
+            self.container = None
+            return
+
+        self.thread = threading.Thread(target=self._decode_loop, daemon=True)
+        self.thread.start()
+
+    def isOpened(self) -> bool:
+        return self.container is not None
+
+    def _decode_loop(self):
+        width, height = self.output_size or (None, None)
+        try:
+            for packet_frame in self.container.decode(self.stream):
+                if self._stopped.is_set():
+                    return
+                # Colour conversion and scaling happen in one swscale call
+                frame = packet_frame.to_ndarray(format='bgr24', width=width, height=height)
+                self.stats.frames_decoded += 1
+                self._put(frame)
+        except av.FFmpegError as e:
+            self.error = e
+            logger.error(f"PyAV decode error on {self.source}: {e}")
+        finally:
+            self._put(self._END)
+            with self._close_lock:
+                if self._close_on_exit:
+                    self.container.close()
+                    self.container = None
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            if self.mode == 'latency' and item is not self._END:
+                try:
+                    self.frames.put_nowait(item)
+                    return
+                except queue.Full:
+                    # Drop the oldest frame so the reader always gets the freshest one
+                    try:
+                        self.frames.get_nowait()
+                        self.stats.frames_dropped += 1
+                        DROPPED_FRAMES.inc()
+                    except queue.Empty:
+                        pass
+            else:
+                try:
+                    self.frames.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+    def read(self, image=None):
+        if self.container is None or self._stopped.is_set():
+            return False, None
+        try:
+            item = self.frames.get(timeout=self.read_timeout)
+        except queue.Empty:
+            # Stalled source; the caller (see sources.ReconnectingSource) reopens it
+            logger.warning(f"No frame from {self.source} for {self.read_timeout:.0f}s")
+            return False, None
+        if item is self._END:
+            # Later reads see the end of stream as well
+            self._stopped.set()
+            return False, None
+        self.stats.frames_read += 1
+        return True, item
+
+    def queue_depth(self) -> int:
+        """Decoded frames waiting for the reader"""
+        return self.frames.qsize()
+
+    def release(self):
+        self._stopped.set()
+        if self.container is None:
+            return
+        # Unblock a decoder waiting on a full queue before joining it
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                break
+        # Wake a reader blocked in read()
+        try:
+            self.frames.put_nowait(self._END)
+        except queue.Full:
+            pass
+        self.thread.join(timeout=2)
+        with self._close_lock:
+            if self.thread.is_alive():
+                # Closing the container under a demuxer that is still running crashes FFmpeg
+                logger.warning(f"Decoder for {self.source} still blocked, closing it when it exits")
+                self._close_on_exit = True
+                return
+            container, self.container = self.container, None
+        container.close()
+
+    def get_stats(self):
+        return {"backend": self.name, "mode": self.mode, **self.stats.as_dict()}
+
+
+def open_capture(source: Union[int, str], backend: str = 'opencv', mode: Optional[str] = None,
+                 buffer_size: int = 2, output_size: Optional[Tuple[int, int]] = None):
+    """Open a video source with the requested capture backend.
+
+    Integer sources are local cameras, which always go through OpenCV.
+    """
+    if mode is None:
+        mode = 'latency' if isinstance(source, int) or is_network_source(source) else 'throughput'
+    if backend not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend '{backend}', expected one of {CAPTURE_BACKENDS}")
+    if mode not in CAPTURE_MODES:
+        raise ValueError(f"Unknown capture mode '{mode}', expected one of {CAPTURE_MODES}")
+
+    if backend == 'pyav':
+        if isinstance(source, int):
+            logger.info("Local cameras are read through OpenCV, ignoring the pyav capture backend")
+        elif not PYAV_AVAILABLE:
+            logger.warning("PyAV is not installed, falling back to OpenCV capture")
+        else:
+            return PyAVCapture(source, mode=mode, buffer_size=buffer_size, output_size=output_size)
+    return OpenCVCapture(source, mode=mode, buffer_size=buffer_size, output_size=output_size)
+
+
+def parse_frame_size(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse 'WIDTHxHEIGHT' (e.g. '640x640'); empty means keep the source size"""
+    if not value:
+        return None
+    width, height = value.lower().split('x')
+    return int(width), int(height)
@@ -1,12 +1,10 @@
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 from typing import Generator
 import os
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./drone_tracking.db")
-print(DATABASE_URL)
-for i in range(10):
-    print(i)
 
 
 # Create engine
@@ -16,13 +14,24 @@ else:
     engine = create_engine(DATABASE_URL)
 
 def create_db_and_tables():
-    """Create database tables"""
+    """Create database tables; called once from the app's startup, not at import"""
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """Add nullable columns introduced after a table was created; create_all only creates tables"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
 
 def get_session() -> Generator[Session, None, None]:
     """Get database session"""
     with Session(engine) as session:
         yield session
-
-# Initialize database on import
-create_db_and_tables()
@@ -0,0 +1,164 @@
+"""Cache of raw per-frame detections for re-analysing the same video.
+
+Entries are keyed by the video's SHA-256, the model weights' SHA-256 and
+the settings that change what the model returns (artifact format, input
+size, inference confidence floor). What is stored is every box the model
+returned above that floor, before the confidence threshold and tracking,
+so a re-run of the same file with a different threshold or tracker only
+repeats the cheap part of the pipeline.
+
+Layout is ``<root>/<key[:2]>/<key>/`` with
+
+  boxes.npy    float32 (N, 5) x1, y1, x2, y2, confidence in frame pixels
+  offsets.npy  int64 (frames + 1,) frame i owns boxes[offsets[i]:offsets[i+1]]
+  meta.json    frames, fps, frame size and the key's inputs
+
+Entries are written to a temporary directory and renamed into place, so
+concurrent workers never see half an entry, and are read memory-mapped.
+When the cache outgrows ``max_bytes`` the least recently used entries go.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1  # bump when the stored layout or box semantics change
+
+
+class CachedDetections:
+    """Raw boxes of one video, indexed by frame"""
+
+    def __init__(self, boxes: np.ndarray, offsets: np.ndarray, meta: dict):
+        self.boxes = boxes
+        self.offsets = offsets
+        self.meta = meta
+
+    @property
+    def frames(self) -> int:
+        return len(self.offsets) - 1
+
+    def frame_boxes(self, index: int) -> np.ndarray:
+        return self.boxes[self.offsets[index]:self.offsets[index + 1]]
+
+
+class CacheWriter:
+    """Collects boxes frame by frame and publishes them as one entry"""
+
+    def __init__(self, cache: 'DetectionCache', key: str):
+        self.cache = cache
+        self.key = key
+        self._boxes = []
+        self._counts = []
+
+    def append(self, boxes: np.ndarray):
+        self._boxes.append(np.asarray(boxes, dtype=np.float32).reshape(-1, 5))
+        self._counts.append(len(self._boxes[-1]))
+
+    def commit(self, meta: dict):
+        boxes = np.concatenate(self._boxes) if self._boxes else np.empty((0, 5), dtype=np.float32)
+        offsets = np.zeros(len(self._counts) + 1, dtype=np.int64)
+        np.cumsum(self._counts, out=offsets[1:])
+        self.cache._store(self.key, boxes, offsets, dict(meta, frames=len(self._counts)))
+
+
+class DetectionCache:
+    """Raw detections keyed by (video hash, model hash, inference settings)"""
+
+    def __init__(self, root, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(video_sha256: str, model_sha256: str, settings: dict) -> str:
+        material = json.dumps({
+            'version': CACHE_VERSION,
+            'video': video_sha256,
+            'model': model_sha256,
+            'settings': settings,
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def load(self, key: str) -> Optional[CachedDetections]:
+        entry = self._entry_dir(key)
+        try:
+            meta = json.loads((entry / 'meta.json').read_text())
+            boxes = np.load(entry / 'boxes.npy', mmap_mode='r')
+            offsets = np.load(entry / 'offsets.npy')
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            # Recency for eviction
+            os.utime(entry / 'meta.json')
+        except OSError:
+            pass  # evicted since it was read; the arrays are already open
+        self.hits += 1
+        return CachedDetections(boxes, offsets, meta)
+
+    def writer(self, key: str) -> CacheWriter:
+        return CacheWriter(self, key)
+
+    def _store(self, key: str, boxes: np.ndarray, offsets: np.ndarray, meta: dict):
+        entry = self._entry_dir(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=entry.parent, prefix='.write-') as tmp:
+            staging = Path(tmp) / 'entry'
+            staging.mkdir()
+            np.save(staging / 'boxes.npy', boxes)
+            np.save(staging / 'offsets.npy', offsets)
+            (staging / 'meta.json').write_text(json.dumps(meta, indent=2))
+            try:
+                os.replace(staging, entry)
+            except OSError:
+                # Another worker stored the same key first; its entry is just as good
+                return
+        logger.info(f"Cached {len(boxes)} raw detections over {meta['frames']} frames ({key[:12]})")
+        self._evict()
+
+    def _entries(self):
+        for meta in self.root.glob('*/*/meta.json'):
+            entry = meta.parent
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                yield meta.stat().st_mtime, size, entry
+            except OSError:
+                continue  # removed concurrently
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits ``max_bytes``"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+
+    def get_stats(self):
+        entries = list(self._entries())
+        return {
+            "root": str(self.root),
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,83 @@
+"""Compact binary log of raw per-frame detections, for replaying the tracker.
+
+A log is ``MAGIC``, a length-prefixed JSON header with the settings the
+detections were produced under, then one record per processed frame:
+
+  RECORD         frame index (uint32), wall-clock time (float64),
+                 box count n (uint16), embedding size d (uint16)
+  n x 5 float32  x1, y1, x2, y2, confidence in frame pixels
+  n x d float16  appearance embeddings, d = 0 when none were recorded
+
+Boxes are everything the model returned above its inference floor, not
+just what passed the confidence threshold, so a replay can try any higher
+threshold. All values are little-endian.
+"""
+import json
+import struct
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+MAGIC = b'DRNDLOG1'
+HEADER_LENGTH = struct.Struct('<I')
+RECORD = struct.Struct('<IdHH')
+LOG_SUFFIX = '.dlog'
+
+
+class DetectionLogWriter:
+    """Appends frames to a detection log; not thread-safe, one writer per pipeline"""
+
+    def __init__(self, path, header: dict):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'wb')
+        encoded = json.dumps(dict(header, created=time.time())).encode()
+        self._file.write(MAGIC + HEADER_LENGTH.pack(len(encoded)) + encoded)
+        self.frames = 0
+        self.bytes_written = len(MAGIC) + HEADER_LENGTH.size + len(encoded)
+
+    def write(self, boxes: np.ndarray, embeds: Optional[np.ndarray] = None):
+        boxes = np.ascontiguousarray(boxes, dtype='<f4').reshape(-1, 5)
+        dim = 0
+        if embeds is not None and len(boxes):
+            embeds = np.ascontiguousarray(embeds, dtype='<f2').reshape(len(boxes), -1)
+            dim = embeds.shape[1]
+        self._file.write(RECORD.pack(self.frames, time.time(), len(boxes), dim))
+        self._file.write(boxes.tobytes())
+        if dim:
+            self._file.write(embeds.tobytes())
+        self.frames += 1
+        self.bytes_written += RECORD.size + boxes.nbytes + (embeds.nbytes if dim else 0)
+
+    def close(self):
+        self._file.close()
+
+
+def read_detection_log(path):
+    """(header, frames) of a log; frames are (timestamp, boxes, embeds or None) views into one buffer"""
+    data = Path(path).read_bytes()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a detection log")
+    offset = len(MAGIC)
+    (length,) = HEADER_LENGTH.unpack_from(data, offset)
+    offset += HEADER_LENGTH.size
+    header = json.loads(data[offset:offset + length])
+    offset += length
+
+    frames = []
+    while offset + RECORD.size <= len(data):
+        _, timestamp, count, dim = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        end = offset + count * 5 * 4 + count * dim * 2
+        if end > len(data):
+            break  # truncated by a crash mid-write
+        boxes = np.frombuffer(data, dtype='<f4', count=count * 5, offset=offset).reshape(count, 5)
+        offset += count * 5 * 4
+        embeds = None
+        if dim:
+            embeds = np.frombuffer(data, dtype='<f2', count=count * dim, offset=offset).reshape(count, dim)
+            offset += count * dim * 2
+        frames.append((timestamp, boxes, embeds))
+    return header, frames
@@ -0,0 +1,112 @@
+"""Reference-counted pool of preallocated frame buffers.
+
+The capture loop reads each frame straight into a pooled array (OpenCV's
+``cap.read(image=buf)``) instead of allocating a new one, and the latest
+frame is shared with consumers as read-only views instead of copies. A
+buffer goes back to the pool once the capture loop and every consumer
+holding it have released it, so at 1080p30 the loop stops allocating and
+copying ~6 MB per frame.
+
+Frames the pool didn't provide (the first frame, a resolution change, a
+backend that allocates its own arrays, or an exhausted pool) are wrapped
+and adopted into the pool when they fit, so it fills up on its own.
+"""
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+class FrameBuffer:
+    """A frame array plus the number of holders still using it"""
+    __slots__ = ('array', 'refs', 'pool', 'generation')
+
+    def __init__(self, array: np.ndarray, pool: Optional['FramePool'] = None, generation: int = 0):
+        self.array = array
+        self.refs = 1
+        self.pool = pool
+        self.generation = generation
+
+    def retain(self) -> 'FrameBuffer':
+        if self.pool is not None:
+            with self.pool._lock:
+                self.refs += 1
+        else:
+            self.refs += 1
+        return self
+
+    def release(self):
+        if self.pool is not None:
+            self.pool._release(self)
+        else:
+            self.refs -= 1
+
+    def view(self) -> np.ndarray:
+        """Read-only view for consumers; only valid while they hold a reference"""
+        view = self.array.view()
+        view.flags.writeable = False
+        return view
+
+
+class FramePool:
+    """Fixed number of frame-sized arrays recycled between frames"""
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self.shape = None
+        self.dtype = np.uint8
+        self.generation = 0  # bumped on resolution change; stale buffers are dropped
+        self._lock = threading.Lock()
+        self._free = []
+        self._owned = 0
+
+        # Counters for /tracker/memory
+        self.reuses = 0
+        self.allocations = 0
+        self.misses = 0
+
+    def acquire(self) -> Optional[FrameBuffer]:
+        """A free buffer to read the next frame into, or None if none is available yet"""
+        with self._lock:
+            if self._free:
+                buffer = self._free.pop()
+                buffer.refs = 1
+                self.reuses += 1
+                return buffer
+            if self.shape is not None and self._owned < self.size:
+                self._owned += 1
+                self.allocations += 1
+                return FrameBuffer(np.empty(self.shape, dtype=self.dtype), self, self.generation)
+            self.misses += 1
+            return None
+
+    def wrap(self, array: np.ndarray) -> FrameBuffer:
+        """Track a frame the pool didn't provide, adopting it if it fits"""
+        with self._lock:
+            if array.shape != self.shape or array.dtype != self.dtype:
+                # New resolution: forget the old buffers, they are dropped as they come back
+                self.shape = array.shape
+                self.dtype = array.dtype
+                self.generation += 1
+                self._free.clear()
+                self._owned = 0
+            if self._owned < self.size and array.flags.c_contiguous:
+                self._owned += 1
+                return FrameBuffer(array, self, self.generation)
+        return FrameBuffer(array)
+
+    def _release(self, buffer: FrameBuffer):
+        with self._lock:
+            buffer.refs -= 1
+            if buffer.refs == 0 and buffer.generation == self.generation:
+                self._free.append(buffer)
+
+    def get_stats(self):
+        return {
+            "size": self.size,
+            "shape": list(self.shape) if self.shape else None,
+            "free": len(self._free),
+            "reuses": self.reuses,
+            "allocations": self.allocations,
+            "misses": self.misses,
+        }
@@ -0,0 +1,525 @@
+"""Local job queue and scheduler for uploaded videos.
+
+``JobManager`` runs the detection and tracking pipeline over uploaded files
+in a pool of worker processes (``ProcessPoolExecutor``), so no broker is
+needed and a long video never competes with the API's event loop for the
+GIL. Workers report progress and poll for cancellation through a
+``multiprocessing.Manager`` dict, both started on the first dispatch so an
+idle server pays nothing.
+
+Scheduling: the queue lives in the ``VideoJob`` table, so pending jobs
+survive restarts and jobs interrupted by a restart are queued again. A
+dispatcher thread admits jobs while the running ones fit the CPU budget
+(``cpu_budget`` cores at ``threads_per_job`` each). While the live camera
+runs, ``live_reserve`` cores are taken out of the budget, and workers run
+at a lower OS priority so the camera wins any contention. Among pending
+jobs the highest priority goes first; within a priority the user with the
+fewest running jobs goes first (fair share), then the oldest job. Jobs are
+claimed with a conditional UPDATE, so several API workers can share one
+queue and one budget.
+
+Job states follow Celery's names (PENDING, STARTED, SUCCESS, FAILURE,
+REVOKED) so ``/result/{task_id}`` keeps the shape it had with Celery.
+Results are a summary plus a JSON Lines file with the confirmed tracks of
+every frame.
+
+Raw detections are kept in a ``DetectionCache`` keyed by the upload's
+content hash, the model and the inference settings. Re-analysing the same
+file, e.g. with another confidence threshold or tracker, skips the model
+and only re-runs tracking; DeepSORT still decodes the frames for its
+appearance features, the motion-only tracker doesn't even do that.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update
+from sqlmodel import Session, func, select
+
+from database import engine
+from models import VideoJob
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+PROGRESS_INTERVAL = 0.5  # seconds between progress reports from a worker
+DISPATCH_INTERVAL = 1.0  # seconds between scheduler passes when nothing wakes it
+FINISHED_STATES = ('SUCCESS', 'FAILURE', 'REVOKED')
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job was cancelled"""
+
+
+def _init_worker(nice: int, threads: int):
+    """Lower the worker's priority and cap its compute threads to its share of the budget"""
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    import cv2
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _detection_cache_key(settings: dict, artifacts, video_sha256: Optional[str]) -> Optional[str]:
+    """Cache key for this video under these settings, None when caching is off"""
+    if not settings.get("detection_cache_dir") or not video_sha256:
+        return None
+    if settings["confidence_threshold"] < settings["detection_floor"]:
+        return None  # cached boxes stop at the floor; this job needs the ones below it
+    from detection_cache import DetectionCache
+    try:
+        model_sha256 = artifacts.digest(settings["model_path"])
+    except OSError:
+        return None
+    return DetectionCache.key(video_sha256, model_sha256, {
+        "model_format": settings["model_format"],
+        "input_size": settings["input_size"],
+        "conf_floor": settings["detection_floor"],
+    })
+
+
+def process_video(job_id: str, video_path: str, tracks_path: str, settings: dict, shared,
+                  video_sha256: Optional[str] = None):
+    """Run the pipeline over one file in a worker process and return the summary"""
+    if shared.get(f"cancel:{job_id}"):
+        raise JobCancelled(job_id)  # cancelled after it was handed to this worker
+    import cv2
+    from artifact_cache import ArtifactCache
+    from detection_cache import DetectionCache
+    from tracker import DroneTracker
+
+    artifacts = ArtifactCache(settings["cache_dir"])
+    cache = cached = None
+    key = _detection_cache_key(settings, artifacts, video_sha256)
+    if key:
+        cache = DetectionCache(settings["detection_cache_dir"], settings.get("detection_cache_max_bytes"))
+        cached = cache.load(key)
+
+    model_path = None
+    if cached is None:
+        model_path = settings["model_path"]
+        try:
+            model_path = artifacts.resolve(model_path, settings["model_format"], settings["input_size"])
+        except Exception as e:
+            logger.warning(f"Could not prepare the '{settings['model_format']}' model artifact: {e}")
+
+    # A fresh tracker per job: IDs and track state must not leak between videos.
+    # The inference floor sits below any threshold so the cached boxes serve them all;
+    # uncached, inference runs at the job's own threshold
+    tracker = DroneTracker(
+        model_path,
+        confidence_threshold=settings["confidence_threshold"],
+        inference_kwargs={"conf": settings["detection_floor"] if key else settings["confidence_threshold"]},
+        persist_detections=False,
+        tracker_backend=settings["tracker_backend"],
+        nn_budget=settings["nn_budget"],
+        tracker_params=settings.get("tracker_params"),
+        render_overlay=False,
+        input_size=settings["input_size"],
+    )
+
+    # The motion-only tracker needs nothing but the boxes, DeepSORT needs pixels
+    cap = None
+    if cached is None or settings["tracker_backend"] != 'sort':
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video {os.path.basename(video_path)}")
+    if cached is not None:
+        fps = cached.meta["fps"]
+        total_frames = cached.frames
+    else:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    writer = cache.writer(key) if cache is not None and cached is None else None
+    shared[job_id] = {"frames_done": 0, "total_frames": total_frames}
+
+    started = time.perf_counter()
+    next_report = started + PROGRESS_INTERVAL
+    frames = 0
+    frame_size = (None, None)
+    detection_count = 0
+    track_ids = set()
+    try:
+        with open(tracks_path, 'w') as out:
+            while True:
+                if cached is not None and frames >= cached.frames:
+                    break
+                frame = None
+                if cap is not None:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    frame_size = frame.shape[:2]
+                if cached is not None:
+                    detections, tracks = tracker.process_frame(frame, boxes=cached.frame_boxes(frames))
+                else:
+                    detections, tracks = tracker.process_frame(frame)
+                    if writer is not None:
+                        writer.append(tracker.last_boxes)
+                detection_count += len(detections)
+                confirmed = [
+                    [track.track_id, [round(v, 1) for v in track.to_ltrb()]]
+                    for track in tracks
+                    if track.is_confirmed() and track.time_since_update == 0
+                ]
+                if confirmed:
+                    track_ids.update(track_id for track_id, _ in confirmed)
+                    out.write(json.dumps({
+                        "frame": frames,
+                        "time": round(frames / fps, 3) if fps else None,
+                        "tracks": confirmed,
+                    }) + '\n')
+                frames += 1
+
+                now = time.perf_counter()
+                if now >= next_report:
+                    next_report = now + PROGRESS_INTERVAL
+                    if shared.get(f"cancel:{job_id}"):
+                        raise JobCancelled(job_id)
+                    shared[job_id] = {"frames_done": frames, "total_frames": total_frames}
+    finally:
+        if cap is not None:
+            cap.release()
+
+    # Only a complete pass is worth caching, cancelled jobs raised above
+    if writer is not None:
+        height, width = frame_size
+        writer.commit({"fps": fps, "width": width, "height": height, "video_sha256": video_sha256})
+
+    elapsed = time.perf_counter() - started
+    return {
+        "frames": frames,
+        "video_seconds": round(frames / fps, 3) if fps else None,
+        "processing_seconds": round(elapsed, 3),
+        "processing_fps": round(frames / elapsed, 2) if elapsed else None,
+        "detections": detection_count,
+        "tracks": len(track_ids),
+        "drones": tracker.daily_id_counter,
+        "detection_cache": None if key is None else ("hit" if cached is not None else "miss"),
+    }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobManager:
+    """Persisted queue, CPU-budget scheduler and process pool behind /upload/ and /result/{task_id}"""
+
+    def __init__(self, upload_dir, cpu_budget: int = 1, threads_per_job: int = 1,
+                 live_reserve: Optional[Callable[[], int]] = None, nice: int = 10,
+                 settings: Optional[dict] = None):
+        self.upload_dir = Path(upload_dir)
+        self.results_dir = self.upload_dir / 'results'
+        self.cpu_budget = cpu_budget
+        self.threads_per_job = threads_per_job
+        self.live_reserve = live_reserve or (lambda: 0)
+        self.nice = nice
+        self.settings = settings or {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._futures: Dict[str, object] = {}  # jobs running in this process's pool
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._dispatcher = None
+        self._executor = None
+        self._manager = None
+        self._shared = None
+
+    @property
+    def max_slots(self) -> int:
+        return max(1, self.cpu_budget // self.threads_per_job)
+
+    def slots(self) -> int:
+        """Jobs that fit the budget right now; at least one so the queue never stalls"""
+        available = self.cpu_budget - self.live_reserve()
+        return max(1, min(self.max_slots, available // self.threads_per_job))
+
+    def start(self):
+        """Requeue jobs orphaned by a restart and start the dispatcher"""
+        self._requeue_orphans()
+        self._wake.set()  # first pass right away
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-scheduler", daemon=True)
+        self._dispatcher.start()
+
+    def _requeue_orphans(self):
+        host = socket.gethostname()
+        with Session(engine) as session:
+            for job in session.exec(select(VideoJob).where(VideoJob.state == 'STARTED')).all():
+                owner_host, _, pid = (job.owner or '').rpartition(':')
+                if owner_host == host and pid.isdigit() and _pid_alive(int(pid)) and job.owner != self.owner:
+                    continue  # still running in another API worker
+                logger.info(f"Requeueing job {job.id} interrupted by a restart")
+                job.state, job.owner, job.started_at, job.frames_done = 'PENDING', None, None, 0
+                session.add(job)
+            session.commit()
+
+    def new_upload_path(self, filename: str):
+        """(job id, path) to stream a new upload to"""
+        job_id = str(uuid.uuid4())
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        return job_id, self.upload_dir / f"{job_id}{Path(filename).suffix.lower()}"
+
+    def tracks_path(self, job_id: str) -> Path:
+        return self.results_dir / f"{job_id}.jsonl"
+
+    def submit(self, job_id: str, filename: str, path: Path, user: str = "anonymous",
+               priority: int = 0, video_sha256: Optional[str] = None,
+               confidence_threshold: Optional[float] = None,
+               tracker_backend: Optional[str] = None) -> VideoJob:
+        job = VideoJob(id=job_id, filename=filename, path=str(path), user=user, priority=priority,
+                       video_sha256=video_sha256, confidence_threshold=confidence_threshold,
+                       tracker_backend=tracker_backend)
+        with Session(engine) as session:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+        logger.info(f"Queued job {job_id} for {filename} (user={user}, priority={priority})")
+        self._wake.set()
+        return job
+
+    def _start_pool(self):
+        if self._executor is None:
+            # Spawned, not forked: the parent runs threads (capture, asyncio) and maybe torch
+            context = multiprocessing.get_context('spawn')
+            self._manager = context.Manager()
+            self._shared = self._manager.dict()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_slots, mp_context=context,
+                initializer=_init_worker, initargs=(self.nice, self.threads_per_job))
+            self.results_dir.mkdir(parents=True, exist_ok=True)
+
+    def _dispatch_loop(self):
+        while not self._stopping.is_set():
+            self._wake.wait(DISPATCH_INTERVAL)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                self._sync_running()
+                self._dispatch()
+            except Exception as e:
+                logger.error(f"Job scheduler pass failed: {e}", exc_info=True)
+
+    def _dispatch(self):
+        """Admit pending jobs into the free slots, in priority and fair-share order"""
+        with Session(engine) as session:
+            running = session.exec(select(VideoJob).where(VideoJob.state == 'STARTED')).all()
+            free = self.slots() - len(running)
+            if free <= 0:
+                return
+            pending = session.exec(select(VideoJob).where(VideoJob.state == 'PENDING')).all()
+            running_per_user = Counter(job.user for job in running)
+            while free > 0 and pending:
+                job = min(pending, key=lambda j: (-j.priority, running_per_user[j.user], j.created_at))
+                pending.remove(job)
+                # Conditional claim: another API worker (or a cancel) may have got there first
+                claimed = session.execute(
+                    update(VideoJob)
+                    .where(VideoJob.id == job.id, VideoJob.state == 'PENDING')
+                    .values(state='STARTED', owner=self.owner, started_at=datetime.now())
+                ).rowcount
+                session.commit()
+                if claimed:
+                    running_per_user[job.user] += 1
+                    free -= 1
+                    self._run(job)
+
+    def _run(self, job: VideoJob):
+        job_id = job.id
+        settings = dict(self.settings)
+        if job.confidence_threshold is not None:
+            settings["confidence_threshold"] = job.confidence_threshold
+        if job.tracker_backend:
+            settings["tracker_backend"] = job.tracker_backend
+        with self._lock:
+            self._start_pool()
+            future = self._executor.submit(
+                process_video, job_id, job.path, str(self.tracks_path(job_id)), settings, self._shared,
+                job.video_sha256)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        logger.info(f"Started job {job_id}")
+
+    def _sync_running(self):
+        """Publish progress of this process's jobs and pick up cancels requested via other workers"""
+        with self._lock:
+            job_ids = list(self._futures)
+        if not job_ids:
+            return
+        with Session(engine) as session:
+            for job in session.exec(select(VideoJob).where(VideoJob.id.in_(job_ids))).all():
+                report = self._shared.get(job.id)
+                if report:
+                    job.frames_done, job.total_frames = report["frames_done"], report["total_frames"]
+                    session.add(job)
+                if job.cancel_requested:
+                    self._shared[f"cancel:{job.id}"] = True
+            session.commit()
+
+    def _finish(self, job_id: str, future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        report = self._shared.pop(job_id, None)
+        self._shared.pop(f"cancel:{job_id}", None)
+        with Session(engine) as session:
+            job = session.get(VideoJob, job_id)
+            if report:
+                job.frames_done, job.total_frames = report["frames_done"], report["total_frames"]
+            try:
+                result = future.result()
+                job.state, job.result = 'SUCCESS', json.dumps(result)
+                job.frames_done = result["frames"]
+                logger.info(f"Job {job_id} finished: {result}")
+            except (CancelledError, JobCancelled):
+                if self._stopping.is_set() and not job.cancel_requested:
+                    # Interrupted by shutdown, not by a user: run it again after the restart
+                    job.state, job.owner, job.started_at, job.frames_done = 'PENDING', None, None, 0
+                else:
+                    job.state = 'REVOKED'
+            except Exception as e:
+                job.state, job.error = 'FAILURE', str(e)
+                logger.error(f"Job {job_id} failed: {e}")
+            state = job.state
+            if state in FINISHED_STATES:
+                job.finished_at = datetime.now()
+            session.add(job)
+            session.commit()
+        if state != 'SUCCESS':
+            self.tracks_path(job_id).unlink(missing_ok=True)
+        self._wake.set()
+
+    def get(self, job_id: str) -> Optional[VideoJob]:
+        with Session(engine) as session:
+            return session.get(VideoJob, job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Revoke a pending job outright, or ask a running one to stop at its next progress check"""
+        with Session(engine) as session:
+            revoked = session.execute(
+                update(VideoJob)
+                .where(VideoJob.id == job_id, VideoJob.state == 'PENDING')
+                .values(state='REVOKED', finished_at=datetime.now())
+            ).rowcount
+            if not revoked:
+                # The owning worker forwards this on its next scheduler pass
+                revoked = session.execute(
+                    update(VideoJob)
+                    .where(VideoJob.id == job_id, VideoJob.state == 'STARTED')
+                    .values(cancel_requested=True)
+                ).rowcount
+            session.commit()
+        if job_id in self._futures:
+            self._shared[f"cancel:{job_id}"] = True
+        return bool(revoked)
+
+    def list_jobs(self, user: Optional[str] = None, limit: int = 100):
+        with Session(engine) as session:
+            statement = select(VideoJob).order_by(VideoJob.created_at.desc()).limit(limit)
+            if user:
+                statement = statement.where(VideoJob.user == user)
+            return session.exec(statement).all()
+
+    def describe(self, job: VideoJob) -> dict:
+        """The /result/{task_id} body"""
+        state = job.state
+        frames_done, total_frames = job.frames_done, job.total_frames
+        report = self._shared.get(job.id) if self._shared is not None and job.id in self._futures else None
+        if report:
+            frames_done, total_frames = report["frames_done"], report["total_frames"]
+        progress = None
+        if state == 'STARTED':
+            progress = {"frames_done": frames_done, "total_frames": total_frames}
+            if total_frames:
+                progress["percent"] = round(100.0 * frames_done / total_frames, 1)
+            if job.cancel_requested:
+                state = 'REVOKING'
+        body = {
+            "task_id": job.id,
+            "filename": job.filename,
+            "user": job.user,
+            "priority": job.priority,
+            "confidence_threshold": job.confidence_threshold,
+            "tracker_backend": job.tracker_backend,
+            "state": state,
+            "progress": progress,
+            "result": json.loads(job.result) if job.result else job.error,
+            "created_at": job.created_at.isoformat(),
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+        if state == 'PENDING':
+            body["queue_position"] = self._queue_position(job)
+        return body
+
+    def _queue_position(self, job: VideoJob) -> int:
+        """Pending jobs that would be admitted before this one, ignoring fair share"""
+        with Session(engine) as session:
+            ahead = session.exec(
+                select(func.count()).select_from(VideoJob).where(
+                    VideoJob.state == 'PENDING',
+                    (VideoJob.priority > job.priority)
+                    | ((VideoJob.priority == job.priority) & (VideoJob.created_at < job.created_at))
+                )
+            ).one()
+        return ahead + 1
+
+    def get_stats(self):
+        with Session(engine) as session:
+            counts = dict(session.exec(
+                select(VideoJob.state, func.count()).group_by(VideoJob.state)).all())
+        return {
+            "cpu_budget": self.cpu_budget,
+            "threads_per_job": self.threads_per_job,
+            "live_reserve": self.live_reserve(),
+            "slots": self.slots(),
+            "running_here": len(self._futures),
+            "jobs": counts,
+            "detection_cache": self._detection_cache_stats(),
+        }
+
+    def _detection_cache_stats(self):
+        """Size of the shared detection cache; hits and misses are counted in the workers' results"""
+        if not self.settings.get("detection_cache_dir"):
+            return None
+        from detection_cache import DetectionCache
+        stats = DetectionCache(self.settings["detection_cache_dir"],
+                               self.settings.get("detection_cache_max_bytes")).get_stats()
+        del stats["hits"], stats["misses"]
+        return stats
+
+    def shutdown(self):
+        """Stop dispatching; jobs still running here go back to the queue for the next start"""
+        self._stopping.set()
+        self._wake.set()
+        with self._lock:
+            if self._executor is None:
+                return
+            for job_id in self._futures:
+                self._shared[f"cancel:{job_id}"] = True
+        self._executor.shutdown(wait=True)
+        self._manager.shutdown()
+        self._executor = None
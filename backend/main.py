@@ -1,32 +1,37 @@
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, Query, UploadFile, File, Form, Header
+from fastapi.responses import StreamingResponse, FileResponse, Response, PlainTextResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import Session, select
 import time
 from contextlib import asynccontextmanager
-from sqlmodel import SQLModel, create_engine
-from database import get_session
+from functools import lru_cache
+from database import create_db_and_tables, get_session
 from models import (
     Detection, DetectionResponse, DetectionCreate, 
     CameraStatus, WebSocketMessage
 )
-from tracker import DroneTracker
-import cv2
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY
+from tracing import TRACER, sample_stacks
+from tracker_service import TrackerClient, TrackerServiceError
+from jobs import UPLOAD_EXTENSIONS, JobManager
 import json
 import asyncio
+import hashlib
 import logging
-from datetime import date, datetime
-from typing import List, Optional
+import threading
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, List, Literal, Optional
 import os
 from pathlib import Path
-import numpy as np
+
+if TYPE_CHECKING:
+    # torch, ultralytics and OpenCV load with the model, off the startup path
+    from tracker import DroneTracker
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-DATABASE_URL = "sqlite:///./drone_tracking.db"
-engine = create_engine(DATABASE_URL, echo=True)
 
 # This function will run during startup and shutdown
 @asynccontextmanager
@@ -42,33 +47,32 @@ async def lifespan(app: FastAPI):
     manager = ConnectionManager()
     logger.info("WebSocket Manager initialized.")
 
-    # Initialize Drone Tracker
-    try:
-        if not os.path.exists(MODEL_PATH):
-            logger.error(f"FATAL: Model file not found at '{MODEL_PATH}'. Tracker cannot be initialized.")
-            tracker = None
-        else:
-            tracker = DroneTracker(MODEL_PATH, confidence_threshold=0.5)
-            
-            # Define and set callbacks for WebSocket broadcasting
-            async def on_new_detection(data):
-                await manager.broadcast(json.dumps(data))
-                
-            async def on_status_update(data):
-                await manager.broadcast(json.dumps(data))
-                
-            tracker.set_callbacks(on_new_detection, on_status_update)
-            logger.info("✅ DroneTracker initialized successfully.")
-            
-    except Exception as e:
-        logger.error(f"💥 Failed to initialize DroneTracker: {e}", exc_info=True)
-        tracker = None
+    create_db_and_tables()
+    job_manager.start()
+
+    if TRACKER_MODE == "remote":
+        # The tracker runs in tracker_service.py; forward its events to this worker's clients
+        loop = asyncio.get_running_loop()
+        broadcaster = manager
+
+        def on_event(data):
+            asyncio.run_coroutine_threadsafe(broadcaster.broadcast(json.dumps(data)), loop)
+
+        tracker = TrackerClient(TRACKER_SOCKET, on_event=on_event)
+        tracker.connect()
+    else:
+        # Load the model in the background so /health answers right away; /ready reports progress
+        threading.Thread(target=load_tracker, name="model-loader", daemon=True).start()
 
     yield  # The application runs here
 
     # --- Shutdown ---
     logger.info("🛑 Application shutting down...")
-    if tracker and tracker.is_camera_running():
+    job_manager.shutdown()
+    if isinstance(tracker, TrackerClient):
+        # The camera belongs to the tracker service and keeps running for other workers
+        tracker.close()
+    elif tracker and tracker.is_camera_running():
         tracker.stop()
         logger.info("Tracker stopped on shutdown.")
 
@@ -89,17 +93,135 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(TrackerServiceError)
+async def tracker_service_error_handler(request, exc: TrackerServiceError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Global tracker instance - Replace with your model path
 MODEL_PATH = 'best.pt'
-tracker: Optional[DroneTracker] = None
+# 'local' runs the tracker inside this process; 'remote' uses the one in tracker_service.py,
+# so several API workers (uvicorn --workers N) can share one camera and model
+TRACKER_MODE = os.getenv("TRACKER_MODE", "local")
+TRACKER_SOCKET = os.getenv("TRACKER_SOCKET", "/tmp/drone-tracker.sock")
+# Form the model is loaded in: 'source' (MODEL_PATH as is), 'fused', 'torchscript', 'onnx', 'openvino' or 'int8';
+# anything but 'source' is built once and cached under MODEL_CACHE_DIR, keyed by the weights' content hash
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "fused")
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", ".model_cache")
+# Tracker backend: 'deepsort' (appearance + motion) or 'sort' (motion-only, lighter on CPU)
+TRACKER_BACKEND = os.getenv("TRACKER_BACKEND", "deepsort")
+# Max DeepSORT appearance features kept per track (0 = unbounded)
+DEEPSORT_NN_BUDGET = int(os.getenv("DEEPSORT_NN_BUDGET", "100")) or None
+# Association parameters (unset = tracker_config defaults); benchmarks/replay_tracking.py sweeps them
+TRACKER_PARAMS = {
+    "max_age": os.getenv("TRACKER_MAX_AGE"),
+    "n_init": os.getenv("TRACKER_N_INIT"),
+    "max_cosine_distance": os.getenv("DEEPSORT_MAX_COSINE_DISTANCE"),
+    "iou_threshold": os.getenv("SORT_IOU_THRESHOLD"),
+}
+# Record each camera session's raw detections (and DeepSORT embeddings) to a binary log here
+DETECTION_LOG_DIR = os.getenv("DETECTION_LOG_DIR") or None
+DETECTION_LOG_EMBEDDINGS = os.getenv("DETECTION_LOG_EMBEDDINGS", "true").lower() in ("1", "true", "yes")
+# Save pre/post-event clips of each new drone here (empty = off); see recorder.py
+RECORDING_DIR = os.getenv("RECORDING_DIR", "")
+RECORDING_PRE_SECONDS = float(os.getenv("RECORDING_PRE_SECONDS", "10"))
+RECORDING_POST_SECONDS = float(os.getenv("RECORDING_POST_SECONDS", "10"))
+RECORDING_MAX_CLIP_SECONDS = float(os.getenv("RECORDING_MAX_CLIP_SECONDS", "120"))
+# Oldest clips are deleted once the directory exceeds this
+RECORDING_MAX_BYTES = int(float(os.getenv("RECORDING_MAX_MB", "2048")) * 1024 * 1024)
+RECORDING_JPEG_QUALITY = int(os.getenv("RECORDING_JPEG_QUALITY", "80"))
+# Continuous archive of the annotated stream in indexed segments (empty = off); see archive.py
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "")
+ARCHIVE_SEGMENT_SECONDS = int(os.getenv("ARCHIVE_SEGMENT_SECONDS", "60"))
+ARCHIVE_FPS = float(os.getenv("ARCHIVE_FPS", "10"))
+# Archived frames are downscaled to this width (0 = stream resolution)
+ARCHIVE_WIDTH = int(os.getenv("ARCHIVE_WIDTH", "960")) or None
+ARCHIVE_JPEG_QUALITY = int(os.getenv("ARCHIVE_JPEG_QUALITY", "75"))
+# Whole segments are deleted past this age or total size (0 = no limit)
+ARCHIVE_RETENTION_HOURS = float(os.getenv("ARCHIVE_RETENTION_HOURS", "72"))
+ARCHIVE_MAX_BYTES = int(float(os.getenv("ARCHIVE_MAX_MB", "0")) * 1024 * 1024) or None
+# Longest archived video of a detection whose end was never recorded
+DETECTION_VIDEO_MAX_SECONDS = float(os.getenv("DETECTION_VIDEO_MAX_SECONDS", "300"))
+# Cropped thumbnail per detection, content-addressed and LRU-evicted past THUMBNAIL_MAX_MB (empty = off)
+THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", "thumbnails")
+THUMBNAIL_MAX_BYTES = int(float(os.getenv("THUMBNAIL_MAX_MB", "256")) * 1024 * 1024)
+# Longest side of a thumbnail in pixels
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "128"))
+THUMBNAIL_JPEG_QUALITY = int(os.getenv("THUMBNAIL_JPEG_QUALITY", "80"))
+# Tracker state size above which appearance galleries get trimmed
+TRACKER_MEMORY_WATERMARK_MB = float(os.getenv("TRACKER_MEMORY_WATERMARK_MB", "256"))
+# Square model input the frames are letterboxed to (the size the model was trained/exported at)
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", "640"))
+# Annotate and stream a copy downscaled to this width (0 = camera resolution)
+STREAM_PREVIEW_WIDTH = int(os.getenv("STREAM_PREVIEW_WIDTH", "0")) or None
+# Camera index, rtsp://, http(s):// or file URI (files loop unless ?loop=0)
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "0")
+# Video decode: 'opencv' or 'pyav' (threaded FFmpeg decode for files and network streams)
+CAPTURE_BACKEND = os.getenv("CAPTURE_BACKEND", "opencv")
+# 'latency' drops stale frames, 'throughput' never drops; unset picks by source type
+CAPTURE_MODE = os.getenv("CAPTURE_MODE") or None
+CAPTURE_BUFFER_SIZE = int(os.getenv("CAPTURE_BUFFER_SIZE", "2"))
+# Resize frames at decode time, e.g. "640x640"; unset keeps the source size
+CAPTURE_OUTPUT_SIZE = os.getenv("CAPTURE_OUTPUT_SIZE")
+# Blank-frame inferences run after loading, before the tracker reports ready (0 = skip)
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", "1"))
+# Uploaded videos are streamed here and analysed by the job scheduler
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "../data/uploaded_videos")
+# Cores offline jobs may use, split into jobs of JOB_THREADS_PER_JOB threads each
+JOB_CPU_BUDGET = int(os.getenv("JOB_CPU_BUDGET", str(max(1, (os.cpu_count() or 1) - 2))))
+JOB_THREADS_PER_JOB = int(os.getenv("JOB_THREADS_PER_JOB", "2"))
+# Cores taken out of the job budget while the live camera runs
+LIVE_CAMERA_CPU_RESERVE = int(os.getenv("LIVE_CAMERA_CPU_RESERVE", "2"))
+# OS niceness of job workers, so the live pipeline wins CPU contention
+JOB_NICE = int(os.getenv("JOB_NICE", "10"))
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "2048")) * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Raw per-frame detections of analysed uploads, keyed by video, model and inference settings,
+# so re-analysing a file with another threshold or tracker skips the model (empty = off)
+DETECTION_CACHE_DIR = os.getenv("DETECTION_CACHE_DIR", ".detection_cache")
+DETECTION_CACHE_MAX_BYTES = int(float(os.getenv("DETECTION_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+# Confidence floor for cached inference; per-job thresholds below it see no extra boxes
+DETECTION_CACHE_FLOOR = float(os.getenv("DETECTION_CACHE_FLOOR", "0.05"))
+# Per-frame span tracing (see GET /trace); off unless enabled here or via POST /trace/start
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "20000"))
+if TRACE_ENABLED:
+    TRACER.start(TRACE_BUFFER_SIZE)
+tracker: Optional["DroneTracker"] = None
+# Background model load progress, served at /ready
+model_state = {"status": "loading", "error": None, "model": None, "artifact_cache": None,
+               "load_seconds": None, "warmup_seconds": None}
+
+def live_camera_reserve() -> int:
+    return LIVE_CAMERA_CPU_RESERVE if tracker and tracker.is_camera_running() else 0
+
+job_manager = JobManager(UPLOAD_DIR, cpu_budget=JOB_CPU_BUDGET, threads_per_job=JOB_THREADS_PER_JOB,
+                         live_reserve=live_camera_reserve, nice=JOB_NICE, settings={
+    "model_path": MODEL_PATH,
+    "model_format": MODEL_FORMAT,
+    "cache_dir": MODEL_CACHE_DIR,
+    "input_size": MODEL_INPUT_SIZE,
+    "confidence_threshold": 0.5,
+    "tracker_backend": TRACKER_BACKEND,
+    "nn_budget": DEEPSORT_NN_BUDGET,
+    "tracker_params": TRACKER_PARAMS,
+    "detection_cache_dir": DETECTION_CACHE_DIR,
+    "detection_cache_max_bytes": DETECTION_CACHE_MAX_BYTES,
+    "detection_floor": DETECTION_CACHE_FLOOR,
+})
+
+WS_CLIENTS = REGISTRY.gauge('drone_websocket_clients', "Connected WebSocket clients")
+WS_BROADCAST_SECONDS = REGISTRY.histogram('drone_websocket_broadcast_seconds', "Time to send one event to all clients")
+WS_MESSAGES = REGISTRY.counter('drone_websocket_messages_total', "Messages sent to WebSocket clients")
+WS_SEND_ERRORS = REGISTRY.counter('drone_websocket_send_errors_total', "Failed WebSocket sends")
 
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
+        WS_CLIENTS.set_function(lambda: len(self.active_connections))
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
@@ -116,13 +238,17 @@ class ConnectionManager:
         if not self.active_connections:
             return
             
+        started = time.perf_counter()
         disconnected = []
         for connection in self.active_connections:
             try:
                 await connection.send_text(message)
+                WS_MESSAGES.inc()
             except Exception as e:
+                WS_SEND_ERRORS.inc()
                 logger.error(f"Error sending message to client: {e}")
                 disconnected.append(connection)
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - started)
                 
         # Remove disconnected clients
         for connection in disconnected:
@@ -130,6 +256,99 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def build_tracker():
+    """Import the heavy stack, build the tracker and warm the model up, recording progress
+    in model_state. Returns None if it failed; the caller marks it ready once it is serving.
+    """
+    if not os.path.exists(MODEL_PATH):
+        logger.error(f"FATAL: Model file not found at '{MODEL_PATH}'. Tracker cannot be initialized.")
+        model_state.update(status="failed", error=f"Model file not found: {MODEL_PATH}")
+        return None
+    try:
+        started = time.perf_counter()
+        from artifact_cache import ArtifactCache
+        from capture import parse_frame_size
+        from archive import VideoArchive
+        from recorder import EventRecorder
+        from thumbnails import ThumbnailWriter
+        from tracker import DroneTracker
+        model_path = MODEL_PATH
+        cache = ArtifactCache(MODEL_CACHE_DIR)
+        try:
+            model_path = cache.resolve(MODEL_PATH, MODEL_FORMAT, MODEL_INPUT_SIZE)
+        except Exception as e:
+            logger.warning(f"Could not prepare the '{MODEL_FORMAT}' model artifact, loading {MODEL_PATH}: {e}")
+        model_state.update(model=model_path, artifact_cache=cache.get_stats())
+        new_tracker = DroneTracker(
+            model_path,
+            confidence_threshold=0.5,
+            tracker_backend=TRACKER_BACKEND,
+            nn_budget=DEEPSORT_NN_BUDGET,
+            tracker_params=TRACKER_PARAMS,
+            detection_log_dir=DETECTION_LOG_DIR,
+            detection_log_embeddings=DETECTION_LOG_EMBEDDINGS,
+            recorder=EventRecorder(
+                RECORDING_DIR,
+                pre_seconds=RECORDING_PRE_SECONDS,
+                post_seconds=RECORDING_POST_SECONDS,
+                max_clip_seconds=RECORDING_MAX_CLIP_SECONDS,
+                max_bytes=RECORDING_MAX_BYTES,
+                jpeg_quality=RECORDING_JPEG_QUALITY
+            ) if RECORDING_DIR else None,
+            archive=VideoArchive(
+                ARCHIVE_DIR,
+                segment_seconds=ARCHIVE_SEGMENT_SECONDS,
+                fps=ARCHIVE_FPS,
+                width=ARCHIVE_WIDTH,
+                jpeg_quality=ARCHIVE_JPEG_QUALITY,
+                retention_hours=ARCHIVE_RETENTION_HOURS,
+                max_bytes=ARCHIVE_MAX_BYTES
+            ) if ARCHIVE_DIR else None,
+            thumbnails=ThumbnailWriter(
+                thumbnail_cache(),
+                size=THUMBNAIL_SIZE,
+                jpeg_quality=THUMBNAIL_JPEG_QUALITY
+            ) if THUMBNAIL_DIR else None,
+            memory_watermark_mb=TRACKER_MEMORY_WATERMARK_MB,
+            input_size=MODEL_INPUT_SIZE,
+            preview_width=STREAM_PREVIEW_WIDTH,
+            capture_source=CAMERA_SOURCE,
+            capture_backend=CAPTURE_BACKEND,
+            capture_mode=CAPTURE_MODE,
+            capture_buffer_size=CAPTURE_BUFFER_SIZE,
+            capture_output_size=parse_frame_size(CAPTURE_OUTPUT_SIZE)
+        )
+        loaded = time.perf_counter()
+        model_state.update(status="warming_up", load_seconds=round(loaded - started, 3))
+        if MODEL_WARMUP_RUNS > 0:
+            new_tracker.warm_up(MODEL_WARMUP_RUNS)
+        model_state["warmup_seconds"] = round(time.perf_counter() - loaded, 3)
+        logger.info(f"✅ DroneTracker initialized successfully (load {model_state['load_seconds']}s, "
+                    f"warm-up {model_state['warmup_seconds']}s).")
+        return new_tracker
+    except Exception as e:
+        logger.error(f"💥 Failed to initialize DroneTracker: {e}", exc_info=True)
+        model_state.update(status="failed", error=str(e))
+        return None
+
+def load_tracker():
+    """Build the in-process tracker; runs off the event loop"""
+    global tracker
+    new_tracker = build_tracker()
+    if new_tracker is None:
+        return
+
+    # Define and set callbacks for WebSocket broadcasting
+    async def on_new_detection(data):
+        await manager.broadcast(json.dumps(data))
+
+    async def on_status_update(data):
+        await manager.broadcast(json.dumps(data))
+
+    new_tracker.set_callbacks(on_new_detection, on_status_update)
+    tracker = new_tracker
+    model_state["status"] = "ready"
+
 # Initialize tracker with callbacks
 # def initialize_tracker():
 #     global tracker
@@ -164,58 +383,67 @@ manager = ConnectionManager()
 
 
 
+@lru_cache(maxsize=1)
+def thumbnail_cache():
+    """The thumbnail cache, created on first use so startup doesn't import cv2"""
+    from thumbnails import ThumbnailCache
+    return ThumbnailCache(THUMBNAIL_DIR, THUMBNAIL_MAX_BYTES)
+
+@lru_cache(maxsize=8)
+def placeholder_jpeg(text: str, org: tuple, color: tuple) -> bytes:
+    """Encode a status frame once; they never change"""
+    import cv2
+    import numpy as np
+    # Create status frame using numpy (not cv2)
+    status_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.putText(status_frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+    ret, buffer = cv2.imencode('.jpg', status_frame)
+    return buffer.tobytes()
+
+def mjpeg_part(frame_bytes: bytes) -> bytes:
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+
 def generate_frames():
-    """Generate video frames for streaming"""
+    """Generate video frames for streaming
+
+    The tracker encodes each annotated frame once for all viewers, and only
+    while at least one viewer is registered.
+    """
+    viewer_tracker = tracker
+    if viewer_tracker:
+        viewer_tracker.add_viewer()
+    last_seq = None
     try:
         while True:
-            if tracker.is_camera_running():
-                frame = tracker.get_latest_frame()
-                if frame is not None:
-                    # Encode frame to JPEG
-                    ret, buffer = cv2.imencode('.jpg', frame)
-                    if ret:
-                        frame_bytes = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                    else:
-                        logger.error("Failed to encode frame to JPEG")
+            if viewer_tracker is None and tracker is not None:
+                # Connected while the model was loading
+                viewer_tracker = tracker
+                viewer_tracker.add_viewer()
+            if viewer_tracker is None and model_state["status"] != "failed":
+                yield mjpeg_part(placeholder_jpeg("Loading model...", (200, 240), (255, 255, 0)))
+            elif viewer_tracker and viewer_tracker.is_camera_running():
+                seq, frame_bytes = viewer_tracker.get_latest_jpeg()
+                if frame_bytes is not None:
+                    # Only send frames this viewer hasn't seen yet
+                    if seq != last_seq:
+                        last_seq = seq
+                        yield mjpeg_part(frame_bytes)
                 else:
-                    # Create error frame using numpy (not cv2)
-                    error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                    cv2.putText(error_frame, "No camera feed", (200, 240), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                    
-                    ret, buffer = cv2.imencode('.jpg', error_frame)
-                    if ret:
-                        frame_bytes = buffer.tobytes()
-                        yield (b'--frame\r\n'
-                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                    yield mjpeg_part(placeholder_jpeg("No camera feed", (200, 240), (0, 0, 255)))
             else:
-                # Camera not running - create status frame
-                status_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(status_frame, "Camera Stopped", (180, 240), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-                
-                ret, buffer = cv2.imencode('.jpg', status_frame)
-                if ret:
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                # Camera not running - send status frame
+                yield mjpeg_part(placeholder_jpeg("Camera Stopped", (180, 240), (0, 255, 255)))
             
             time.sleep(0.033)  # ~30 FPS
             
     except Exception as e:
         logger.error(f"Error generating frame: {e}")
-        # Create final error frame
-        error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(error_frame, "Stream Error", (200, 240), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-        
-        ret, buffer = cv2.imencode('.jpg', error_frame)
-        if ret:
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        # Send final error frame
+        yield mjpeg_part(placeholder_jpeg("Stream Error", (200, 240), (0, 0, 255)))
+    finally:
+        if viewer_tracker:
+            viewer_tracker.remove_viewer()
 
 # API Routes
 
@@ -268,7 +496,8 @@ async def camera_control(action: str) -> CameraStatus:
                 total_detections_today=tracker.get_today_detection_count()
             )
         
-        success = tracker.start()
+        # A remote start waits on the tracker service; keep the event loop free meanwhile
+        success = await asyncio.to_thread(tracker.start)
         if success:
             return CameraStatus(
                 is_running=True,
@@ -286,7 +515,7 @@ async def camera_control(action: str) -> CameraStatus:
                 total_detections_today=tracker.get_today_detection_count()
             )
         
-        success = tracker.stop()
+        success = await asyncio.to_thread(tracker.stop)
         if success:
             return CameraStatus(
                 is_running=False,
@@ -365,6 +594,80 @@ async def delete_detection(detection_id: int, session: Session = Depends(get_ses
     session.commit()
     return {"message": "Detection deleted successfully"}
 
+def generate_archive_frames(start: datetime, end: datetime, speed: float):
+    """Replay archived frames as MJPEG, paced by their timestamps (speed 0 = as fast as possible)"""
+    from archive import read_frames
+    first_ts = paced_from = None
+    for timestamp, jpeg in read_frames(ARCHIVE_DIR, start, end):
+        if speed > 0:
+            if first_ts is None:
+                first_ts, paced_from = timestamp, time.monotonic()
+            delay = (timestamp - first_ts) / speed - (time.monotonic() - paced_from)
+            if delay > 0:
+                time.sleep(delay)
+        yield mjpeg_part(jpeg)
+
+def archive_stream(start: datetime, end: datetime, speed: float) -> StreamingResponse:
+    if not ARCHIVE_DIR:
+        raise HTTPException(status_code=404, detail="Video archive is disabled")
+    return StreamingResponse(
+        generate_archive_frames(start, end, speed),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.get("/thumbnails/{key}")
+async def get_thumbnail(key: str, if_none_match: Optional[str] = Header(None)):
+    """A detection thumbnail by its key (``Detection.thumbnail``); immutable, so cached for good"""
+    headers = {"ETag": f'"{key}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    path = await asyncio.to_thread(thumbnail_cache().path, key) if THUMBNAIL_DIR else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown thumbnail")
+    if if_none_match and headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    # FileResponse answers Range requests itself
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+@app.get("/detections/{detection_id}/video")
+async def detection_video(detection_id: int, pre_seconds: float = Query(5.0, ge=0, le=300),
+                          post_seconds: float = Query(5.0, ge=0, le=300),
+                          speed: float = Query(1.0, ge=0, le=16),
+                          session: Session = Depends(get_session)):
+    """Archived footage of a detection, from shortly before it started until shortly after it ended"""
+    detection = session.get(Detection, detection_id)
+    if not detection:
+        raise HTTPException(status_code=404, detail="Detection not found")
+    start = detection.start_time - timedelta(seconds=pre_seconds)
+    # No end yet (still in view, or the tracker stopped without recording it): play at most
+    # DETECTION_VIDEO_MAX_SECONDS rather than everything archived since
+    end = detection.end_time or min(datetime.now(), detection.start_time + timedelta(seconds=DETECTION_VIDEO_MAX_SECONDS))
+    end += timedelta(seconds=post_seconds)
+    return archive_stream(start, end, speed)
+
+@app.get("/archive/stream")
+async def archive_stream_endpoint(start: datetime, duration: float = Query(60.0, gt=0, le=3600),
+                                  speed: float = Query(1.0, ge=0, le=16)):
+    """Archived video from ``start`` (local time) for ``duration`` seconds, as MJPEG"""
+    return archive_stream(start, start + timedelta(seconds=duration), speed)
+
+@app.get("/archive/frame")
+async def archive_frame(at: datetime):
+    """The archived frame shown at ``at`` (local time), as JPEG"""
+    if not ARCHIVE_DIR:
+        raise HTTPException(status_code=404, detail="Video archive is disabled")
+    from archive import read_frames
+    frame = await asyncio.to_thread(lambda: next(read_frames(ARCHIVE_DIR, at, at), None))
+    if frame is None:
+        raise HTTPException(status_code=404, detail="No archived video at that time")
+    return Response(content=frame[1], media_type="image/jpeg")
+
+@app.get("/archive/segments")
+async def archive_segments(start: datetime, end: Optional[datetime] = None,
+                           limit: int = Query(1000, ge=1, le=10000)):
+    """Archive segments overlapping [start, end] (local time), oldest first"""
+    from archive import find_segments
+    return await asyncio.to_thread(find_segments, start, end or datetime.now(), limit)
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates"""
@@ -394,6 +697,183 @@ async def websocket_endpoint(websocket: WebSocket):
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket)
 
+@app.post("/upload/")
+async def upload_video(file: UploadFile = File(...), user: str = Form("anonymous"),
+                       priority: int = Form(0, ge=-10, le=10),
+                       confidence_threshold: Optional[float] = Form(None, ge=0.0, le=1.0),
+                       tracker_backend: Optional[Literal["deepsort", "sort"]] = Form(None)):
+    """Stream an uploaded video to disk in chunks and queue it for processing.
+
+    ``confidence_threshold`` and ``tracker_backend`` override the server's
+    settings for this job; re-uploading a file with only those changed reuses
+    its cached detections.
+    """
+    if not file.filename or not file.filename.lower().endswith(UPLOAD_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+
+    job_id, path = job_manager.new_upload_path(file.filename)
+    size = 0
+    # Hashed on the way in, it keys the detection cache
+    hasher = hashlib.sha256()
+    try:
+        with open(path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES // (1024 * 1024)} MB")
+                hasher.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    finally:
+        await file.close()
+
+    job = job_manager.submit(job_id, file.filename, path, user=user, priority=priority,
+                             video_sha256=hasher.hexdigest(), confidence_threshold=confidence_threshold,
+                             tracker_backend=tracker_backend)
+    return {"task_id": job.id, "file_id": job.id}
+
+@app.get("/result/{task_id}")
+async def get_result(task_id: str):
+    """State, progress and summary of an upload job"""
+    job = job_manager.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown task")
+    return job_manager.describe(job)
+
+@app.get("/result/{task_id}/tracks")
+async def get_result_tracks(task_id: str):
+    """Confirmed tracks of every frame of a finished job, as JSON Lines"""
+    job = job_manager.get(task_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown task")
+    if job.state != "SUCCESS":
+        raise HTTPException(status_code=409, detail=f"Task is {job.state}")
+    return FileResponse(job_manager.tracks_path(task_id), media_type="application/x-ndjson", filename=f"{task_id}.jsonl")
+
+@app.post("/result/{task_id}/cancel")
+async def cancel_result(task_id: str):
+    """Cancel a queued or running upload job"""
+    if job_manager.get(task_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown task")
+    return {"task_id": task_id, "cancelled": job_manager.cancel(task_id)}
+
+@app.get("/jobs")
+async def list_jobs(user: Optional[str] = None, limit: int = Query(100, ge=1, le=1000)):
+    """Most recent upload jobs, optionally for one user"""
+    return [job_manager.describe(job) for job in job_manager.list_jobs(user, limit)]
+
+@app.get("/jobs/scheduler")
+async def job_scheduler():
+    """CPU budget, slots available to offline jobs and job counts by state"""
+    return job_manager.get_stats()
+
+@app.get("/recordings")
+async def list_recordings(limit: int = Query(100, ge=1, le=1000)):
+    """Saved event clips, newest first"""
+    if not RECORDING_DIR:
+        return []
+    from recorder import list_clips
+    clips = await asyncio.to_thread(list_clips, RECORDING_DIR)
+    # Per-frame times are only needed by players, see GET /recordings/{name}/meta
+    return [{k: v for k, v in clip.items() if k != "frame_times"} for clip in clips[:limit]]
+
+def recording_path(name: str) -> Path:
+    from recorder import CLIP_SUFFIX
+    path = Path(RECORDING_DIR) / name
+    if not RECORDING_DIR or Path(name).name != name or not name.endswith(CLIP_SUFFIX) or not path.exists():
+        raise HTTPException(status_code=404, detail="Unknown recording")
+    return path
+
+@app.get("/recordings/{name}")
+async def get_recording(name: str):
+    """An event clip as concatenated JPEGs (Motion JPEG)"""
+    return FileResponse(recording_path(name), media_type="video/x-motion-jpeg", filename=name)
+
+@app.get("/recordings/{name}/meta")
+async def get_recording_meta(name: str):
+    """Events, duration and per-frame times of an event clip"""
+    sidecar = recording_path(name).with_suffix(".json")
+    return json.loads(await asyncio.to_thread(sidecar.read_text))
+
+@app.get("/tracker/memory")
+async def tracker_memory():
+    """Resident size of tracker state and process RSS"""
+    if not tracker:
+        raise HTTPException(status_code=503, detail="Tracker not initialized")
+    
+    return await asyncio.to_thread(tracker.get_memory_stats)
+
+@app.get("/tracker/render")
+async def tracker_render():
+    """Overlay rendering cost and sprite cache statistics"""
+    if not tracker:
+        raise HTTPException(status_code=503, detail="Tracker not initialized")
+    
+    return await asyncio.to_thread(tracker.get_render_stats)
+
+@app.get("/metrics")
+async def metrics():
+    """Pipeline metrics in the Prometheus text format"""
+    text = REGISTRY.render()
+    if isinstance(tracker, TrackerClient):
+        # Pipeline metrics live in the tracker service; this worker adds its own families
+        try:
+            text += await asyncio.to_thread(tracker.call, "metrics", exclude=REGISTRY.names())
+        except TrackerServiceError as e:
+            logger.warning(f"Could not read tracker service metrics: {e}")
+    return Response(text, media_type=METRICS_CONTENT_TYPE)
+
+@app.post("/trace/start")
+async def trace_start(capacity: int = Query(TRACE_BUFFER_SIZE, ge=100, le=1_000_000)):
+    """Start recording per-frame spans into the ring buffer"""
+    if isinstance(tracker, TrackerClient):
+        return await asyncio.to_thread(tracker.call, "trace_start", capacity=capacity)
+    TRACER.start(capacity)
+    return TRACER.get_stats()
+
+@app.post("/trace/stop")
+async def trace_stop():
+    """Stop recording spans; the buffer is kept for export"""
+    if isinstance(tracker, TrackerClient):
+        return await asyncio.to_thread(tracker.call, "trace_stop")
+    TRACER.stop()
+    return TRACER.get_stats()
+
+@app.get("/trace")
+async def trace_export():
+    """Buffered spans as Chrome trace JSON (open in chrome://tracing or ui.perfetto.dev)"""
+    if isinstance(tracker, TrackerClient):
+        trace = await asyncio.to_thread(tracker.call, "trace_export")
+    else:
+        trace = TRACER.export_chrome_trace()
+    return Response(
+        json.dumps(trace),
+        media_type="application/json",
+        headers={"Content-Disposition": "attachment; filename=drone-trace.json"}
+    )
+
+@app.get("/trace/profile")
+async def trace_profile(seconds: float = Query(10.0, gt=0, le=120), interval_ms: float = Query(5.0, ge=1, le=1000)):
+    """Sample the capture thread's Python stacks for a while and return folded stacks (flamegraph input)"""
+    if isinstance(tracker, TrackerClient):
+        folded = await asyncio.to_thread(tracker.call, "profile", timeout=seconds + 10,
+                                         seconds=seconds, interval=interval_ms / 1000)
+        return PlainTextResponse(folded)
+    thread_ids = None
+    if tracker and tracker.thread and tracker.thread.is_alive():
+        thread_ids = {tracker.thread.ident}
+    folded = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, thread_ids)
+    return PlainTextResponse(folded)
+
+@app.get("/tracker/capture")
+async def tracker_capture():
+    """Video source, decode backend, frame counters and reconnect statistics"""
+    if not tracker:
+        raise HTTPException(status_code=503, detail="Tracker not initialized")
+    return await asyncio.to_thread(tracker.get_capture_stats)
+
 # Serve static files for development
 @app.get("/health")
 async def health_check():
@@ -406,6 +886,15 @@ async def health_check():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 until then"""
+    state = await asyncio.to_thread(tracker.ready_state) if isinstance(tracker, TrackerClient) else model_state
+    body = {**state, "timestamp": datetime.now().isoformat()}
+    if state["status"] != "ready":
+        return JSONResponse(status_code=503, content=body)
+    return body
+
 # Development static file serving
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,27 @@
+"""Process memory helpers used for tracker memory reporting"""
+import os
+import resource
+import sys
+
+
+def process_rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS, some containers) - fall back to the peak value
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def ndarray_bytes(arrays) -> int:
+    """Total buffer size of an iterable of NumPy arrays"""
+    return sum(getattr(array, 'nbytes', 0) for array in arrays)
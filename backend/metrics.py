@@ -0,0 +1,190 @@
+"""Lightweight pipeline metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are plain Python objects guarded by a lock,
+cheap enough to update on every frame (about a microsecond per
+observation). ``REGISTRY.render()`` produces the text served at
+``GET /metrics``. Gauges can be backed by a callback so values that already
+live elsewhere (queue sizes, client counts) are read only when scraped.
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Seconds; spans sub-millisecond sprite blits up to multi-second CPU inference
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = labels + ((extra,) if extra else ())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], '_Metric'] = {}
+        self._labels: Tuple[Tuple[str, str], ...] = ()
+
+    def labels(self, *values):
+        """Child metric for one combination of label values"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    child._labels = tuple(zip(self.labelnames, key))
+                    self._children[key] = child
+        return child
+
+    def _new_child(self):
+        return type(self)(self.name, self.documentation)
+
+    def _series(self):
+        if self.labelnames:
+            for child in list(self._children.values()):
+                yield from child._samples()
+        else:
+            yield from self._samples()
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self._series())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def _samples(self):
+        yield self.name, _format_labels(self._labels), self.value
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, optionally read from a callback at scrape time"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def _samples(self):
+        value = self.value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                # A broken source shouldn't fail the whole scrape
+                value = float('nan')
+        yield self.name, _format_labels(self._labels), value
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets, plus their sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def _samples(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            yield (f"{self.name}_bucket", _format_labels(self._labels, ('le', _format_value(bound))),
+                   cumulative)
+        yield f"{self.name}_sum", _format_labels(self._labels), total
+        yield f"{self.name}_count", _format_labels(self._labels), count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Re-registering (e.g. a module reload) returns the existing metric
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def names(self):
+        return list(self._metrics)
+
+    def render(self, exclude: Iterable[str] = ()) -> str:
+        """Text exposition of all metrics but the ``exclude``d families"""
+        exclude = set(exclude)
+        return '\n'.join(metric.render() for name, metric in self._metrics.items() if name not in exclude) + '\n'
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -14,6 +14,8 @@ class Detection(SQLModel, table=True):
     duration_seconds: Optional[int] = None
     detection_date: date = Field(index=True)  # ✅ Renamed from 'date' to 'detection_date'
     confidence: Optional[float] = None
+    # Key of the cropped thumbnail in the thumbnail cache (see thumbnails.py)
+    thumbnail: Optional[str] = None
     
 class DetectionResponse(SQLModel):
     """Response model for API endpoints"""
@@ -26,6 +28,7 @@ class DetectionResponse(SQLModel):
     duration_seconds: Optional[int]
     detection_date: date  # ✅ Updated here too
     confidence: Optional[float]
+    thumbnail: Optional[str] = None
 
 
 class DetectionCreate(SQLModel):
@@ -54,3 +57,35 @@ class WebSocketMessage(SQLModel):
     center: Optional[list] = None
     timestamp: Optional[str] = None
     message: Optional[str] = None
+
+
+class VideoSegment(SQLModel, table=True):
+    """One file of the continuous video archive (see archive.py)"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    path: str = Field(index=True)  # relative to the archive root
+    start_time: datetime = Field(index=True)
+    end_time: Optional[datetime] = None  # None while the segment is being written
+    frames: int = 0
+    bytes: int = 0
+
+
+class VideoJob(SQLModel, table=True):
+    """Uploaded video queued for offline analysis; the scheduler's persisted queue"""
+    id: str = Field(primary_key=True)
+    filename: str
+    path: str
+    user: str = Field(default="anonymous", index=True)
+    priority: int = 0  # higher runs first
+    video_sha256: Optional[str] = Field(default=None, index=True)  # content hash, keys the detection cache
+    confidence_threshold: Optional[float] = None  # per-job overrides of the server's settings
+    tracker_backend: Optional[str] = None
+    state: str = Field(default="PENDING", index=True)  # Celery state names
+    cancel_requested: bool = False
+    owner: Optional[str] = None  # "host:pid" of the API process running it
+    created_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    frames_done: int = 0
+    total_frames: Optional[int] = None
+    result: Optional[str] = None  # JSON summary
+    error: Optional[str] = None
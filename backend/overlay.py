@@ -0,0 +1,161 @@
+"""Annotation layer for the tracker's video output.
+
+Text labels (track IDs, durations, the status banner) are rasterized once
+into small sprites and cached until their text changes, instead of calling
+``cv2.putText`` on the full frame for every label of every track on every
+frame. Each frame the sprites are composited into an overlay layer and blended onto the
+frame in a single masked copy over the region they cover.
+Boxes and center points stay plain OpenCV primitives, which are already cheap.
+The whole layer can be switched off when nobody is watching the output.
+"""
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# (font scale, BGR color, thickness) for each kind of label
+TRACK_TITLE_STYLE = (0.6, (255, 255, 255), 2)
+TRACK_DETAIL_STYLE = (0.5, (255, 255, 255), 2)
+BANNER_STYLE = (0.7, (0, 255, 255), 2)
+
+BOX_COLOR = (0, 255, 0)
+CENTER_COLOR = (0, 0, 255)
+
+
+def scale_annotations(annotations, scale: float):
+    """Map annotation boxes and centers onto a resized copy of the frame; label texts are kept"""
+    return [
+        (tuple(int(v * scale) for v in box), (int(center[0] * scale), int(center[1] * scale)), texts)
+        for box, center, texts in annotations
+    ]
+
+
+class TextSprite:
+    """A pre-rendered label: solid color patch, glyph mask and the putText origin offset"""
+    __slots__ = ('patch', 'mask', 'offset_x', 'offset_y')
+
+    def __init__(self, text: str, style):
+        scale, color, thickness = style
+        (width, height), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+        pad = thickness
+        coverage = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+        cv2.putText(coverage, text, (pad, height + pad), FONT, scale, 255, thickness, cv2.LINE_8)
+        # Hard-edged glyphs (OpenCV 4's default look) so compositing is a plain masked copy;
+        # thresholding also covers OpenCV builds that always antialias text
+        self.mask = np.where(coverage >= 128, 255, 0).astype(np.uint8)
+        self.patch = np.empty(coverage.shape + (3,), dtype=np.uint8)
+        self.patch[:] = color
+        # Where the sprite's top-left sits relative to the putText origin
+        self.offset_x = -pad
+        self.offset_y = -(height + pad)
+
+
+class OverlayRenderer:
+    """Draws track boxes and cached text sprites onto frames"""
+
+    def __init__(self, enabled: bool = True, max_cached_sprites: int = 1024):
+        self.enabled = enabled
+        self.max_cached_sprites = max_cached_sprites
+        self._sprites = OrderedDict()  # LRU of {(text, style): TextSprite}
+        self._layer = None   # label colors
+        self._mask = None    # where the layer has labels
+
+        # Render cost accounting
+        self.frames_rendered = 0
+        self.last_render_ms = 0.0
+        self.total_render_ms = 0.0
+        self.sprite_hits = 0
+        self.sprite_misses = 0
+
+    def sprite(self, text: str, style) -> TextSprite:
+        """Return the cached sprite for a label, rendering it on first use"""
+        key = (text, style)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.sprite_hits += 1
+            return sprite
+
+        self.sprite_misses += 1
+        sprite = TextSprite(text, style)
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_cached_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def render(self, frame, annotations, banner_text: Optional[str] = None):
+        """Annotate a frame in place.
+
+        annotations: iterable of ((x1, y1, x2, y2), (center_x, center_y), (title, duration, center))
+        label texts for each confirmed track.
+        """
+        if not self.enabled:
+            return
+        start = time.perf_counter()
+
+        # Boxes and center points are cheap primitives, draw them directly
+        placements = []
+        for (x1, y1, x2, y2), center, (title, duration, position) in annotations:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), BOX_COLOR, 2)
+            cv2.circle(frame, center, 5, CENTER_COLOR, -1)
+            placements.append((self.sprite(title, TRACK_TITLE_STYLE), x1, y1 - 40))
+            placements.append((self.sprite(duration, TRACK_DETAIL_STYLE), x1, y1 - 25))
+            placements.append((self.sprite(position, TRACK_DETAIL_STYLE), x1, y1 - 10))
+        if banner_text:
+            placements.append((self.sprite(banner_text, BANNER_STYLE), 10, 30))
+
+        self._composite(frame, placements)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.frames_rendered += 1
+        self.last_render_ms = elapsed_ms
+        self.total_render_ms += elapsed_ms
+
+    def _composite(self, frame, placements):
+        """Paste sprites into the overlay layer, then blend it onto the frame with one masked copy"""
+        if not placements:
+            return
+        height, width = frame.shape[:2]
+        if self._layer is None or self._layer.shape != frame.shape:
+            self._layer = np.zeros_like(frame)
+            self._mask = np.zeros((height, width), dtype=np.uint8)
+
+        # Union of all sprite rectangles; the blend only touches this region
+        top, left, bottom, right = height, width, 0, 0
+        layer, mask = self._layer, self._mask
+        for sprite, x, y in placements:
+            x0, y0 = x + sprite.offset_x, y + sprite.offset_y
+            h, w = sprite.mask.shape
+            # Clip the sprite to the frame
+            fx0, fy0 = max(x0, 0), max(y0, 0)
+            fx1, fy1 = min(x0 + w, width), min(y0 + h, height)
+            if fx0 >= fx1 or fy0 >= fy1:
+                continue
+            sprite_mask = sprite.mask[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0]
+            cv2.copyTo(sprite.patch[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0], sprite_mask, layer[fy0:fy1, fx0:fx1])
+            mask_region = mask[fy0:fy1, fx0:fx1]
+            cv2.max(mask_region, sprite_mask, dst=mask_region)
+            top, left = min(top, fy0), min(left, fx0)
+            bottom, right = max(bottom, fy1), max(right, fx1)
+
+        if top >= bottom or left >= right:
+            return
+        mask_region = mask[top:bottom, left:right]
+        cv2.copyTo(layer[top:bottom, left:right], mask_region, frame[top:bottom, left:right])
+        mask_region[:] = 0
+
+    def get_stats(self):
+        """Rendering cost and sprite cache effectiveness"""
+        return {
+            "enabled": self.enabled,
+            "frames_rendered": self.frames_rendered,
+            "last_render_ms": self.last_render_ms,
+            "avg_render_ms": self.total_render_ms / self.frames_rendered if self.frames_rendered else 0.0,
+            "cached_sprites": len(self._sprites),
+            "sprite_hits": self.sprite_hits,
+            "sprite_misses": self.sprite_misses,
+        }
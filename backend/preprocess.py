@@ -0,0 +1,104 @@
+"""Per-frame preprocessing shared by the detector, the annotator and the stream.
+
+Each captured frame is converted once into:
+
+* ``blob``: the letterboxed model input, a contiguous 1x3xSxS float32 RGB
+  array scaled to [0, 1], ready for ``torch.from_numpy``. Letterboxing
+  (aspect-preserving resize plus grey padding) and BGR->RGB/HWC->CHW/scale
+  are each a single pass into buffers reused across frames, so a blob is
+  only valid until the next ``prepare()``.
+* ``preview``: an optional downscaled BGR copy for annotation and JPEG
+  encoding, so the stream doesn't pay for the camera's full resolution.
+
+``PreparedFrame`` keeps the coordinate transforms between model, frame and
+preview space, so detections come back in frame coordinates and overlays can
+be drawn on the preview.
+"""
+from typing import Optional
+
+import cv2
+import numpy as np
+
+PAD_VALUE = 114  # YOLO's letterbox grey
+
+
+class PreparedFrame:
+    """One frame's shared buffers plus the transforms between their coordinate spaces"""
+    __slots__ = ('frame', 'blob', 'scale', 'pad_x', 'pad_y', 'preview', 'preview_scale')
+
+    def __init__(self, frame, blob, scale, pad_x, pad_y, preview=None, preview_scale=1.0):
+        self.frame = frame
+        self.blob = blob
+        self.scale = scale
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.preview = preview
+        self.preview_scale = preview_scale
+
+    def to_frame_coords(self, boxes):
+        """Map Nx4 xyxy boxes from letterboxed model space back to frame pixels"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        boxes = (boxes - (self.pad_x, self.pad_y, self.pad_x, self.pad_y)) / self.scale
+        height, width = self.frame.shape[:2]
+        np.clip(boxes[:, 0::2], 0, width, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, height, out=boxes[:, 1::2])
+        return boxes
+
+    @property
+    def canvas(self):
+        """The image annotations and the stream should use"""
+        return self.preview if self.preview is not None else self.frame
+
+
+class Preprocessor:
+    """Letterboxes frames to the model input size and builds the stream preview"""
+
+    def __init__(self, input_size: int = 640, preview_width: Optional[int] = None):
+        self.input_size = input_size
+        self.preview_width = preview_width
+        # Reused across frames; rebuilt only when the camera resolution changes
+        self._frame_shape = None
+        self._letterbox = np.full((input_size, input_size, 3), PAD_VALUE, dtype=np.uint8)
+        self._blob = np.empty((1, 3, input_size, input_size), dtype=np.float32)
+        self._resized = None
+        self._scale = 1.0
+        self._pad_x = self._pad_y = 0
+        self._preview_size = None
+
+    def _configure(self, shape):
+        height, width = shape[:2]
+        self._frame_shape = shape
+        self._scale = min(self.input_size / width, self.input_size / height)
+        new_width, new_height = round(width * self._scale), round(height * self._scale)
+        self._pad_x = (self.input_size - new_width) // 2
+        self._pad_y = (self.input_size - new_height) // 2
+        self._letterbox[:] = PAD_VALUE
+        # Resize writes straight into the un-padded window of the letterbox buffer
+        self._resized = self._letterbox[self._pad_y:self._pad_y + new_height,
+                                        self._pad_x:self._pad_x + new_width]
+        if self.preview_width and width > self.preview_width:
+            self._preview_size = (self.preview_width, round(height * self.preview_width / width))
+        else:
+            self._preview_size = None
+
+    @property
+    def letterbox_transform(self):
+        """(scale, pad_x, pad_y) mapping frame pixels into model space for the current resolution"""
+        return self._scale, self._pad_x, self._pad_y
+
+    def prepare(self, frame) -> PreparedFrame:
+        if frame.shape != self._frame_shape:
+            self._configure(frame.shape)
+
+        cv2.resize(frame, (self._resized.shape[1], self._resized.shape[0]),
+                   dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        # BGR->RGB, HWC->CHW and /255 in one pass (cv2.dnn.blobFromImage is slower here)
+        np.multiply(self._letterbox.transpose(2, 0, 1)[::-1], np.float32(1 / 255.0),
+                    out=self._blob[0], casting='unsafe')
+
+        preview, preview_scale = None, 1.0
+        if self._preview_size is not None:
+            preview = cv2.resize(frame, self._preview_size, interpolation=cv2.INTER_AREA)
+            preview_scale = self._preview_size[0] / frame.shape[1]
+
+        return PreparedFrame(frame, self._blob, self._scale, self._pad_x, self._pad_y, preview, preview_scale)
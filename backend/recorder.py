@@ -0,0 +1,272 @@
+"""Event clips: the seconds before and after a new drone, from a ring buffer.
+
+``EventRecorder`` keeps the last ``pre_seconds`` of JPEG-encoded frames in
+memory. ``trigger()`` (called on a ``new_drone`` event) starts a clip with
+the buffered frames; frames keep being appended until ``post_seconds``
+after the last event, so drones that show up while a clip is recording
+extend it (up to ``max_clip_seconds``) instead of starting another one.
+
+Nothing here blocks the capture loop: ``push()`` hands the frame buffer to
+an encoder thread through a small queue and drops the frame if the encoder
+is behind. The encoder streams each clip to a writer thread as it goes
+(the buffered frames when it starts, then every new frame), so memory stays
+bounded by the ring buffer however long a clip runs. Frames already encoded
+for MJPEG viewers are reused as is; the tracker pushes the annotated
+display frame, so every frame of a clip looks like the live stream.
+
+A clip is ``<dir>/<start>-drone<id>.mjpeg`` (concatenated JPEGs; plays with
+``ffplay -f mjpeg`` or VLC) plus a ``.json`` sidecar with the events and
+per-frame timestamps. Once the directory exceeds ``max_bytes`` the oldest
+clips are deleted.
+"""
+import datetime
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import cv2
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CLIP_SUFFIX = '.mjpeg'
+
+RECORDER_BUFFER_BYTES = REGISTRY.gauge('drone_recorder_buffer_bytes', "Encoded frames held in the pre-event ring buffer")
+RECORDER_DROPPED_FRAMES = REGISTRY.counter('drone_recorder_dropped_frames_total', "Frames skipped because the encoder was behind")
+RECORDER_CLIPS = REGISTRY.counter('drone_recorder_clips_total', "Event clips written to disk")
+RECORDER_DELETED_CLIPS = REGISTRY.counter('drone_recorder_deleted_clips_total', "Clips deleted to stay within the disk quota")
+
+
+def list_clips(output_dir):
+    """Metadata of the clips in ``output_dir``, newest first"""
+    clips = []
+    for sidecar in sorted(Path(output_dir).glob('*.json'), reverse=True):
+        try:
+            clips.append(json.loads(sidecar.read_text()))
+        except (OSError, ValueError):
+            continue
+    return clips
+
+
+class _Clip:
+    __slots__ = ('started', 'ends_at', 'deadline', 'events', 'preroll', 'file', 'path', 'frame_times')
+
+    def __init__(self, preroll, ends_at: float, deadline: float, event: dict):
+        self.started = datetime.datetime.now()
+        self.ends_at = ends_at
+        self.deadline = deadline  # max_clip_seconds cap
+        self.events = [event]
+        # Ring buffer contents at the trigger, until the encoder hands them to the writer
+        self.preroll = list(preroll)
+        # Only touched by the writer thread
+        self.file = None
+        self.path = None
+        self.frame_times = []  # wall-clock time of every frame written
+
+
+class EventRecorder:
+    """Pre/post-event clip recorder fed by the capture loop"""
+
+    def __init__(self, output_dir, pre_seconds: float = 10.0, post_seconds: float = 10.0,
+                 max_clip_seconds: float = 120.0, max_bytes: int = 2 * 1024 ** 3,
+                 jpeg_quality: int = 80, max_buffer_bytes: int = 64 * 1024 ** 2):
+        self.output_dir = Path(output_dir)
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_clip_seconds = max_clip_seconds
+        self.max_bytes = max_bytes
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.max_buffer_bytes = max_buffer_bytes
+
+        # (monotonic time, wall-clock time, jpeg bytes), oldest first
+        self._ring = deque()
+        self._ring_bytes = 0
+        self._clip: Optional[_Clip] = None
+        self._lock = threading.Lock()
+        self._frames = queue.Queue(maxsize=2)
+        # ('start', clip, frames), ('frame', clip, frame) and ('end', clip, None) for the writer
+        self._writes = queue.Queue(maxsize=64)
+        self._encoder = None
+        self._writer = None
+        self.clips_written = 0
+
+    def start(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._encoder = threading.Thread(target=self._encode_loop, name="recorder-encode", daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name="recorder-write", daemon=True)
+        self._encoder.start()
+        self._writer.start()
+
+    def push(self, buffer=None, jpeg: Optional[bytes] = None):
+        """Add the current frame: an encoded ``jpeg``, or a retained ``FrameBuffer`` this takes over"""
+        try:
+            self._frames.put_nowait((time.monotonic(), time.time(), buffer, jpeg))
+        except queue.Full:
+            RECORDER_DROPPED_FRAMES.inc()
+            if buffer is not None:
+                buffer.release()
+
+    def trigger(self, event: dict):
+        """Start a clip, or extend the one being recorded, for this event"""
+        now = time.monotonic()
+        with self._lock:
+            if self._clip is not None:
+                self._clip.events.append(event)
+                self._clip.ends_at = min(now + self.post_seconds, self._clip.deadline)
+                return
+            self._clip = _Clip(self._ring, now + self.post_seconds, now + self.max_clip_seconds, event)
+
+    def _encode_loop(self):
+        while True:
+            item = self._frames.get()
+            if item is None:
+                return
+            monotonic, wall, buffer, jpeg = item
+            if jpeg is None:
+                try:
+                    ok, encoded = cv2.imencode('.jpg', buffer.array, self.encode_params)
+                finally:
+                    buffer.release()
+                if not ok:
+                    continue
+                jpeg = encoded.tobytes()
+            self._add(monotonic, wall, jpeg)
+
+    def _add(self, monotonic: float, wall: float, jpeg: bytes):
+        frame = (monotonic, wall, jpeg)
+        ended = None
+        with self._lock:
+            self._ring.append(frame)
+            self._ring_bytes += len(jpeg)
+            # Keep pre_seconds of frames, and never more than max_buffer_bytes
+            while self._ring and (self._ring[0][0] < monotonic - self.pre_seconds
+                                  or self._ring_bytes > self.max_buffer_bytes):
+                self._ring_bytes -= len(self._ring.popleft()[2])
+            clip = self._clip
+            if clip is not None:
+                preroll, clip.preroll = clip.preroll, None
+                if monotonic >= clip.ends_at:
+                    ended, self._clip = clip, None
+        RECORDER_BUFFER_BYTES.set(self._ring_bytes)
+        if clip is None:
+            return
+        # Queued outside the lock: trigger() runs on the capture loop and must never wait
+        if preroll is not None:
+            self._writes.put(('start', clip, preroll + [frame]))
+        else:
+            try:
+                self._writes.put_nowait(('frame', clip, frame))
+            except queue.Full:
+                RECORDER_DROPPED_FRAMES.inc()
+        if ended is not None:
+            self._writes.put(('end', ended, None))
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            if item is None:
+                return
+            kind, clip, payload = item
+            try:
+                if kind == 'start':
+                    self._open(clip)
+                    for frame in payload:
+                        self._append(clip, frame)
+                elif kind == 'frame':
+                    self._append(clip, payload)
+                elif kind == 'end':
+                    self._finish(clip)
+                    self._enforce_quota()
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not write event clip: {e}")
+
+    def _open(self, clip: _Clip):
+        first = clip.events[0]
+        name = f"{clip.started.strftime('%Y%m%d-%H%M%S')}-drone{first.get('daily_id', 0)}"
+        clip.path = self.output_dir / (name + CLIP_SUFFIX)
+        clip.file = open(clip.path.with_suffix('.tmp'), 'wb')
+
+    def _append(self, clip: _Clip, frame):
+        if clip.file is None:
+            return  # the clip could not be opened
+        _, wall, jpeg = frame
+        clip.file.write(jpeg)
+        clip.frame_times.append(wall)
+
+    def _finish(self, clip: _Clip):
+        if clip.file is None:
+            return
+        clip.file.close()
+        clip.file = None
+        path = clip.path
+        path.with_suffix('.tmp').replace(path)
+        times = clip.frame_times
+        started_at = times[0] if times else time.time()
+        duration = times[-1] - started_at if times else 0.0
+        path.with_suffix('.json').write_text(json.dumps({
+            "clip": path.name,
+            "events": clip.events,
+            "frames": len(times),
+            "start": datetime.datetime.fromtimestamp(started_at).isoformat(),
+            "duration_seconds": round(duration, 3),
+            "fps": round((len(times) - 1) / duration, 2) if duration > 0 else None,
+            "bytes": path.stat().st_size,
+            # Per-frame offsets into the clip, for seeking and sync with detections
+            "frame_times": [round(wall - started_at, 3) for wall in times],
+        }))
+        self.clips_written += 1
+        RECORDER_CLIPS.inc()
+        logger.info(f"Saved event clip {path.name}: {len(times)} frames, {duration:.1f}s")
+
+    def _enforce_quota(self):
+        clips = sorted(self.output_dir.glob(f'*{CLIP_SUFFIX}'), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in clips)
+        # The newest clip is kept even if it alone exceeds the quota
+        for clip in clips[:-1]:
+            if total <= self.max_bytes:
+                break
+            total -= clip.stat().st_size
+            clip.unlink(missing_ok=True)
+            clip.with_suffix('.json').unlink(missing_ok=True)
+            RECORDER_DELETED_CLIPS.inc()
+            logger.info(f"Deleted event clip {clip.name} to stay within the recording quota")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "output_dir": str(self.output_dir),
+                "buffered_frames": len(self._ring),
+                "buffered_bytes": self._ring_bytes,
+                "recording": self._clip is not None,
+                "pending_writes": self._writes.qsize(),
+                "clips_written": self.clips_written,
+            }
+
+    def stop(self):
+        """Flush the clip in progress and stop the threads"""
+        with self._lock:
+            clip, self._clip = self._clip, None
+        if self._encoder is not None:
+            self._frames.put(None)
+            self._encoder.join(timeout=5)
+        while True:
+            try:
+                leftover = self._frames.get_nowait()
+            except queue.Empty:
+                break
+            if leftover is not None and leftover[2] is not None:
+                leftover[2].release()
+        if clip is not None:
+            if clip.preroll is not None:
+                self._writes.put(('start', clip, clip.preroll))
+            self._writes.put(('end', clip, None))
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join(timeout=30)
+        self._encoder = self._writer = None
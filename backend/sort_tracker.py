@@ -0,0 +1,329 @@
+"""Motion-only multi-object tracker (SORT / ByteTrack style).
+
+A pure-NumPy alternative to DeepSORT for CPU deployments: tracks are
+associated by IoU between Kalman-predicted boxes and detections, with no
+appearance embedder and no feature gallery. High-confidence detections are
+associated first and low-confidence ones are used to keep existing tracks
+alive, as in ByteTrack.
+
+Track state is held in struct-of-arrays form (one row per track) so the
+Kalman predict/update, the IoU cost matrix and Mahalanobis gating run as
+batched NumPy operations over all tracks at once, which keeps the per-frame
+cost flat in Python even with hundreds of simultaneous targets. The filter
+uses DeepSORT's scale-aware parametrization over [cx, cy, aspect, height].
+
+``SortTracker.update_tracks`` takes the same ``([left, top, w, h], confidence,
+class)`` detections as ``DeepSort.update_tracks`` and returns track objects
+with the same interface (``track_id``, ``is_confirmed()``, ``to_ltwh()``,
+``to_ltrb()``, ``time_since_update``), so ``DroneTracker`` can use either.
+"""
+from typing import Optional
+
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# 0.95 quantile of the chi-square distribution with 4 degrees of freedom
+CHI2_95_4DOF = 9.4877
+# Cost assigned to pairs that fail gating so the solver never prefers them
+INFEASIBLE_COST = 1e5
+
+_STD_WEIGHT_POSITION = 1.0 / 20
+_STD_WEIGHT_VELOCITY = 1.0 / 160
+
+# Constant-velocity model: state is [cx, cy, a, h, vcx, vcy, va, vh]
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+
+
+def ltwh_to_xyah(boxes):
+    """Convert [N, 4] boxes from [left, top, w, h] to measurements [cx, cy, w/h, h]"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.column_stack([
+        boxes[:, 0] + boxes[:, 2] / 2.0,
+        boxes[:, 1] + boxes[:, 3] / 2.0,
+        boxes[:, 2] / np.maximum(boxes[:, 3], 1e-6),
+        boxes[:, 3],
+    ])
+
+
+def xyah_to_ltrb(xyah):
+    """Convert [N, >=4] states [cx, cy, a, h, ...] to [N, 4] boxes [x1, y1, x2, y2]"""
+    w = xyah[:, 2] * xyah[:, 3]
+    h = xyah[:, 3]
+    return np.column_stack([
+        xyah[:, 0] - w / 2.0, xyah[:, 1] - h / 2.0,
+        xyah[:, 0] + w / 2.0, xyah[:, 1] + h / 2.0,
+    ])
+
+
+def iou_batch(boxes_a, boxes_b):
+    """Pairwise IoU between [N, 4] and [M, 4] arrays of [x1, y1, x2, y2] boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def linear_assignment(cost):
+    """Minimum-cost assignment; Hungarian via SciPy when available, greedy otherwise"""
+    if cost.size == 0:
+        return np.empty((0, 2), dtype=int)
+    if SCIPY_AVAILABLE:
+        rows, cols = linear_sum_assignment(cost)
+        return np.stack([rows, cols], axis=1)
+
+    pairs = []
+    used_rows, used_cols = set(), set()
+    for flat in np.argsort(cost, axis=None):
+        row, col = np.unravel_index(flat, cost.shape)
+        if row in used_rows or col in used_cols:
+            continue
+        pairs.append((row, col))
+        used_rows.add(row)
+        used_cols.add(col)
+    return np.array(pairs, dtype=int).reshape(-1, 2)
+
+
+def _motion_noise(height):
+    """Per-track process noise diagonals [N, 8], scaled by box height"""
+    pos = _STD_WEIGHT_POSITION * height
+    vel = _STD_WEIGHT_VELOCITY * height
+    std = np.column_stack([pos, pos, np.full_like(height, 1e-2), pos,
+                           vel, vel, np.full_like(height, 1e-5), vel])
+    return std ** 2
+
+
+def _measurement_noise(height):
+    """Per-track measurement noise diagonals [N, 4], scaled by box height"""
+    pos = _STD_WEIGHT_POSITION * height
+    std = np.column_stack([pos, pos, np.full_like(height, 1e-1), pos])
+    return std ** 2
+
+
+def _diag(values):
+    """Stack rows of diagonal entries [N, K] into diagonal matrices [N, K, K]"""
+    matrices = np.zeros(values.shape + (values.shape[1],))
+    idx = np.arange(values.shape[1])
+    matrices[:, idx, idx] = values
+    return matrices
+
+
+class SortTrack:
+    """Read-only snapshot of one track, matching the deep_sort_realtime Track interface"""
+
+    __slots__ = ('track_id', 'det_class', 'det_conf', 'hits', 'age',
+                 'time_since_update', '_confirmed', '_ltrb')
+
+    def __init__(self, track_id, det_class, det_conf, hits, age, time_since_update, confirmed, ltrb):
+        self.track_id = track_id
+        self.det_class = det_class
+        self.det_conf = det_conf
+        self.hits = hits
+        self.age = age
+        self.time_since_update = time_since_update
+        self._confirmed = confirmed
+        self._ltrb = ltrb
+
+    def is_confirmed(self):
+        return self._confirmed
+
+    def is_tentative(self):
+        return not self._confirmed
+
+    def to_ltrb(self):
+        return self._ltrb
+
+    def to_ltwh(self):
+        x1, y1, x2, y2 = self._ltrb
+        return np.array([x1, y1, x2 - x1, y2 - y1])
+
+
+class SortTracker:
+    """IoU + Kalman tracker with a DeepSort-compatible ``update_tracks``"""
+
+    def __init__(self, max_age: int = 5, n_init: int = 3, iou_threshold: float = 0.3,
+                 high_threshold: float = 0.6, gating_threshold: Optional[float] = None):
+        self.max_age = max_age
+        self.n_init = n_init
+        self.iou_threshold = iou_threshold
+        # Detections below this confidence only extend existing tracks (ByteTrack second stage)
+        self.high_threshold = high_threshold
+        # Optional Mahalanobis gate on the Kalman innovation, e.g. CHI2_95_4DOF. Off by
+        # default: on IoU-only association it mostly rejects abrupt maneuvers
+        self.gating_threshold = gating_threshold
+        self._next_id = 1
+        self.delete_all_tracks()
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def delete_all_tracks(self):
+        # Struct-of-arrays track state, one row per live track
+        self.mean = np.zeros((0, 8))
+        self.covariance = np.zeros((0, 8, 8))
+        self.track_ids = np.zeros(0, dtype=np.int64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.age = np.zeros(0, dtype=np.int64)
+        self.time_since_update = np.zeros(0, dtype=np.int64)
+        self.confirmed = np.zeros(0, dtype=bool)
+        self.det_conf = np.zeros(0)
+        self.det_class = np.zeros(0, dtype=object)
+
+    def predict(self):
+        """Advance every track one frame"""
+        if not len(self):
+            return
+        motion_cov = _diag(_motion_noise(self.mean[:, 3]))
+        self.mean = self.mean @ _F.T
+        self.covariance = _F @ self.covariance @ _F.T + motion_cov
+        self.age += 1
+        self.time_since_update += 1
+
+    def _project(self, rows):
+        """Project the selected tracks into measurement space: (mean [K, 4], covariance [K, 4, 4])"""
+        mean = self.mean[rows, :4]
+        covariance = self.covariance[rows][:, :4, :4] + _diag(_measurement_noise(self.mean[rows, 3]))
+        return mean, covariance
+
+    def gating_distance(self, rows, measurements):
+        """Squared Mahalanobis distance [K, M] between the selected tracks and measurements"""
+        mean, covariance = self._project(rows)
+        innovation = measurements[None, :, :] - mean[:, None, :]
+        return np.einsum('kmi,kij,kmj->km', innovation, np.linalg.inv(covariance), innovation)
+
+    def update(self, rows, measurements, confidences, classes):
+        """Kalman-correct the selected tracks with their matched measurements"""
+        if len(rows) == 0:
+            return
+        mean, projected_cov = self._project(rows)
+        covariance = self.covariance[rows]
+        # K = P H^T S^-1, with H selecting the first four state components
+        gain = covariance[:, :, :4] @ np.linalg.inv(projected_cov)
+        innovation = measurements - mean
+        self.mean[rows] = self.mean[rows] + np.einsum('kij,kj->ki', gain, innovation)
+        self.covariance[rows] = covariance - gain @ projected_cov @ gain.transpose(0, 2, 1)
+
+        self.det_conf[rows] = confidences
+        self.det_class[rows] = classes
+        self.hits[rows] += 1
+        self.time_since_update[rows] = 0
+        self.confirmed[rows] |= self.hits[rows] >= self.n_init
+
+    def initiate(self, measurements, confidences, classes):
+        """Start new tentative tracks from unmatched measurements"""
+        count = len(measurements)
+        if count == 0:
+            return
+        height = measurements[:, 3]
+        pos = 2 * _STD_WEIGHT_POSITION * height
+        vel = 10 * _STD_WEIGHT_VELOCITY * height
+        std = np.column_stack([pos, pos, np.full_like(height, 1e-2), pos,
+                               vel, vel, np.full_like(height, 1e-5), vel])
+
+        self.mean = np.concatenate([self.mean, np.hstack([measurements, np.zeros((count, 4))])])
+        self.covariance = np.concatenate([self.covariance, _diag(std ** 2)])
+        self.track_ids = np.concatenate([self.track_ids, np.arange(self._next_id, self._next_id + count)])
+        self._next_id += count
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int64)])
+        self.age = np.concatenate([self.age, np.ones(count, dtype=np.int64)])
+        self.time_since_update = np.concatenate([self.time_since_update, np.zeros(count, dtype=np.int64)])
+        self.confirmed = np.concatenate([self.confirmed, np.full(count, self.n_init <= 1)])
+        self.det_conf = np.concatenate([self.det_conf, confidences])
+        self.det_class = np.concatenate([self.det_class, np.array(classes, dtype=object).reshape(-1)])
+
+    def _compact(self, keep):
+        """Drop the tracks whose mask entry is False"""
+        self.mean = self.mean[keep]
+        self.covariance = self.covariance[keep]
+        self.track_ids = self.track_ids[keep]
+        self.hits = self.hits[keep]
+        self.age = self.age[keep]
+        self.time_since_update = self.time_since_update[keep]
+        self.confirmed = self.confirmed[keep]
+        self.det_conf = self.det_conf[keep]
+        self.det_class = self.det_class[keep]
+
+    def associate(self, rows, measurements, boxes):
+        """Match the selected tracks to detections.
+
+        The IoU cost matrix and the Mahalanobis gate are computed for all
+        pairs at once; returns (matched_rows, matched_detections, unmatched_rows,
+        unmatched_detections) as index arrays.
+        """
+        rows = np.asarray(rows, dtype=int)
+        if len(rows) == 0 or len(boxes) == 0:
+            return (np.empty(0, dtype=int), np.empty(0, dtype=int),
+                    rows, np.arange(len(boxes)))
+
+        iou = iou_batch(xyah_to_ltrb(self.mean[rows]), boxes)
+        feasible = iou >= self.iou_threshold
+        if self.gating_threshold is not None:
+            feasible &= self.gating_distance(rows, measurements) <= self.gating_threshold
+        cost = np.where(feasible, 1.0 - iou, INFEASIBLE_COST)
+
+        pairs = linear_assignment(cost)
+        pairs = pairs[feasible[pairs[:, 0], pairs[:, 1]]]
+        unmatched_rows = np.setdiff1d(np.arange(len(rows)), pairs[:, 0])
+        unmatched_detections = np.setdiff1d(np.arange(len(boxes)), pairs[:, 1])
+        return rows[pairs[:, 0]], pairs[:, 1], rows[unmatched_rows], unmatched_detections
+
+    def update_tracks(self, raw_detections, embeds=None, frame=None, others=None, instance_masks=None):
+        """Advance all tracks one frame and associate the given detections.
+
+        ``embeds``, ``frame``, ``others`` and ``instance_masks`` are accepted for
+        DeepSort compatibility and ignored - this tracker is motion-only.
+        """
+        ltwh = np.array([bbox for bbox, _, _ in raw_detections], dtype=np.float64).reshape(-1, 4)
+        scores = np.array([conf for _, conf, _ in raw_detections], dtype=np.float64)
+        classes = np.empty(len(raw_detections), dtype=object)
+        classes[:] = [det_class for _, _, det_class in raw_detections]
+        measurements = ltwh_to_xyah(ltwh)
+        boxes = np.column_stack([ltwh[:, :2], ltwh[:, :2] + ltwh[:, 2:]])
+
+        self.predict()
+
+        high = np.flatnonzero(scores >= self.high_threshold)
+        low = np.flatnonzero(scores < self.high_threshold)
+
+        # First stage: all tracks against confident detections
+        matched_rows, matched_dets, leftover_rows, unmatched_high = self.associate(
+            np.arange(len(self)), measurements[high], boxes[high]
+        )
+        matched_dets = high[matched_dets]
+        self.update(matched_rows, measurements[matched_dets], scores[matched_dets], classes[matched_dets])
+
+        # Second stage: leftover tracks against low-confidence detections
+        matched_rows, matched_dets, _, _ = self.associate(leftover_rows, measurements[low], boxes[low])
+        matched_dets = low[matched_dets]
+        self.update(matched_rows, measurements[matched_dets], scores[matched_dets], classes[matched_dets])
+
+        # New tracks only from confident, unexplained detections
+        new = high[unmatched_high]
+        self.initiate(measurements[new], scores[new], classes[new])
+
+        # Tentative tracks die on their first miss, confirmed ones after max_age
+        self._compact(np.where(self.confirmed, self.time_since_update <= self.max_age,
+                               self.time_since_update == 0))
+        return self.snapshot()
+
+    def snapshot(self):
+        """Materialize the current tracks as SortTrack objects"""
+        ltrb = xyah_to_ltrb(self.mean)
+        return [
+            SortTrack(str(track_id), det_class, det_conf, hits, age, since_update, confirmed, box)
+            for track_id, det_class, det_conf, hits, age, since_update, confirmed, box in zip(
+                self.track_ids.tolist(), self.det_class, self.det_conf.tolist(), self.hits.tolist(),
+                self.age.tolist(), self.time_since_update.tolist(), self.confirmed.tolist(), ltrb
+            )
+        ]
@@ -0,0 +1,209 @@
+"""Video sources given as URIs, with automatic reconnect.
+
+Accepted forms for ``CAMERA_SOURCE``:
+
+* ``0``, ``1``, ... - local camera index
+* ``rtsp://``, ``rtmp://``, ``http(s)://``, ``udp://``, ``tcp://`` - network streams
+* ``file:///path/clip.mp4`` or a plain path - a video file, played in a loop
+  unless ``?loop=0`` is appended (the loop makes a file a stand-in camera)
+
+``ReconnectingSource`` wraps a capture backend from ``capture.py``. When a
+read fails it drops the capture and reopens it with exponential backoff,
+returning ``(False, None)`` in the meantime so the capture loop, model and
+tracker state stay up through the outage. Reconnects and gap durations are
+reported with the backend's frame counters.
+"""
+import logging
+import threading
+import time
+from typing import Optional, Tuple, Union
+from urllib.parse import parse_qs, unquote, urlsplit, urlunsplit
+
+from capture import is_network_source, open_capture
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RECONNECTS = REGISTRY.counter('drone_capture_reconnects_total', "Times a lost video source was reopened")
+OUTAGE_SECONDS = REGISTRY.histogram(
+    'drone_capture_outage_seconds', "Duration of video source outages",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600)
+)
+
+
+def parse_source(value: Union[int, str]) -> Tuple[Union[int, str], bool]:
+    """Turn a source URI into (capture source, loop at end of file)"""
+    if isinstance(value, int):
+        return value, False
+    value = value.strip()
+    if value.isdigit():
+        return int(value), False
+    if is_network_source(value):
+        return value, False
+    if value.startswith('file://'):
+        parts = urlsplit(value)
+        loop = parse_qs(parts.query).get('loop', ['1'])[0] not in ('0', 'false', 'no')
+        return unquote(parts.netloc + parts.path), loop
+    return value, True
+
+
+def redact_uri(source: Union[int, str]) -> str:
+    """Source for log messages, with any user:password removed"""
+    if not isinstance(source, str) or '@' not in source:
+        return str(source)
+    parts = urlsplit(source)
+    if not parts.password:
+        return source
+    host = parts.hostname + (f":{parts.port}" if parts.port else '')
+    return urlunsplit((parts.scheme, f"{parts.username}:***@{host}", parts.path, parts.query, parts.fragment))
+
+
+class ReconnectingSource:
+    """A capture that reopens its source with exponential backoff when reads fail"""
+
+    def __init__(self, uri: Union[int, str], backend: str = 'opencv', mode: Optional[str] = None,
+                 buffer_size: int = 2, output_size: Optional[Tuple[int, int]] = None,
+                 initial_backoff: float = 0.5, max_backoff: float = 30.0):
+        self.uri = uri
+        self.source, self.loop = parse_source(uri)
+        self.is_file = not isinstance(self.source, int) and not is_network_source(self.source)
+        self.backend = backend
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.output_size = output_size
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self.cap = None
+        self._got_frame = False  # since the last open
+        self.backoff = initial_backoff
+        self.exhausted = False  # a non-looping file reached its end
+        self._closed = threading.Event()
+
+        # Outage bookkeeping (monotonic seconds)
+        self.connects = 0
+        self.reconnects = 0
+        self.failed_attempts = 0
+        self.file_loops = 0
+        self.gap_started = None
+        self.last_gap_s = 0.0
+        self.max_gap_s = 0.0
+        self.total_gap_s = 0.0
+
+    def isOpened(self) -> bool:
+        return not self.exhausted and not self._closed.is_set()
+
+    def _open(self) -> bool:
+        cap = open_capture(self.source, backend=self.backend, mode=self.mode,
+                           buffer_size=self.buffer_size, output_size=self.output_size)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        self.cap = cap
+        self._got_frame = False
+        self.connects += 1
+        if self.connects > 1 and self.gap_started is not None:
+            self.reconnects += 1
+            RECONNECTS.inc()
+        logger.info(f"Opened video source {redact_uri(self.source)}")
+        return True
+
+    def _drop(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _end_gap(self):
+        gap = time.monotonic() - self.gap_started
+        self.gap_started = None
+        self.last_gap_s = gap
+        self.max_gap_s = max(self.max_gap_s, gap)
+        self.total_gap_s += gap
+        OUTAGE_SECONDS.observe(gap)
+        self.backoff = self.initial_backoff
+        logger.info(f"Video source {redact_uri(self.source)} recovered after {gap:.1f}s")
+
+    def queue_depth(self) -> int:
+        cap = self.cap
+        return cap.queue_depth() if cap is not None else 0
+
+    @property
+    def reads_into(self) -> bool:
+        """Whether read(image=...) fills the given array instead of allocating"""
+        cap = self.cap
+        return cap is not None and cap.reads_into
+
+    def read(self, image=None):
+        """Next frame, or (False, None) while the source is down or after it ended"""
+        while not self._closed.is_set() and not self.exhausted:
+            if self.cap is None and not self._open():
+                self.failed_attempts += 1
+                if self.gap_started is None:
+                    self.gap_started = time.monotonic()
+                if self.is_file and not self.loop:
+                    logger.error(f"Cannot open video file {self.source}")
+                    self.exhausted = True
+                    break
+                logger.warning(f"Video source {redact_uri(self.source)} unavailable, "
+                               f"retrying in {self.backoff:.1f}s")
+                # Interruptible by release()
+                self._closed.wait(self.backoff)
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                return False, None
+
+            ret, frame = self.cap.read(image)
+            if ret:
+                self._got_frame = True
+                if self.gap_started is not None:
+                    self._end_gap()
+                return True, frame
+
+            self._drop()
+            if self.is_file and (self._got_frame or not self.loop):
+                if not self.loop:
+                    logger.info(f"Reached end of {self.source}")
+                    self.exhausted = True
+                    break
+                # Rewind by reopening; not an outage
+                self.file_loops += 1
+                continue
+            if self.gap_started is None:
+                self.gap_started = time.monotonic()
+            if not self._got_frame:
+                # Opened but never delivered a frame: back off as if opening had failed,
+                # so a server that accepts and then drops connections isn't hammered
+                self.failed_attempts += 1
+                logger.warning(f"Video source {redact_uri(self.source)} dropped before the first frame, "
+                               f"retrying in {self.backoff:.1f}s")
+                self._closed.wait(self.backoff)
+                self.backoff = min(self.backoff * 2, self.max_backoff)
+                return False, None
+            logger.warning(f"Lost video source {redact_uri(self.source)}, reconnecting")
+            return False, None
+        return False, None
+
+    def interrupt(self):
+        """Make a pending or future read() return immediately (safe from other threads)"""
+        self._closed.set()
+
+    def release(self):
+        self.interrupt()
+        self._drop()
+
+    def get_stats(self):
+        cap = self.cap  # may be swapped by the capture thread meanwhile
+        stats = cap.get_stats() if cap is not None else {"backend": self.backend, "mode": self.mode}
+        current_gap = time.monotonic() - self.gap_started if self.gap_started is not None else 0.0
+        stats.update({
+            "source": redact_uri(self.source),
+            "connected": cap is not None,
+            "exhausted": self.exhausted,
+            "reconnects": self.reconnects,
+            "failed_attempts": self.failed_attempts,
+            "file_loops": self.file_loops,
+            "current_gap_s": current_gap,
+            "last_gap_s": self.last_gap_s,
+            "max_gap_s": self.max_gap_s,
+            "total_gap_s": self.total_gap_s,
+        })
+        return stats
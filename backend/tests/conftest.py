@@ -0,0 +1,26 @@
+"""Shared setup: backend modules on the path and a throwaway database.
+
+``database`` creates its engine from ``DATABASE_URL`` at import, so the URL
+is pointed at a temporary file before any test module imports it.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='drone-tests-')}/test.db"
+
+
+@pytest.fixture
+def db():
+    """Empty tables for one test"""
+    import models  # noqa: F401  (registers the tables)
+    from database import engine
+    from sqlmodel import SQLModel
+
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    yield engine
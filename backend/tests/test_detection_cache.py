@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+
+from detection_cache import DetectionCache
+
+
+def store(cache, key, frames):
+    writer = cache.writer(key)
+    for boxes in frames:
+        writer.append(boxes)
+    writer.commit({"fps": 25.0})
+
+
+def test_store_and_load_round_trip(tmp_path):
+    cache = DetectionCache(tmp_path)
+    frames = [
+        np.array([[1, 2, 3, 4, 0.9]], dtype=np.float32),
+        np.empty((0, 5), dtype=np.float32),
+        np.array([[5, 6, 7, 8, 0.5], [9, 10, 11, 12, 0.1]], dtype=np.float32),
+    ]
+    key = DetectionCache.key("video", "model", {"conf_floor": 0.05})
+    store(cache, key, frames)
+
+    cached = cache.load(key)
+    assert cached.frames == 3
+    assert cached.meta["fps"] == 25.0
+    for index, boxes in enumerate(frames):
+        np.testing.assert_array_equal(cached.frame_boxes(index), boxes)
+    assert cache.hits == 1
+
+
+def test_key_depends_on_every_input():
+    base = DetectionCache.key("video", "model", {"conf_floor": 0.05})
+    assert DetectionCache.key("video", "model", {"conf_floor": 0.05}) == base
+    assert DetectionCache.key("other", "model", {"conf_floor": 0.05}) != base
+    assert DetectionCache.key("video", "other", {"conf_floor": 0.05}) != base
+    assert DetectionCache.key("video", "model", {"conf_floor": 0.1}) != base
+
+
+def test_missing_entry_is_a_miss(tmp_path):
+    cache = DetectionCache(tmp_path)
+    assert cache.load("0" * 64) is None
+    assert cache.misses == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DetectionCache(tmp_path)
+    boxes = [np.ones((100, 5), dtype=np.float32)]
+    store(cache, "a" * 64, boxes)
+    entry_size = cache.get_stats()["bytes"]
+    cache.max_bytes = int(entry_size * 2.5)
+
+    store(cache, "b" * 64, boxes)
+    # Make "a" the most recently used, then push the cache over its size
+    for key, stamp in (("a" * 64, 2000), ("b" * 64, 1000)):
+        meta = tmp_path / key[:2] / key / "meta.json"
+        os.utime(meta, (stamp, stamp))
+    store(cache, "c" * 64, boxes)
+
+    assert cache.load("b" * 64) is None
+    assert cache.load("a" * 64) is not None
+    assert cache.load("c" * 64) is not None
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from detection_log import DetectionLogWriter, read_detection_log
+
+
+def write_log(path, frames, header=None):
+    writer = DetectionLogWriter(path, header or {"backend": "sort"})
+    for boxes, embeds in frames:
+        writer.write(boxes, embeds)
+    writer.close()
+    return writer
+
+
+def test_round_trip_with_and_without_embeddings(tmp_path):
+    path = tmp_path / "run.dlog"
+    frames = [
+        (np.array([[1, 2, 3, 4, 0.9], [5, 6, 7, 8, 0.4]], dtype=np.float32),
+         np.arange(8, dtype=np.float32).reshape(2, 4)),
+        (np.empty((0, 5), dtype=np.float32), None),
+        (np.array([[9, 10, 11, 12, 0.7]], dtype=np.float32), None),
+    ]
+    writer = write_log(path, frames, {"backend": "deepsort", "confidence_threshold": 0.5})
+    assert writer.frames == 3
+    assert writer.bytes_written == path.stat().st_size
+
+    header, read = read_detection_log(path)
+    assert header["backend"] == "deepsort"
+    assert header["confidence_threshold"] == 0.5
+    assert len(read) == 3
+    for (boxes, embeds), (_, read_boxes, read_embeds) in zip(frames, read):
+        np.testing.assert_array_equal(read_boxes, boxes)
+        if embeds is None:
+            assert read_embeds is None
+        else:
+            np.testing.assert_allclose(read_embeds, embeds)  # stored as float16
+
+
+def test_truncated_tail_drops_only_the_last_frame(tmp_path):
+    path = tmp_path / "crashed.dlog"
+    boxes = np.array([[1, 2, 3, 4, 0.9]], dtype=np.float32)
+    write_log(path, [(boxes, None)] * 3)
+    data = path.read_bytes()
+    path.write_bytes(data[:-7])  # cut mid-record, as a crash mid-write would
+
+    _, frames = read_detection_log(path)
+
+    assert len(frames) == 2
+    np.testing.assert_array_equal(frames[-1][1], boxes)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not-a-log.dlog"
+    path.write_bytes(b"something else")
+    with pytest.raises(ValueError):
+        read_detection_log(path)
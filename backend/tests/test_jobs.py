@@ -0,0 +1,122 @@
+import os
+import socket
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlmodel")
+
+from sqlmodel import Session  # noqa: E402
+
+from database import engine  # noqa: E402
+from jobs import JobManager  # noqa: E402
+from models import VideoJob  # noqa: E402
+
+
+@pytest.fixture
+def manager(db, tmp_path):
+    """A JobManager whose _run records admitted jobs instead of starting workers"""
+    manager = JobManager(tmp_path, cpu_budget=2, threads_per_job=1)
+    manager.admitted = []
+    manager._run = lambda job: manager.admitted.append(job.id)
+    manager._shared = {}
+    return manager
+
+
+def add_job(job_id, user="anonymous", priority=0, state="PENDING", owner=None, age=0):
+    with Session(engine) as session:
+        session.add(VideoJob(id=job_id, filename=f"{job_id}.mp4", path=f"/tmp/{job_id}.mp4", user=user,
+                             priority=priority, state=state, owner=owner,
+                             created_at=datetime.now() - timedelta(seconds=age)))
+        session.commit()
+
+
+def get_job(job_id):
+    with Session(engine) as session:
+        return session.get(VideoJob, job_id)
+
+
+def test_dispatch_admits_by_priority_then_age(manager):
+    add_job("old", age=30)
+    add_job("new", age=10)
+    add_job("urgent", priority=5, age=0)
+
+    manager._dispatch()
+
+    assert manager.admitted == ["urgent", "old"]
+    assert get_job("urgent").state == "STARTED"
+    assert get_job("urgent").owner == manager.owner
+    assert get_job("new").state == "PENDING"
+
+
+def test_dispatch_shares_slots_between_users(manager):
+    add_job("alice-running", user="alice", state="STARTED", owner=manager.owner)
+    add_job("alice-2", user="alice", age=60)
+    add_job("bob-1", user="bob", age=0)
+
+    manager._dispatch()
+
+    # One free slot; bob has nothing running, so his newer job goes first
+    assert manager.admitted == ["bob-1"]
+
+
+def test_dispatch_respects_live_reserve(manager):
+    manager.cpu_budget = 4
+    manager.live_reserve = lambda: 3
+    for i in range(3):
+        add_job(f"job-{i}", age=10 - i)
+
+    manager._dispatch()
+
+    assert manager.admitted == ["job-0"]
+
+
+def test_cancel_pending_job_is_never_admitted(manager):
+    add_job("doomed")
+
+    assert manager.cancel("doomed")
+    manager._dispatch()
+
+    assert manager.admitted == []
+    assert get_job("doomed").state == "REVOKED"
+
+
+def test_cancel_running_job_is_requested_not_revoked(manager):
+    add_job("busy", state="STARTED", owner="elsewhere:1")
+
+    assert manager.cancel("busy")
+
+    job = get_job("busy")
+    assert job.state == "STARTED"
+    assert job.cancel_requested
+    assert not manager.cancel("missing")
+
+
+def test_requeue_orphans(manager):
+    host = socket.gethostname()
+    add_job("dead-worker", state="STARTED", owner=f"{host}:99999999")
+    add_job("other-host", state="STARTED", owner="elsewhere:1")
+    add_job("live-worker", state="STARTED", owner=f"{host}:{os.getppid()}")
+
+    manager._requeue_orphans()
+
+    assert get_job("dead-worker").state == "PENDING"
+    assert get_job("dead-worker").owner is None
+    assert get_job("other-host").state == "PENDING"
+    assert get_job("live-worker").state == "STARTED"
+
+
+def test_shutdown_requeues_interrupted_jobs(manager):
+    add_job("interrupted", state="STARTED", owner=manager.owner)
+    add_job("user-cancelled", state="STARTED", owner=manager.owner)
+    manager.cancel("user-cancelled")
+    manager._stopping.set()
+
+    for job_id in ("interrupted", "user-cancelled"):
+        future = Future()
+        future.cancel()
+        manager._finish(job_id, future)
+
+    assert get_job("interrupted").state == "PENDING"
+    assert get_job("user-cancelled").state == "REVOKED"
@@ -0,0 +1,196 @@
+"""Cropped thumbnails of detections in a content-addressed disk cache.
+
+``ThumbnailWriter.submit()`` is called by the tracker when a drone gets its
+daily ID. It copies the padded box out of the frame (a few kilobytes) and
+hands it to a worker thread, which resizes and encodes it, stores it in the
+``ThumbnailCache`` and sets ``Detection.thumbnail`` to its key. If the
+worker is behind the crop is dropped, so the capture loop never waits.
+
+The key is the SHA-256 of the JPEG, so a thumbnail never changes once
+written: it is served with the key as ETag and cached by browsers for
+good. Files live at ``<root>/<key[:2]>/<key>.jpg``; serving one refreshes
+its mtime, and the least recently used go once the cache outgrows
+``max_bytes``, clearing ``Detection.thumbnail`` on the rows that used them.
+"""
+import hashlib
+import logging
+import os
+import queue
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+import cv2
+from sqlmodel import Session, col, update
+
+from database import engine
+from metrics import REGISTRY
+from models import Detection
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SUFFIX = '.jpg'
+_KEY_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+THUMBNAILS_SAVED = REGISTRY.counter('drone_thumbnails_saved_total', "Detection thumbnails written to the cache")
+THUMBNAILS_DROPPED = REGISTRY.counter('drone_thumbnails_dropped_total', "Thumbnails skipped because the writer was behind")
+THUMBNAILS_EVICTED = REGISTRY.counter('drone_thumbnails_evicted_total', "Thumbnails evicted to stay within the cache size")
+
+
+class ThumbnailCache:
+    """JPEGs keyed by their SHA-256, evicted least recently used first"""
+
+    def __init__(self, root, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # bytes on disk, counted on first put
+
+    def _file(self, key: str) -> Path:
+        return self.root / key[:2] / (key + THUMBNAIL_SUFFIX)
+
+    def path(self, key: str) -> Optional[Path]:
+        """File of a thumbnail, or None for a malformed or evicted key"""
+        if not _KEY_PATTERN.fullmatch(key):
+            return None
+        path = self._file(key)
+        try:
+            # Recency for eviction
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, jpeg: bytes) -> str:
+        key = hashlib.sha256(jpeg).hexdigest()
+        path = self._file(key)
+        if path.exists():
+            os.utime(path)
+            return key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.write-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(jpeg)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._entries())
+            else:
+                self._total += len(jpeg)
+        self._evict()
+        return key
+
+    def _entries(self):
+        for path in self.root.glob(f'*/*{THUMBNAIL_SUFFIX}'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # evicted concurrently
+            yield stat.st_mtime, stat.st_size, path
+
+    def _evict(self):
+        """Drop least recently used thumbnails until the cache fits ``max_bytes``"""
+        if not self.max_bytes or self._total <= self.max_bytes:
+            return
+        with self._lock:
+            entries = sorted(self._entries())
+            self._total = sum(size for _, size, _ in entries)
+            # Down to 90% so a full cache isn't rescanned on every put
+            target = self.max_bytes * 0.9
+            evicted = []
+            for _, size, path in entries:
+                if self._total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                self._total -= size
+                evicted.append(path.stem)
+                THUMBNAILS_EVICTED.inc()
+        if evicted:
+            # Rows would otherwise point at missing files
+            with Session(engine) as session:
+                session.exec(update(Detection).where(col(Detection.thumbnail).in_(evicted)).values(thumbnail=None))
+                session.commit()
+
+    def get_stats(self):
+        entries = list(self._entries())
+        return {
+            "root": str(self.root),
+            "thumbnails": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+class ThumbnailWriter:
+    """Encodes detection crops on its own thread and links them to their rows"""
+
+    def __init__(self, cache: ThumbnailCache, size: int = 128, jpeg_quality: int = 80,
+                 padding: float = 0.25, queue_size: int = 16):
+        self.cache = cache
+        self.size = size  # longest side in pixels
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.padding = padding  # context around the box, as a fraction of its size
+        self._crops = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    def start(self):
+        self.cache.root.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="thumbnails", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, bbox, detection_id: int):
+        """Queue the ``[x1, y1, x2, y2]`` region of ``frame`` as the thumbnail of a detection"""
+        if self._crops.full():
+            THUMBNAILS_DROPPED.inc()
+            return
+        x1, y1, x2, y2 = bbox
+        pad_x, pad_y = int((x2 - x1) * self.padding), int((y2 - y1) * self.padding)
+        height, width = frame.shape[:2]
+        x1, y1 = max(x1 - pad_x, 0), max(y1 - pad_y, 0)
+        x2, y2 = min(x2 + pad_x, width), min(y2 + pad_y, height)
+        if x2 <= x1 or y2 <= y1:
+            return
+        # Only the crop is copied here; the frame buffer goes back to the pool as usual
+        try:
+            self._crops.put_nowait((frame[y1:y2, x1:x2].copy(), detection_id))
+        except queue.Full:
+            THUMBNAILS_DROPPED.inc()
+
+    def _run(self):
+        while True:
+            item = self._crops.get()
+            if item is None:
+                return
+            crop, detection_id = item
+            try:
+                self._save(crop, detection_id)
+            except Exception as e:
+                logger.error(f"Could not save thumbnail of detection {detection_id}: {e}")
+
+    def _save(self, crop, detection_id: int):
+        height, width = crop.shape[:2]
+        scale = self.size / max(height, width)
+        if scale < 1:
+            crop = cv2.resize(crop, (max(round(width * scale), 1), max(round(height * scale), 1)),
+                              interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', crop, self.encode_params)
+        if not ok:
+            return
+        key = self.cache.put(encoded.tobytes())
+        with Session(engine) as session:
+            detection = session.get(Detection, detection_id)
+            if detection is None:
+                return  # deleted in the meantime
+            detection.thumbnail = key
+            session.add(detection)
+            session.commit()
+        THUMBNAILS_SAVED.inc()
+
+    def stop(self):
+        """Save the queued crops and stop the thread"""
+        if self._thread is not None:
+            self._crops.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
@@ -0,0 +1,114 @@
+"""Opt-in per-frame tracing and a sampling profiler for field diagnostics.
+
+``TRACER`` keeps the most recent pipeline spans (read, preprocess, infer,
+extract, track, bookkeep, draw, publish, persist and the enclosing frame) in
+a ring buffer and exports them as Chrome trace JSON, which chrome://tracing
+and https://ui.perfetto.dev open directly. Spans are recorded from
+``perf_counter`` timestamps the pipeline takes anyway, behind a single
+``TRACER.enabled`` check per frame, so tracing costs nothing measurable
+while it is off.
+
+``sample_stacks`` is a sampling profiler: a background thread snapshots the
+Python stacks of the pipeline threads every few milliseconds for a fixed
+duration and returns them in the folded format used by flamegraph.pl and
+speedscope.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Optional
+
+
+class Tracer:
+    """Ring buffer of completed spans"""
+
+    def __init__(self, capacity: int = 20000, enabled: bool = False):
+        self.enabled = enabled
+        self._spans = deque(maxlen=capacity)
+        self._pid = os.getpid()
+
+    @property
+    def capacity(self) -> int:
+        return self._spans.maxlen
+
+    def start(self, capacity: Optional[int] = None):
+        if capacity and capacity != self._spans.maxlen:
+            self._spans = deque(maxlen=capacity)
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def clear(self):
+        self._spans.clear()
+
+    def add(self, name: str, start: float, end: float, args: Optional[dict] = None):
+        """Record a span from two ``time.perf_counter()`` values; callers check ``enabled`` first"""
+        # deque.append with maxlen is atomic, so no lock on the hot path
+        self._spans.append((name, start, end, threading.get_ident(), args))
+
+    def snapshot(self):
+        """Copy of the buffered spans as (name, start, end, thread id, args) tuples"""
+        return list(self._spans)
+
+    def export_chrome_trace(self):
+        """Buffered spans as a Chrome trace event document (timestamps in microseconds)"""
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        events = []
+        seen_threads = set()
+        for name, start, end, tid, args in self.snapshot():
+            event = {
+                "name": name,
+                "cat": "pipeline",
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": self._pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+            seen_threads.add(tid)
+        for tid in seen_threads:
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                "args": {"name": thread_names.get(tid, str(tid))},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def get_stats(self):
+        return {"enabled": self.enabled, "spans": len(self._spans), "capacity": self.capacity}
+
+
+TRACER = Tracer()
+
+
+def _folded_stack(frame, max_depth: int = 128) -> str:
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, thread_ids=None) -> str:
+    """Sample thread stacks for ``seconds`` and return folded stacks ("a;b;c count" lines).
+
+    ``thread_ids`` limits sampling to those threads (e.g. the capture thread);
+    by default every thread except the sampler itself is sampled.
+    """
+    counts = Counter()
+    own_id = threading.get_ident()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for tid, frame in sys._current_frames().items():
+            if tid == own_id or (thread_ids is not None and tid not in thread_ids):
+                continue
+            counts[f"{thread_names.get(tid, tid)};{_folded_stack(frame)}"] += 1
+        time.sleep(interval)
+    return '\n'.join(f"{stack} {count}" for stack, count in counts.most_common()) + '\n'
@@ -2,17 +2,33 @@ import cv2
 import numpy as np
 import datetime
 from ultralytics import YOLO
-from deep_sort_realtime.deepsort_tracker import DeepSort
+from sort_tracker import SortTracker
+from tracker_config import create_tracker, detections_from_boxes, resolve_tracker_params
+from detection_log import LOG_SUFFIX, DetectionLogWriter
+from recorder import EventRecorder
+from archive import VideoArchive
+from thumbnails import ThumbnailWriter
+from memory import ndarray_bytes, process_rss_bytes
+from overlay import OverlayRenderer, scale_annotations
+from preprocess import PreparedFrame, Preprocessor
+from frame_pool import FrameBuffer, FramePool
+from contextlib import contextmanager
+from metrics import REGISTRY
+from tracing import TRACER
+from sources import ReconnectingSource, redact_uri
 import threading
 import json
 import os
 import queue
+import sys
 import time
 from sqlmodel import Session, select
 from database import engine
 from models import Detection, DetectionCreate
 from typing import Optional, Callable
 import asyncio
+import heapq
+from collections import OrderedDict
 import logging
 # Add this for device detection
 try:
@@ -27,37 +43,169 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pipeline metrics served at /metrics; stage children are looked up once
+STAGE_SECONDS = REGISTRY.histogram('drone_pipeline_stage_seconds', "Time spent in each pipeline stage", ['stage'])
+PREPROCESS_SECONDS = STAGE_SECONDS.labels('preprocess')
+INFERENCE_SECONDS = STAGE_SECONDS.labels('inference')
+TRACKER_UPDATE_SECONDS = STAGE_SECONDS.labels('tracker_update')
+BOOKKEEPING_SECONDS = STAGE_SECONDS.labels('bookkeeping')
+RENDER_SECONDS = STAGE_SECONDS.labels('render')
+JPEG_ENCODE_SECONDS = STAGE_SECONDS.labels('jpeg_encode')
+DB_WRITE_SECONDS = STAGE_SECONDS.labels('db_write')
+FRAME_SECONDS = REGISTRY.histogram('drone_frame_seconds', "Total processing time per frame")
+FRAMES_PROCESSED = REGISTRY.counter('drone_frames_processed_total', "Frames run through detection and tracking")
+DETECTIONS = REGISTRY.counter('drone_detections_total', "Detections above the confidence threshold")
+NEW_DRONES = REGISTRY.counter('drone_new_tracks_total', "Drones assigned a new daily ID")
+DB_WRITE_ERRORS = REGISTRY.counter('drone_db_write_errors_total', "Failed detection inserts")
+CAPTURE_FPS = REGISTRY.gauge('drone_capture_fps', "Frames per second through the capture loop, over the last second")
+CAPTURE_QUEUE_DEPTH = REGISTRY.gauge('drone_capture_queue_depth', "Decoded frames waiting to be processed")
+MJPEG_VIEWERS = REGISTRY.gauge('drone_mjpeg_viewers', "Connected /video viewers")
+TRACKED_OBJECTS = REGISTRY.gauge('drone_tracked_objects', "Tracks currently held in memory")
+PROCESS_RSS = REGISTRY.gauge('process_resident_memory_bytes', "Resident memory size in bytes")
+PROCESS_RSS.set_function(process_rss_bytes)
+
+def format_duration(seconds: float) -> str:
+    """Format a duration as H:MM:SS"""
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+class TrackRecord:
+    """Compact per-track state kept while a drone is in view.
+
+    ``start_time`` is wall-clock (stored in the database); ``first_seen`` and
+    ``last_seen`` are ``time.monotonic()`` values so durations and expiry are
+    unaffected by wall-clock jumps.
+    """
+    __slots__ = ('daily_id', 'start_time', 'first_seen', 'last_seen', 'center_x', 'center_y', 'confidence',
+                 'detection_id')
+    
+    def __init__(self, daily_id: int, start_time: datetime.datetime, seen_at: float,
+                 center_x: int, center_y: int, confidence: Optional[float] = None):
+        self.daily_id = daily_id
+        self.start_time = start_time
+        self.first_seen = seen_at
+        self.last_seen = seen_at
+        self.center_x = center_x
+        self.center_y = center_y
+        self.confidence = confidence
+        self.detection_id = None  # database row, once saved
+        
+    @property
+    def duration(self) -> float:
+        """Seconds between first and last sighting"""
+        return self.last_seen - self.first_seen
+
 class DroneTracker:
-    def __init__(self, model_path: str, confidence_threshold: float = 0.5):
+    def __init__(self, model_path: Optional[str], confidence_threshold: float = 0.5,
+                 inference_kwargs: Optional[dict] = None,
+                 persist_detections: bool = True,
+                 tracker_backend: str = 'deepsort',
+                 nn_budget: Optional[int] = 100,
+                 tracker_params: Optional[dict] = None,
+                 detection_log_dir: Optional[str] = None,
+                 detection_log_embeddings: bool = True,
+                 recorder: Optional[EventRecorder] = None,
+                 archive: Optional[VideoArchive] = None,
+                 thumbnails: Optional[ThumbnailWriter] = None,
+                 max_tracked_objects: int = 1000,
+                 memory_watermark_mb: float = 256.0,
+                 render_overlay: bool = True,
+                 input_size: int = 640,
+                 preview_width: Optional[int] = None,
+                 capture_source=0,
+                 capture_backend: str = 'opencv',
+                 capture_mode: Optional[str] = None,
+                 capture_buffer_size: int = 2,
+                 capture_output_size: Optional[tuple] = None,
+                 frame_pool_size: int = 4):
         # Initialize YOLO model
         self.device = 'cpu' #self._detect_device()
-        self.model = YOLO(model_path)
-        self.model.to(self.device)
+        # Without a model the tracker only accepts precomputed boxes (see process_frame)
+        self.model = YOLO(model_path) if model_path else None
+        # Exported models (ONNX, OpenVINO, ...) are bound to their runtime and can't be moved
+        if model_path and str(model_path).endswith('.pt'):
+            self.model.to(self.device)
         self.confidence_threshold = confidence_threshold
+        # Extra keyword arguments for every inference call, e.g. {'half': True}
+        self.inference_kwargs = inference_kwargs or {}
+        # Offline tools (evaluation, benchmarks) run the pipeline without touching the database
+        self.persist_detections = persist_detections
         
-        # Initialize DeepSORT tracker
-        self.tracker = DeepSort(
-            max_age=5,        # Keep tracks for 50 frames without detection          # Require 3 consecutive detections to confirm track
-            max_cosine_distance=0.4,  # Increase distance threshold
-            nn_budget=None,    # No limit on stored features
-            bgr=True,
-            
-
-            
-        )
+        # Letterbox once per frame and feed the model a ready tensor; needs torch
+        # for the tensor hand-off, otherwise YOLO preprocesses the raw frame itself
+        self.preprocessor = Preprocessor(input_size, preview_width) if TORCH_AVAILABLE else None
+        self.display_frame = None  # what the overlay was drawn on: the preview or the frame
+        self.last_boxes = None  # raw detections of the last frame, see extract_boxes
+        
+        # Initialize tracker backend ('deepsort' or the motion-only 'sort')
+        self.tracker_backend = tracker_backend
+        self.nn_budget = nn_budget
+        # max_age, n_init, ... (see tracker_config); tune them by replaying a detection log
+        self.tracker_params = resolve_tracker_params(tracker_params)
+        self.tracker = self._create_tracker()
+        # Raw detections (and DeepSORT embeddings) of each camera session go to a
+        # new log in this directory when set, for benchmarks/replay_tracking.py
+        self.detection_log_dir = detection_log_dir
+        self.detection_log_embeddings = detection_log_embeddings
+        self.detection_log: Optional[DetectionLogWriter] = None
+        # Pre/post-event clips of new drones, fed from the capture loop
+        self.recorder = recorder
+        # Continuous segmented recording of the annotated output
+        self.archive = archive
+        # Cropped thumbnail of each new drone, encoded and stored off the capture loop
+        self.thumbnails = thumbnails
         # Tracking variables
         self.daily_id_counter = 0
-        self.tracked_objects = {}
+        self.tracked_objects = {}  # {track_id: TrackRecord}
+        self.max_tracked_objects = max_tracked_objects
+        # Min-heap of (expiry deadline, track_id) in monotonic seconds; entries are
+        # refreshed lazily, so each frame only touches tracks whose deadline passed
+        self.inactive_timeout = 5.0
+        self._expiry_heap = []
+        # Records evicted by the cap while their tracks may still be in view, so a
+        # returning track keeps its daily ID instead of counting as a new drone
+        self._evicted = OrderedDict()  # {track_id: TrackRecord}, at most max_tracked_objects
+        
+        # Memory bookkeeping for long-running instances
+        self.memory_watermark_bytes = int(memory_watermark_mb * 1024 * 1024)
+        self.memory_check_interval = 300  # frames between watermark checks
+        self.frame_count = 0
+        self.peak_state_bytes = 0
+        self.watermark_trims = 0
         self.current_date = datetime.date.today()
         self.first_detection_alert_shown = False
         
+        # Annotation layer; can be switched off when nobody watches the output
+        self.render_overlay = render_overlay
+        self.overlay = OverlayRenderer(enabled=render_overlay)
+        
+        # MJPEG viewers; with none connected, frames are not annotated, copied or encoded
+        self.viewer_count = 0
+        self.viewer_lock = threading.Lock()
+        self.latest_jpeg = None
+        self.frame_seq = 0
+        
+        # Video input (see capture.py for backends and modes)
+        self.capture_source = capture_source
+        self.capture_backend = capture_backend
+        self.capture_mode = capture_mode
+        self.capture_buffer_size = capture_buffer_size
+        self.capture_output_size = capture_output_size
+        
         # Threading and streaming variables
         self.is_running = False
         self.thread = None
         self.cap = None
         self.frame_queue = queue.Queue(maxsize=10)
-        self.latest_frame = None
+        self.latest_frame = None  # FrameBuffer shared with consumers
         self.frame_lock = threading.Lock()
+        # Frames are read into recycled buffers: one in flight, one published
+        # as latest_frame, the rest for consumers still holding a view
+        self.frame_pool = FramePool(frame_pool_size)
+        
+        # Scrape-time gauges read straight from this instance
+        CAPTURE_QUEUE_DEPTH.set_function(lambda: self.cap.queue_depth() if self.cap else 0)
+        MJPEG_VIEWERS.set_function(lambda: self.viewer_count)
+        TRACKED_OBJECTS.set_function(lambda: len(self.tracked_objects))
         
         # Callback for new detections (WebSocket broadcasting)
         self.on_new_detection: Optional[Callable] = None
@@ -66,6 +214,28 @@ class DroneTracker:
         # Load existing daily data
         self.load_daily_data()
 
+    def _create_tracker(self):
+        """Create the configured multi-object tracker"""
+        if self.tracker_backend == 'sort':
+            logger.info(f"Using motion-only SORT tracker ({self.tracker_params})")
+        elif self.tracker_backend == 'deepsort':
+            logger.info(f"Using DeepSORT tracker (nn_budget={self.nn_budget}, {self.tracker_params})")
+        return create_tracker(self.tracker_backend, self.confidence_threshold, self.nn_budget, self.tracker_params)
+
+    def warm_up(self, runs: int = 1):
+        """Run inference on blank frames so the first camera frame doesn't pay
+        for lazy model setup (graph fusion, kernel selection, allocator growth).
+
+        Only the model is exercised; tracker state, metrics and the database
+        are left untouched.
+        """
+        size = self.preprocessor.input_size if self.preprocessor else 640
+        frame = np.zeros((size, size, 3), dtype=np.uint8)
+        for _ in range(runs):
+            prepared = self.preprocessor.prepare(frame) if self.preprocessor else None
+            model_input = torch.from_numpy(prepared.blob) if prepared else frame
+            self.model(model_input, verbose=False, device=self.device, **self.inference_kwargs)
+
     def _detect_device(self):
         """Detect the best available device for inference"""
         try:
@@ -100,6 +270,9 @@ class DroneTracker:
         
     def load_daily_data(self):
         """Load existing daily tracking data from database"""
+        if not self.persist_detections:
+            self.daily_id_counter = 0
+            return
         try:
             with Session(engine) as session:
                 # Get today's detections
@@ -126,35 +299,75 @@ class DroneTracker:
         center_y = int((y1 + y2) / 2)
         return center_x, center_y
         
-    def process_detections(self, results, frame):
+    def process_detections(self, results, frame, prepared: Optional[PreparedFrame] = None):
         """Process YOLO detections and prepare for DeepSORT tracking"""
-        detections = []
-        
+        return self.filter_detections(self.extract_boxes(results, prepared))
+
+    def extract_boxes(self, results, prepared: Optional[PreparedFrame] = None):
+        """All boxes the model returned as an (N, 5) float32 array of x1, y1, x2, y2, confidence
+        in frame pixels, before the confidence threshold (cacheable raw detections)"""
+        per_result = []
         for result in results:
             boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    confidence = float(box.conf[0])
-                    logger.debug(f"Detected box with confidence: {confidence}")
-                    
-                    if confidence and confidence >= self.confidence_threshold:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                        width = x2 - x1
-                        height = y2 - y1
-                        if width > 0 and height > 0:
-                            # DeepSort expects [x, y, w, h] format
-                            detection = ([x1, y1, width, height], confidence, 'drone')
-                            detections.append(detection)
-                            logger.debug(f"Valid detection: bbox=[{x1}, {y1}, {width}, {height}], conf={confidence:.3f}")
-                       
-                        
+            if boxes is None or len(boxes) == 0:
+                continue
+            xyxy = boxes.xyxy.cpu().numpy()
+            if prepared is not None:
+                # Inference ran on the letterboxed blob, map back to frame pixels
+                xyxy = prepared.to_frame_coords(xyxy)
+            per_result.append(np.column_stack((xyxy, boxes.conf.cpu().numpy())))
+        if not per_result:
+            return np.empty((0, 5), dtype=np.float32)
+        return np.concatenate(per_result).astype(np.float32)
+
+    def filter_detections(self, boxes):
+        """Apply the confidence threshold to raw boxes and convert them for the tracker"""
+        detections, _ = detections_from_boxes(boxes, self.confidence_threshold)
+        logger.debug(f"{len(detections)} of {len(boxes)} boxes passed the confidence threshold")
         return detections
+
+    def _log_detections(self, boxes, frame):
+        """Record a frame's raw boxes, and their embeddings when DeepSORT is used.
+
+        Returns the boxes the tracker should see, and the embeddings of the
+        ones that pass the threshold so DeepSORT doesn't compute them twice.
+        """
+        # Boxes with no area can't become detections at any threshold
+        candidates, keep = detections_from_boxes(boxes, 0.0)
+        boxes = boxes[keep]
+        embeds = None
+        if self.detection_log_embeddings and self.tracker_backend == 'deepsort' and frame is not None and len(boxes):
+            embeds = np.asarray(self.tracker.generate_embeds(frame, candidates), dtype=np.float32)
+        self.detection_log.write(boxes, embeds)
+        if embeds is None:
+            return boxes, None
+        _, passed = detections_from_boxes(boxes, self.confidence_threshold)
+        return boxes, list(embeds[passed])
+
+    def start_detection_log(self):
+        """Start a new detection log file in ``detection_log_dir``"""
+        self.stop_detection_log()
+        name = datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + LOG_SUFFIX
+        self.detection_log = DetectionLogWriter(os.path.join(self.detection_log_dir, name), {
+            "tracker_backend": self.tracker_backend,
+            "confidence_threshold": self.confidence_threshold,
+            "tracker_params": self.tracker_params,
+            "inference_kwargs": self.inference_kwargs,
+            "source": redact_uri(self.capture_source),
+        })
+        logger.info(f"Recording raw detections to {self.detection_log.path}")
+
+    def stop_detection_log(self):
+        log, self.detection_log = self.detection_log, None
+        if log is not None:
+            log.close()
+            logger.info(f"Detection log {log.path}: {log.frames} frames, {log.bytes_written / 1e6:.1f} MB")
         
     def save_detection_to_db(self, daily_id: int, center_x: int, center_y: int, 
-                           start_time: datetime.datetime, confidence: float = None):
-        """Save detection to database"""
+                           start_time: datetime.datetime, confidence: float = None) -> Optional[int]:
+        """Save detection to database and return its id"""
         print(daily_id,center_x,center_y,start_time,start_time.date(),confidence)
+        started = time.perf_counter()
         try:
             if confidence is None:
                 confidence = 0.5 
@@ -172,47 +385,70 @@ class DroneTracker:
                 session.add(detection)
                 session.commit()
                 logger.info(f"Saved detection {daily_id} to database")
+                return detection.id
                 
         except Exception as e:
+            DB_WRITE_ERRORS.inc()
             logger.error(f"Error saving detection to database: {e}")
+        finally:
+            finished = time.perf_counter()
+            DB_WRITE_SECONDS.observe(finished - started)
+            if TRACER.enabled:
+                TRACER.add("persist", started, finished, {"daily_id": daily_id})
             
-    def update_tracking_info(self, track_id, bbox, confidence=None):
-        """Update tracking information for each drone"""
-        current_time = datetime.datetime.now()
+    def update_tracking_info(self, track_id, bbox, confidence=None, now=None, frame=None):
+        """Update tracking information for each drone and return its record
+
+        ``now`` is a ``time.monotonic()`` timestamp shared by all tracks of a frame.
+        ``frame``, still without annotations, is where a new drone's thumbnail is cropped from.
+        """
+        if now is None:
+            now = time.monotonic()
         
-        if track_id not in self.tracked_objects:
+        record = self.tracked_objects.get(track_id)
+        if record is None and track_id in self._evicted:
+            # Evicted by the cap, not a new drone
+            record = self._evicted.pop(track_id)
+            record.last_seen = now
+            self.tracked_objects[track_id] = record
+            heapq.heappush(self._expiry_heap, (now + self.inactive_timeout, track_id))
+        elif record is None:
+            current_time = datetime.datetime.now()
             # New drone detected - assign daily ID
             self.daily_id_counter += 1
             center_x, center_y = self.get_bounding_box_center(bbox)
             
-            self.tracked_objects[track_id] = {
-                'daily_id': self.daily_id_counter,
-                'start_time': current_time,
-                'end_time': current_time,
-                'last_seen': current_time,
-                'center_x': center_x,
-                'center_y': center_y,
-                'confidence': confidence
-            }
+            record = TrackRecord(
+                self.daily_id_counter, current_time, now, center_x, center_y, confidence
+            )
+            self.tracked_objects[track_id] = record
+            NEW_DRONES.inc()
+            heapq.heappush(self._expiry_heap, (now + self.inactive_timeout, track_id))
             
             # Save to database
-            self.save_detection_to_db(
-                self.daily_id_counter, center_x, center_y, current_time, confidence
-            )
+            if self.persist_detections:
+                detection_id = record.detection_id = self.save_detection_to_db(
+                    self.daily_id_counter, center_x, center_y, current_time, confidence
+                )
+                if self.thumbnails is not None and frame is not None and detection_id is not None:
+                    self.thumbnails.submit(frame, bbox, detection_id)
             
             # Show first detection alert
             if self.daily_id_counter == 1:
                 self.show_first_detection_alert()
                 
+            detection_data = {
+                "event": "new_drone",
+                "daily_id": self.daily_id_counter,
+                "center": [center_x, center_y],
+                "timestamp": current_time.isoformat(),
+                "confidence": confidence
+            }
+            if self.recorder is not None:
+                self.recorder.trigger(detection_data)
+                
             # Trigger callback for WebSocket broadcasting
             if self.on_new_detection:
-                detection_data = {
-                    "event": "new_drone",
-                    "daily_id": self.daily_id_counter,
-                    "center": [center_x, center_y],
-                    "timestamp": current_time.isoformat(),
-                    "confidence": confidence
-                }
                 # Schedule callback in thread-safe manner
                 threading.Thread(target=self._async_callback, 
                                args=(self.on_new_detection, detection_data)).start()
@@ -221,8 +457,9 @@ class DroneTracker:
             
         else:
             # Update existing drone info
-            self.tracked_objects[track_id]['end_time'] = current_time
-            self.tracked_objects[track_id]['last_seen'] = current_time
+            record.last_seen = now
+            
+        return record
             
     def _async_callback(self, callback, data):
         """Execute callback in a thread-safe manner"""
@@ -244,110 +481,370 @@ class DroneTracker:
             logger.info("🚨 ALERT: First drone detected today! 🚨")
             self.first_detection_alert_shown = True
             
-    def draw_tracking_info(self, frame, tracks):
-        """Draw bounding boxes and tracking information on frame"""
-        for track in tracks:
-            if not track.is_confirmed():
-                continue
-            track_id = track.track_id
-            bbox = track.to_ltwh()
-            
-            x1 = int(bbox[0])
-            y1 = int(bbox[1])
-            x2 = int(bbox[0] + bbox[2])
-            y2 = int(bbox[1] + bbox[3])
+    def confirmed_track_boxes(self, tracks):
+        """Return ids, integer [x1, y1, x2, y2] boxes and centers of all confirmed tracks.
+
+        Box and center arithmetic is done once for the whole batch instead of
+        per track, which matters when dozens of targets are in frame.
+        """
+        confirmed = [track for track in tracks if track.is_confirmed()]
+        if not confirmed:
+            return [], np.empty((0, 4), dtype=int), np.empty((0, 2), dtype=int)
             
+        ltwh = np.array([track.to_ltwh() for track in confirmed], dtype=np.float64)
+        boxes = np.hstack([ltwh[:, :2], ltwh[:, :2] + ltwh[:, 2:]]).astype(int)
+        centers = ((boxes[:, :2] + boxes[:, 2:]) / 2).astype(int)
+        return [track.track_id for track in confirmed], boxes, centers
+        
+    def draw_tracking_info(self, frame, tracks):
+        """Update tracking information and collect the overlay annotations for each track
+
+        Labels are only formatted when the overlay is enabled; the overlay
+        renderer draws them (see process_frame).
+        """
+        track_ids, boxes, centers = self.confirmed_track_boxes(tracks)
+        now = time.monotonic()
+        render = self.overlay.enabled
+        annotations = []
+        
+        for track_id, (x1, y1, x2, y2), (center_x, center_y) in zip(track_ids, boxes.tolist(), centers.tolist()):
             # Update tracking info
-            self.update_tracking_info(track_id, [x1, y1, x2, y2])
+            info = self.update_tracking_info(track_id, [x1, y1, x2, y2], now=now, frame=frame)
             
-            center_x, center_y = self.get_bounding_box_center([x1, y1, x2, y2])
-            daily_id = self.tracked_objects[track_id]['daily_id']
-            start_time = self.tracked_objects[track_id]['start_time']
-            current_time = datetime.datetime.now()
-            duration = current_time - start_time
+            if render:
+                labels = (
+                    f"Drone ID: {info.daily_id}",
+                    f"Duration: {format_duration(info.duration)}",
+                    f"Center: ({center_x}, {center_y})",
+                )
+                annotations.append(((x1, y1, x2, y2), (center_x, center_y), labels))
+                
+        return annotations
             
-            # Draw bounding box
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    def cleanup_inactive_tracks(self, now=None):
+        """Remove tracks that haven't been seen for a while.
+
+        Pops only heap entries whose deadline has passed. A popped track that
+        was seen since it was pushed is re-armed with its new deadline instead
+        of being expired, so live tracks cost one heap push per timeout period.
+        """
+        if now is None:
+            now = time.monotonic()
             
-            # Draw center point
-            cv2.circle(frame, (center_x, center_y), 5, (0, 0, 255), -1)
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, track_id = heapq.heappop(heap)
+            info = self.tracked_objects.get(track_id)
+            if info is None:
+                continue
+            deadline = info.last_seen + self.inactive_timeout
+            if deadline > now:
+                heapq.heappush(heap, (deadline, track_id))
+            else:
+                self._expire_track(track_id)
+                
+        # Hard cap on records: evict the least recently seen beyond the limit
+        overflow = len(self.tracked_objects) - self.max_tracked_objects
+        if overflow > 0:
+            logger.warning(f"Tracked object cap ({self.max_tracked_objects}) exceeded, evicting {overflow} records")
+            oldest = heapq.nsmallest(overflow, self.tracked_objects.items(), key=lambda item: item[1].last_seen)
+            for track_id, _ in oldest:
+                self._evicted[track_id] = self.tracked_objects.pop(track_id)
+            while len(self._evicted) > self.max_tracked_objects:
+                _, record = self._evicted.popitem(last=False)
+                self.save_detection_end(record)
+                
+    def _expire_track(self, track_id):
+        """Drop a track record; its stale heap entry is skipped when popped"""
+        info = self.tracked_objects.pop(track_id)
+        logger.info(f"Drone ID {info.daily_id} left | Total Duration: {format_duration(info.duration)}")
+        self.save_detection_end(info)
+        
+    def save_open_track_ends(self):
+        """Store the end so far of every drone still held, e.g. when the camera stops"""
+        for record in list(self.tracked_objects.values()) + list(self._evicted.values()):
+            self.save_detection_end(record)
+        
+    def save_detection_end(self, record: TrackRecord):
+        """Store when a drone was last seen and how long it stayed on its database row"""
+        if not self.persist_detections or record.detection_id is None:
+            return
+        started = time.perf_counter()
+        try:
+            with Session(engine) as session:
+                detection = session.get(Detection, record.detection_id)
+                if detection is None:
+                    return  # deleted via the API meanwhile
+                detection.end_time = record.start_time + datetime.timedelta(seconds=record.duration)
+                detection.duration_seconds = int(record.duration)
+                session.add(detection)
+                session.commit()
+        except Exception as e:
+            DB_WRITE_ERRORS.inc()
+            logger.error(f"Error saving end of detection {record.daily_id}: {e}")
+        finally:
+            DB_WRITE_SECONDS.observe(time.perf_counter() - started)
+        
+    def _appearance_gallery(self):
+        """DeepSORT's per-track appearance feature store, or None for motion-only backends"""
+        metric = getattr(getattr(self.tracker, 'tracker', None), 'metric', None)
+        return getattr(metric, 'samples', None)
+        
+    def get_memory_stats(self):
+        """Report the approximate resident size of tracker state and the process RSS"""
+        records = list(self.tracked_objects.values())
+        record_bytes = sys.getsizeof(self.tracked_objects) + sum(
+            sys.getsizeof(r) + sys.getsizeof(r.start_time) for r in records
+        ) + sys.getsizeof(self._expiry_heap) + 64 * len(self._expiry_heap)
+        
+        gallery = self._appearance_gallery()
+        gallery_tracks = 0
+        gallery_features = 0
+        gallery_bytes = 0
+        if gallery is not None:
+            for features in list(gallery.values()):
+                gallery_tracks += 1
+                gallery_features += len(features)
+                gallery_bytes += ndarray_bytes(features)
+        # Pending features on DeepSORT tracks not yet folded into the gallery
+        for track in list(getattr(getattr(self.tracker, 'tracker', None), 'tracks', [])):
+            gallery_bytes += ndarray_bytes(getattr(track, 'features', []))
             
-            # Draw tracking information
-            info_text = f"Drone ID: {daily_id}"
-            time_text = f"Duration: {str(duration).split('.')[0]}"
-            center_text = f"Center: ({center_x}, {center_y})"
+        # Struct-of-arrays state of the motion-only tracker
+        backend_bytes = 0
+        if isinstance(self.tracker, SortTracker):
+            backend_bytes = ndarray_bytes(vars(self.tracker).values())
+        
+        state_bytes = record_bytes + gallery_bytes + backend_bytes
+        self.peak_state_bytes = max(self.peak_state_bytes, state_bytes)
+        return {
+            "tracked_objects": len(records),
+            "tracked_objects_bytes": record_bytes,
+            "gallery_tracks": gallery_tracks,
+            "gallery_features": gallery_features,
+            "gallery_bytes": gallery_bytes,
+            "tracker_backend_bytes": backend_bytes,
+            "tracker_state_bytes": state_bytes,
+            "peak_tracker_state_bytes": self.peak_state_bytes,
+            "memory_watermark_bytes": self.memory_watermark_bytes,
+            "watermark_trims": self.watermark_trims,
+            "frame_pool": self.frame_pool.get_stats(),
+            "process_rss_bytes": process_rss_bytes(),
+        }
+        
+    def enforce_memory_watermark(self):
+        """Trim appearance galleries when tracker state grows past the watermark"""
+        stats = self.get_memory_stats()
+        if stats["tracker_state_bytes"] <= self.memory_watermark_bytes:
+            return stats
             
-            cv2.putText(frame, info_text, (x1, y1-40), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            cv2.putText(frame, time_text, (x1, y1-25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-            cv2.putText(frame, center_text, (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+        gallery = self._appearance_gallery()
+        if gallery:
+            # Keep only the most recent features of every track
+            keep = max(1, (self.nn_budget or 100) // 2)
+            for track_id in list(gallery):
+                gallery[track_id] = gallery[track_id][-keep:]
+        self.watermark_trims += 1
+        logger.warning(
+            f"Tracker state {stats['tracker_state_bytes'] / 1e6:.1f} MB above watermark "
+            f"{self.memory_watermark_bytes / 1e6:.1f} MB, trimmed appearance galleries"
+        )
+        return self.get_memory_stats()
             
-    def cleanup_inactive_tracks(self):
-        """Remove tracks that haven't been seen for a while"""
-        current_time = datetime.datetime.now()
-        inactive_threshold = datetime.timedelta(seconds=5)
+    def process_frame(self, frame, boxes=None):
+        """Run detection, tracking and annotation on a single frame.
+
+        Annotations are drawn in place on the frame, or on the downscaled
+        preview when ``preview_width`` is set; ``display_frame`` is whichever
+        was drawn on.
+
+        ``boxes`` are raw detections from an earlier ``extract_boxes`` call
+        (e.g. a detection cache); preprocessing and inference are skipped and
+        only the threshold, tracking and annotation run. With the motion-only
+        tracker and the overlay off, ``frame`` may then be None.
+
+        Returns the detections handed to the tracker and the tracker's tracks,
+        so offline tools can score the exact same path the live camera uses.
+        """
+        self.frame_count += 1
+        if self.frame_count % self.memory_check_interval == 0:
+            self.enforce_memory_watermark()
+            
+        # Letterboxed model input and stream preview, built once for all consumers
+        started = time.perf_counter()
+        prepared = None
+        if boxes is None:
+            prepared = self.preprocessor.prepare(frame) if self.preprocessor else None
+            model_input = torch.from_numpy(prepared.blob) if prepared else frame
+        preprocessed = time.perf_counter()
         
-        inactive_tracks = []
-        for track_id, info in self.tracked_objects.items():
-            if current_time - info['last_seen'] > inactive_threshold:
-                inactive_tracks.append(track_id)
-                
-        for track_id in inactive_tracks:
-            info = self.tracked_objects[track_id]
-            total_duration = info['end_time'] - info['start_time']
-            logger.info(f"Drone ID {info['daily_id']} left | Total Duration: {str(total_duration).split('.')[0]}")
-            del self.tracked_objects[track_id]
+        # Run YOLO detection
+        if boxes is None:
+            results = self.model(model_input, verbose=False, device=self.device, **self.inference_kwargs)
+        detected = time.perf_counter()
+        
+        # Process detections for DeepSORT
+        if boxes is None:
+            boxes = self.extract_boxes(results, prepared)
+        embeds = None
+        if self.detection_log is not None:
+            boxes, embeds = self._log_detections(boxes, frame)
+        self.last_boxes = boxes
+        detections = self.filter_detections(boxes)
+        inferred = time.perf_counter()
+        
+        # Update tracker with detections
+        if embeds is not None:
+            tracks = self.tracker.update_tracks(detections, embeds=embeds, frame=frame)
+        else:
+            tracks = self.tracker.update_tracks(detections, frame=frame)
+        tracked = time.perf_counter()
+        
+        # Update tracking information and collect annotations
+        annotations = self.draw_tracking_info(frame, tracks) if tracks else []
             
+        # Cleanup inactive tracks
+        self.cleanup_inactive_tracks()
+        bookkept = time.perf_counter()
+        
+        # Draw boxes, labels and the status banner in one pass, on the preview if there is one
+        canvas = prepared.canvas if prepared else frame
+        if self.overlay.enabled:
+            if canvas is not frame:
+                annotations = scale_annotations(annotations, prepared.preview_scale)
+            status_text = f"Date: {self.current_date} | Drones detected today: {self.daily_id_counter}"
+            self.overlay.render(canvas, annotations, status_text)
+        self.display_frame = canvas
+        finished = time.perf_counter()
+        
+        PREPROCESS_SECONDS.observe(preprocessed - started)
+        INFERENCE_SECONDS.observe(inferred - preprocessed)
+        TRACKER_UPDATE_SECONDS.observe(tracked - inferred)
+        BOOKKEEPING_SECONDS.observe(bookkept - tracked)
+        if self.overlay.enabled:
+            RENDER_SECONDS.observe(finished - bookkept)
+        FRAME_SECONDS.observe(finished - started)
+        FRAMES_PROCESSED.inc()
+        DETECTIONS.inc(len(detections))
+        if TRACER.enabled:
+            TRACER.add("preprocess", started, preprocessed)
+            TRACER.add("infer", preprocessed, detected)
+            TRACER.add("extract", detected, inferred, {"detections": len(detections)})
+            TRACER.add("track", inferred, tracked, {"tracks": len(tracks)})
+            TRACER.add("bookkeep", tracked, bookkept)
+            if self.overlay.enabled:
+                TRACER.add("draw", bookkept, finished)
+            TRACER.add("frame", started, finished, {"frame": self.frame_count})
+        
+        return detections, tracks
+        
     def capture_frames(self):
         """Main camera capture loop running in separate thread"""
-        self.cap = cv2.VideoCapture(0)
+        # Reopens the source with backoff when it drops; files loop by default
+        self.cap = ReconnectingSource(
+            self.capture_source,
+            backend=self.capture_backend,
+            mode=self.capture_mode,
+            buffer_size=self.capture_buffer_size,
+            output_size=self.capture_output_size
+        )
         # self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
         # self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        
-        if not self.cap.isOpened():
-            logger.error("Failed to open camera")
-            self.is_running = False
-            return
             
-        logger.info("Camera started successfully")
+        logger.info(f"Camera started on source {redact_uri(self.capture_source)}")
+        if self.detection_log_dir:
+            try:
+                self.start_detection_log()
+            except OSError as e:
+                logger.error(f"Cannot record detections to {self.detection_log_dir}: {e}")
+        if self.recorder is not None:
+            self.recorder.start()
+        if self.archive is not None:
+            self.archive.start()
+        if self.thumbnails is not None:
+            self.thumbnails.start()
         
+        fps_window_start = time.monotonic()
+        fps_frames = 0
         while self.is_running:
             try:
                 # Check if date has changed
                 if datetime.date.today() != self.current_date:
                     self.current_date = datetime.date.today()
                     self.daily_id_counter = 0
+                    self.save_open_track_ends()
                     self.tracked_objects = {}
+                    self._expiry_heap = []
+                    self._evicted.clear()
                     self.first_detection_alert_shown = False
                     logger.info(f"New day started: {self.current_date}")
                     
-                ret, frame = self.cap.read()
+                # Read into a recycled buffer when the backend supports it
+                pooled = self.frame_pool.acquire() if self.cap.reads_into else None
+                read_started = time.perf_counter()
+                ret, frame = self.cap.read(pooled.array if pooled else None)
+                if TRACER.enabled:
+                    TRACER.add("read", read_started, time.perf_counter())
                 if not ret:
-                    logger.error("Failed to grab frame from webcam")
-                    break
+                    if pooled:
+                        pooled.release()
+                    if not self.cap.isOpened():
+                        logger.error("Video source ended")
+                        break
+                    # Source is down and reconnecting; keep the pipeline up and let tracks expire
+                    self.cleanup_inactive_tracks()
+                    continue
+                if pooled is None or frame is not pooled.array:
+                    if pooled:
+                        pooled.release()
+                    pooled = self.frame_pool.wrap(frame)
                     
-                # Run YOLO detection
-                results = self.model(frame, verbose=False,device=self.device)
-                
-                # Process detections for DeepSORT
-                detections = self.process_detections(results, frame)
-                
-                # Update tracker with detections
-                tracks = self.tracker.update_tracks(detections, frame=frame)
-                
-                # Draw tracking information
-                if tracks:
-                    self.draw_tracking_info(frame, tracks)
+                try:
+                    # Detection, tracking and events always run; drawing only when something shows the frame.
+                    # The recorder's pre-roll takes every frame, so with it on every frame is drawn and clips
+                    # never mix annotated and raw frames.
+                    watched = self.viewer_count > 0
+                    archived = self.archive is not None and self.archive.wants_frame()
+                    recording = self.recorder is not None
+                    self.overlay.enabled = self.render_overlay and (watched or archived or recording)
+                    self.process_frame(frame)
                     
-                # Cleanup inactive tracks
-                self.cleanup_inactive_tracks()
-                
-                # Add status information to frame
-                status_text = f"Date: {self.current_date} | Drones detected today: {self.daily_id_counter}"
-                cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-                
-                # Store latest frame for streaming
-                with self.frame_lock:
-                    self.latest_frame = frame.copy()
+                    # Encode once per frame for all viewers
+                    jpeg = None
+                    if watched:
+                        display_frame = self.display_frame
+                        shared = pooled.retain() if display_frame is frame else FrameBuffer(display_frame)
+                        encode_started = time.perf_counter()
+                        ret, buffer = cv2.imencode('.jpg', display_frame)
+                        JPEG_ENCODE_SECONDS.observe(time.perf_counter() - encode_started)
+                        with self.frame_lock:
+                            previous, self.latest_frame = self.latest_frame, shared
+                            if ret:
+                                jpeg = self.latest_jpeg = buffer.tobytes()
+                                self.frame_seq += 1
+                        if previous is not None:
+                            previous.release()
+                        if TRACER.enabled:
+                            TRACER.add("publish", encode_started, time.perf_counter())
+                    # Clips show what viewers see; the recorder encodes on its own thread unless they already did
+                    if recording:
+                        if jpeg is not None:
+                            self.recorder.push(jpeg=jpeg)
+                        else:
+                            display_frame = self.display_frame
+                            self.recorder.push(pooled.retain() if display_frame is frame else FrameBuffer(display_frame))
+                    if archived:
+                        display_frame = self.display_frame
+                        self.archive.push(pooled.retain() if display_frame is frame else FrameBuffer(display_frame), jpeg)
+                finally:
+                    pooled.release()
+                    
+                fps_frames += 1
+                elapsed = time.monotonic() - fps_window_start
+                if elapsed >= 1.0:
+                    CAPTURE_FPS.set(fps_frames / elapsed)
+                    fps_window_start += elapsed
+                    fps_frames = 0
                     
                 # Small delay to prevent overwhelming the system
                 time.sleep(0.011)  # ~30 FPS
@@ -359,15 +856,72 @@ class DroneTracker:
         # Cleanup
         if self.cap:
             self.cap.release()
+        # Records are kept so drones still in view after a restart keep their IDs
+        self.save_open_track_ends()
+        self.stop_detection_log()
+        if self.recorder is not None:
+            self.recorder.stop()
+        if self.archive is not None:
+            self.archive.stop()
+        if self.thumbnails is not None:
+            self.thumbnails.stop()
+        self._clear_latest_frame()
+        CAPTURE_FPS.set(0)
         logger.info("Camera capture stopped")
         
     def get_latest_frame(self):
-        """Get the latest frame for streaming"""
+        """Get a copy of the latest frame, for callers that keep it"""
+        with self.latest_frame_view() as frame:
+            return frame.copy() if frame is not None else None
+            
+    @contextmanager
+    def latest_frame_view(self):
+        """Read-only view of the latest frame without copying it, valid inside the with block"""
+        with self.frame_lock:
+            buffer = self.latest_frame.retain() if self.latest_frame is not None else None
+        try:
+            yield buffer.view() if buffer is not None else None
+        finally:
+            if buffer is not None:
+                buffer.release()
+                
+    def _clear_latest_frame(self):
+        with self.frame_lock:
+            previous, self.latest_frame = self.latest_frame, None
+            self.latest_jpeg = None
+        if previous is not None:
+            previous.release()
+            
+    def get_latest_jpeg(self):
+        """Get (sequence number, JPEG bytes) of the latest annotated frame"""
         with self.frame_lock:
-            if self.latest_frame is not None:
-                return self.latest_frame.copy()
-            return None
+            return self.frame_seq, self.latest_jpeg
+            
+    def add_viewer(self):
+        """Register an MJPEG viewer; annotation and encoding run while any are connected"""
+        with self.viewer_lock:
+            self.viewer_count += 1
+            logger.info(f"Viewer connected. Total viewers: {self.viewer_count}")
+            
+    def remove_viewer(self):
+        """Unregister an MJPEG viewer"""
+        with self.viewer_lock:
+            self.viewer_count = max(0, self.viewer_count - 1)
+            if self.viewer_count == 0:
+                # Don't hand a stale frame to the next viewer
+                self._clear_latest_frame()
+            logger.info(f"Viewer disconnected. Total viewers: {self.viewer_count}")
             
+    def get_render_stats(self):
+        """Overlay rendering cost and sprite cache statistics, plus connected viewers"""
+        return {**self.overlay.get_stats(), "viewers": self.viewer_count}
+
+    def get_capture_stats(self):
+        """Video source, decode backend, frame counters and reconnect statistics"""
+        if not self.cap:
+            return {"backend": self.capture_backend, "running": False}
+        return {**self.cap.get_stats(), "running": self.is_camera_running()}
+
     def start(self):
         """Start the camera capture in a separate thread"""
         if self.is_running:
@@ -375,7 +929,7 @@ class DroneTracker:
             return False
             
         self.is_running = True
-        self.thread = threading.Thread(target=self.capture_frames)
+        self.thread = threading.Thread(target=self.capture_frames, name="capture")
         self.thread.daemon = True
         self.thread.start()
         
@@ -399,6 +953,9 @@ class DroneTracker:
             return False
             
         self.is_running = False
+        # Wake the capture thread if it is waiting to reconnect
+        if self.cap:
+            self.cap.interrupt()
         
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=2)
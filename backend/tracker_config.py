@@ -0,0 +1,81 @@
+"""Multi-object tracker construction shared by the pipeline and offline tools.
+
+Kept apart from ``tracker.py`` so tools that only replay recorded
+detections (``benchmarks/replay_tracking.py``) don't load the model stack.
+"""
+from typing import Optional
+
+import numpy as np
+
+from sort_tracker import SortTracker
+
+TRACKER_BACKENDS = ('deepsort', 'sort')
+
+# Association parameters; max_age and n_init apply to both backends
+DEFAULT_TRACKER_PARAMS = {
+    'max_age': 5,                # frames a track survives without a detection
+    'n_init': 3,                 # consecutive detections needed to confirm a track
+    'max_cosine_distance': 0.4,  # DeepSORT appearance gate
+    'iou_threshold': 0.3,        # SORT association gate
+}
+
+
+def resolve_tracker_params(overrides: Optional[dict] = None) -> dict:
+    """Default association parameters with ``overrides`` applied"""
+    params = dict(DEFAULT_TRACKER_PARAMS)
+    for name, value in (overrides or {}).items():
+        if name not in params:
+            raise ValueError(f"Unknown tracker parameter '{name}', expected one of {tuple(params)}")
+        if value is not None:
+            params[name] = type(params[name])(value)
+    return params
+
+
+def detections_from_boxes(boxes: np.ndarray, confidence_threshold: float):
+    """Tracker input for raw (N, 5) x1, y1, x2, y2, confidence boxes.
+
+    Returns the ``([x, y, w, h], confidence, 'drone')`` detections above the
+    threshold with a positive pixel size, and the boolean mask of the boxes
+    they came from.
+    """
+    xyxy = boxes[:, :4].astype(int)
+    confidence = boxes[:, 4]
+    keep = ((confidence > 0) & (confidence >= confidence_threshold)
+            & (xyxy[:, 2] > xyxy[:, 0]) & (xyxy[:, 3] > xyxy[:, 1]))
+    detections = [
+        # DeepSort expects [x, y, w, h] format
+        ([x1, y1, x2 - x1, y2 - y1], conf, 'drone')
+        for (x1, y1, x2, y2), conf in zip(xyxy[keep].tolist(), confidence[keep].tolist())
+    ]
+    return detections, keep
+
+
+def create_tracker(backend: str, confidence_threshold: float = 0.5, nn_budget: Optional[int] = 100,
+                   params: Optional[dict] = None, embedder: Optional[str] = 'mobilenet'):
+    """Create a tracker with a DeepSort-style ``update_tracks``.
+
+    ``embedder=None`` builds a DeepSORT that expects precomputed embeddings,
+    as in a replay of a detection log.
+    """
+    params = resolve_tracker_params(params)
+    if backend == 'sort':
+        return SortTracker(
+            max_age=params['max_age'],
+            n_init=params['n_init'],
+            iou_threshold=params['iou_threshold'],
+            # Every detection that passed the confidence threshold may start a track;
+            # filter_detections drops the rest, so the low-score second stage stays empty
+            high_threshold=confidence_threshold
+        )
+    if backend == 'deepsort':
+        # Imported here so the SORT backend never pays for DeepSORT's embedder stack
+        from deep_sort_realtime.deepsort_tracker import DeepSort
+        return DeepSort(
+            max_age=params['max_age'],
+            n_init=params['n_init'],
+            max_cosine_distance=params['max_cosine_distance'],
+            nn_budget=nn_budget,  # Appearance features kept per track, None = unbounded
+            embedder=embedder,
+            bgr=True,
+        )
+    raise ValueError(f"Unknown tracker backend '{backend}', expected one of {TRACKER_BACKENDS}")
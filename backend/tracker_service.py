@@ -0,0 +1,519 @@
+"""Tracker in its own process, shared by several API workers over a Unix socket.
+
+With ``TRACKER_MODE=remote`` the API doesn't load the model itself. Run
+
+    python tracker_service.py
+
+once, then as many API workers as needed (``uvicorn main:app --workers 4``).
+The service owns the camera, model and tracker state and listens on
+``TRACKER_SOCKET``. Each API worker (``TrackerClient``) holds two
+connections:
+
+* a request connection for commands (start/stop, stats, tracing), one JSON
+  request and reply at a time
+* a subscription the service pushes to: tracker events for /ws, a state
+  heartbeat every second and, while the worker has /video viewers, each
+  newly encoded JPEG. Frames are latest-wins per subscriber, so a slow
+  worker skips frames instead of holding up the others.
+
+Messages are length-prefixed: a kind byte (``j`` JSON, ``f`` frame), a
+4-byte big-endian length and the payload; a frame payload is an 8-byte
+sequence number followed by the JPEG bytes.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from metrics import REGISTRY
+from tracing import TRACER, sample_stacks
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('!cI')
+SEQ = struct.Struct('!q')
+JSON_MESSAGE = b'j'
+FRAME_MESSAGE = b'f'
+STATE_INTERVAL = 1.0  # seconds between state heartbeats
+FRAME_POLL_INTERVAL = 0.005
+
+
+class TrackerServiceError(RuntimeError):
+    """The tracker service is unreachable or rejected a request"""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Connection closed")
+        received += count
+    return bytes(buffer)
+
+
+def recv_message(sock: socket.socket):
+    """Next (kind, payload) from the socket"""
+    kind, length = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return kind, _recv_exact(sock, length)
+
+
+def send_message(sock: socket.socket, kind: bytes, *parts: bytes):
+    sock.sendall(HEADER.pack(kind, sum(len(p) for p in parts)))
+    for part in parts:
+        sock.sendall(part)
+
+
+def send_json(sock: socket.socket, obj):
+    send_message(sock, JSON_MESSAGE, json.dumps(obj).encode())
+
+
+class _Subscriber:
+    """One API worker's push connection: queued events plus the latest frame"""
+
+    def __init__(self, service: 'TrackerService', conn: socket.socket):
+        self.service = service
+        self.conn = conn
+        self.viewers = 0
+        self._cond = threading.Condition()
+        self._messages = deque(maxlen=1000)
+        self._frame = None
+        self._closed = False
+
+    def push(self, message: dict):
+        with self._cond:
+            self._messages.append(message)
+            self._cond.notify()
+
+    def push_frame(self, seq: int, jpeg: bytes):
+        with self._cond:
+            self._frame = (seq, jpeg)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        try:
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.conn.close()
+
+    def _write_loop(self):
+        try:
+            while True:
+                with self._cond:
+                    while not self._closed and not self._messages and self._frame is None:
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    messages = list(self._messages)
+                    self._messages.clear()
+                    frame, self._frame = self._frame, None
+                for message in messages:
+                    send_json(self.conn, message)
+                if frame is not None:
+                    send_message(self.conn, FRAME_MESSAGE, SEQ.pack(frame[0]), frame[1])
+        except OSError:
+            self.close()
+
+    def run(self):
+        """Write pushes on a helper thread and read viewer counts here until disconnect"""
+        threading.Thread(target=self._write_loop, name="tracker-subscriber", daemon=True).start()
+        try:
+            while True:
+                _, payload = recv_message(self.conn)
+                message = json.loads(payload)
+                if message.get('op') == 'viewers':
+                    self.service.set_viewers(self, int(message['count']))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.service.set_viewers(self, 0)
+            self.close()
+
+
+class TrackerService:
+    """Serves one DroneTracker to any number of API workers"""
+
+    def __init__(self, socket_path: str, state: dict):
+        self.socket_path = socket_path
+        self.state = state  # model load progress, shared with the loader
+        self.tracker = None
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def attach(self, tracker):
+        """Start serving a loaded tracker"""
+        def publish(data):
+            self.publish({'event': data})
+
+        tracker.set_callbacks(publish, publish)
+        with self._lock:
+            self.tracker = tracker
+            # Workers that had viewers while the model was loading
+            for subscriber in self._subscribers:
+                if subscriber.viewers:
+                    tracker.add_viewer()
+        self.publish({'state': self.camera_state()})
+
+    def publish(self, message: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(message)
+
+    def camera_state(self) -> dict:
+        tracker = self.tracker
+        return {
+            "status": self.state.get("status"),
+            "is_running": tracker.is_camera_running() if tracker else False,
+            "total_detections_today": tracker.get_today_detection_count() if tracker else 0,
+        }
+
+    def set_viewers(self, subscriber: _Subscriber, count: int):
+        """Register a worker's /video viewers with the tracker as one viewer while it has any"""
+        with self._lock:
+            had, subscriber.viewers = subscriber.viewers > 0, count
+            if self.tracker is None or had == (count > 0):
+                return
+            if count > 0:
+                self.tracker.add_viewer()
+            else:
+                self.tracker.remove_viewer()
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # left behind by a previous run
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen(64)
+        logger.info(f"Tracker service listening on {self.socket_path}")
+        threading.Thread(target=self._publish_loop, name="tracker-publisher", daemon=True).start()
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return  # closed
+            threading.Thread(target=self._handle, args=(conn,), name="tracker-connection", daemon=True).start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def _handle(self, conn: socket.socket):
+        try:
+            _, payload = recv_message(conn)
+            message = json.loads(payload)
+            if message.get('op') == 'subscribe':
+                subscriber = _Subscriber(self, conn)
+                with self._lock:
+                    self._subscribers.add(subscriber)
+                subscriber.push({'state': self.camera_state()})
+                self.set_viewers(subscriber, int(message.get('viewers', 0)))
+                try:
+                    subscriber.run()
+                finally:
+                    with self._lock:
+                        self._subscribers.discard(subscriber)
+                return
+            while True:
+                send_json(conn, self._dispatch(message))
+                _, payload = recv_message(conn)
+                message = json.loads(payload)
+        except (OSError, ValueError):
+            pass
+        finally:
+            conn.close()
+
+    def _dispatch(self, message: dict) -> dict:
+        handler = getattr(self, f"op_{message.get('op')}", None)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown operation '{message.get('op')}'"}
+        try:
+            return {"ok": True, "result": handler(**message.get('args', {}))}
+        except TrackerServiceError as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Tracker service operation {message.get('op')} failed: {e}", exc_info=True)
+            return {"ok": False, "error": str(e)}
+
+    def _publish_loop(self):
+        """Fan each newly encoded frame out to workers with viewers, plus a state heartbeat"""
+        last_seq = None
+        next_state = time.monotonic()
+        while True:
+            tracker = self.tracker
+            if tracker is not None:
+                seq, jpeg = tracker.get_latest_jpeg()
+                if jpeg is not None and seq != last_seq:
+                    last_seq = seq
+                    with self._lock:
+                        watching = [s for s in self._subscribers if s.viewers]
+                    for subscriber in watching:
+                        subscriber.push_frame(seq, jpeg)
+            if time.monotonic() >= next_state:
+                next_state += STATE_INTERVAL
+                self.publish({'state': self.camera_state()})
+            time.sleep(FRAME_POLL_INTERVAL)
+
+    def _require_tracker(self):
+        if self.tracker is None:
+            raise TrackerServiceError("Tracker not initialized")
+        return self.tracker
+
+    # Operations, called as op_<name>(**args) from _dispatch
+
+    def op_ready(self):
+        return dict(self.state)
+
+    def op_start(self):
+        started = self._require_tracker().start()
+        return {"started": started, "state": self.camera_state()}
+
+    def op_stop(self):
+        stopped = self._require_tracker().stop()
+        return {"stopped": stopped, "state": self.camera_state()}
+
+    def op_memory(self):
+        return self._require_tracker().get_memory_stats()
+
+    def op_render(self):
+        return self._require_tracker().get_render_stats()
+
+    def op_capture(self):
+        return self._require_tracker().get_capture_stats()
+
+    def op_metrics(self, exclude=()):
+        # The API worker renders the families it registers itself (``import main`` registers
+        # them here too); a family appearing twice makes Prometheus reject the whole scrape
+        return REGISTRY.render(exclude=exclude)
+
+    def op_trace_start(self, capacity=None):
+        TRACER.start(capacity)
+        return TRACER.get_stats()
+
+    def op_trace_stop(self):
+        TRACER.stop()
+        return TRACER.get_stats()
+
+    def op_trace_export(self):
+        return TRACER.export_chrome_trace()
+
+    def op_profile(self, seconds, interval):
+        tracker = self.tracker
+        thread_ids = None
+        if tracker and tracker.thread and tracker.thread.is_alive():
+            thread_ids = {tracker.thread.ident}
+        return sample_stacks(seconds, interval, thread_ids)
+
+
+class TrackerClient:
+    """An API worker's view of the tracker service, with DroneTracker's serving methods"""
+
+    thread = None  # the capture thread lives in the service process
+
+    def __init__(self, socket_path: str, on_event: Optional[Callable[[dict], None]] = None,
+                 timeout: float = 10.0):
+        self.socket_path = socket_path
+        self.on_event = on_event
+        self.timeout = timeout
+        self.connected = False
+        self.state = {}
+
+        self._request_sock = None
+        self._request_lock = threading.Lock()
+        self._subscription = None
+        self._subscription_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        self.viewer_count = 0
+        self.viewer_lock = threading.Lock()
+        self.frame_lock = threading.Lock()
+        self.frame_seq = 0
+        self.latest_jpeg = None
+
+    def connect(self):
+        """Start following the service; reconnects in the background whenever it goes away"""
+        threading.Thread(target=self._subscribe_loop, name="tracker-subscription", daemon=True).start()
+
+    def close(self):
+        self._closed.set()
+        for sock in (self._request_sock, self._subscription):
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+
+    def _open(self, timeout: Optional[float]) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def call(self, op: str, timeout: Optional[float] = None, **args):
+        """Run one operation in the service and return its result"""
+        with self._request_lock:
+            # A kept-open connection may predate a service restart; retry once on a fresh one,
+            # but only if the request never went out, so start/stop can't run twice
+            for attempt in range(2):
+                reused = self._request_sock is not None
+                sent = False
+                try:
+                    if self._request_sock is None:
+                        self._request_sock = self._open(self.timeout)
+                    self._request_sock.settimeout(timeout or self.timeout)
+                    send_json(self._request_sock, {"op": op, "args": args})
+                    sent = True
+                    _, payload = recv_message(self._request_sock)
+                    break
+                except OSError as e:
+                    if self._request_sock is not None:
+                        self._request_sock.close()
+                        self._request_sock = None
+                    if sent or not reused or attempt:
+                        raise TrackerServiceError(f"Tracker service unavailable: {e}") from e
+        reply = json.loads(payload)
+        if not reply["ok"]:
+            raise TrackerServiceError(reply["error"])
+        return reply["result"]
+
+    def _subscribe_loop(self):
+        backoff = 0.5
+        while not self._closed.is_set():
+            try:
+                sock = self._open(self.timeout)
+                sock.settimeout(None)
+                with self._subscription_lock:
+                    self._subscription = sock
+                    send_json(sock, {"op": "subscribe", "viewers": self.viewer_count})
+                self.connected = True
+                backoff = 0.5
+                logger.info(f"Connected to tracker service at {self.socket_path}")
+                while True:
+                    kind, payload = recv_message(sock)
+                    if kind == FRAME_MESSAGE:
+                        with self.frame_lock:
+                            self.frame_seq = SEQ.unpack_from(payload)[0]
+                            self.latest_jpeg = payload[SEQ.size:]
+                        continue
+                    message = json.loads(payload)
+                    if 'state' in message:
+                        self.state = message['state']
+                    elif 'event' in message and self.on_event:
+                        self.on_event(message['event'])
+            except (OSError, ValueError) as e:
+                if self.connected and not self._closed.is_set():
+                    logger.warning(f"Lost the tracker service: {e}")
+                self.connected = False
+                with self._subscription_lock:
+                    self._subscription = None
+                with self.frame_lock:
+                    self.latest_jpeg = None
+                self._closed.wait(backoff)
+                backoff = min(backoff * 2, 10.0)
+
+    def _send_viewers(self):
+        with self._subscription_lock:
+            if self._subscription is None:
+                return  # sent with the next subscribe
+            try:
+                send_json(self._subscription, {"op": "viewers", "count": self.viewer_count})
+            except OSError:
+                pass  # the subscription loop reconnects
+
+    def ready_state(self) -> dict:
+        try:
+            return self.call("ready")
+        except TrackerServiceError as e:
+            return {"status": "unavailable", "error": str(e)}
+
+    def is_camera_running(self):
+        return self.connected and self.state.get("is_running", False)
+
+    def get_today_detection_count(self):
+        return self.state.get("total_detections_today", 0)
+
+    def start(self):
+        reply = self.call("start")
+        self.state = reply["state"]
+        # Another worker may have started it since our last heartbeat
+        return reply["started"] or self.state["is_running"]
+
+    def stop(self):
+        reply = self.call("stop")
+        self.state = reply["state"]
+        return reply["stopped"] or not self.state["is_running"]
+
+    def get_latest_jpeg(self):
+        with self.frame_lock:
+            return self.frame_seq, self.latest_jpeg
+
+    def add_viewer(self):
+        with self.viewer_lock:
+            self.viewer_count += 1
+            if self.viewer_count == 1:
+                self._send_viewers()
+
+    def remove_viewer(self):
+        with self.viewer_lock:
+            self.viewer_count = max(0, self.viewer_count - 1)
+            if self.viewer_count == 0:
+                self._send_viewers()
+                with self.frame_lock:
+                    self.latest_jpeg = None
+
+    def get_memory_stats(self):
+        return self.call("memory")
+
+    def get_render_stats(self):
+        return self.call("render")
+
+    def get_capture_stats(self):
+        return self.call("capture")
+
+
+def main():
+    import main as api  # configuration lives with the API
+    from database import create_db_and_tables
+
+    create_db_and_tables()
+    service = TrackerService(api.TRACKER_SOCKET, api.model_state)
+    threading.Thread(target=service.serve_forever, name="tracker-service", daemon=True).start()
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    tracker = api.build_tracker()
+    if tracker is not None:
+        service.attach(tracker)
+        api.model_state["status"] = "ready"
+    stopping.wait()
+
+    logger.info("Tracker service shutting down...")
+    if tracker and tracker.is_camera_running():
+        tracker.stop()
+    service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Synthetic scaling benchmark for the batched SORT tracking core.
+
+Simulates N targets flying with smoothly varying velocities inside a
+1920x1080 frame, with detection jitter and random misses, and feeds the
+detections to ``SortTracker.update_tracks``. No model or video is needed,
+so this isolates association (IoU cost matrix, gating, assignment) and the
+Kalman predict/update as the number of simultaneous targets grows:
+
+    python benchmarks/association_scaling.py --targets 1 10 50 100 250 500
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import count_id_switches, format_table, latency_summary
+
+from sort_tracker import CHI2_95_4DOF, SortTracker
+
+FRAME_WIDTH, FRAME_HEIGHT = 1920, 1080
+
+
+def simulate(num_targets, num_frames, miss_rate, jitter, seed):
+    """Yield (detections, ground_truth) per frame for a synthetic swarm"""
+    rng = np.random.default_rng(seed)
+    size = rng.uniform(20, 60, size=(num_targets, 2))
+    position = rng.uniform([0, 0], [FRAME_WIDTH, FRAME_HEIGHT], size=(num_targets, 2))
+    velocity = rng.normal(0, 4, size=(num_targets, 2))
+
+    for _ in range(num_frames):
+        velocity += rng.normal(0, 0.3, size=velocity.shape)
+        position += velocity
+        # Bounce off the frame edges so targets stay in view
+        for axis, limit in ((0, FRAME_WIDTH), (1, FRAME_HEIGHT)):
+            out = (position[:, axis] < 0) | (position[:, axis] > limit)
+            velocity[out, axis] *= -1
+            position[:, axis] = np.clip(position[:, axis], 0, limit)
+
+        ground_truth = [
+            (gt_id, [x - w / 2, y - h / 2, x + w / 2, y + h / 2])
+            for gt_id, ((x, y), (w, h)) in enumerate(zip(position.tolist(), size.tolist()))
+        ]
+        observed = position + rng.normal(0, jitter, size=position.shape)
+        visible = rng.random(num_targets) >= miss_rate
+        confidence = rng.uniform(0.5, 0.95, size=num_targets)
+        detections = [
+            ([x - w / 2, y - h / 2, w, h], conf, 'drone')
+            for (x, y), (w, h), conf in zip(observed[visible].tolist(), size[visible].tolist(),
+                                            confidence[visible].tolist())
+        ]
+        yield detections, ground_truth
+
+
+def run(num_targets, args):
+    """Track one synthetic scene and return timing and identity statistics"""
+    tracker = SortTracker(gating_threshold=CHI2_95_4DOF if args.gating else None)
+    samples, ground_truth, hypotheses = [], {}, {}
+
+    scene = simulate(num_targets, args.frames, args.miss_rate, args.jitter, args.seed)
+    for frame_index, (detections, truth) in enumerate(scene):
+        start = time.perf_counter()
+        tracks = tracker.update_tracks(detections)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if frame_index >= args.warmup:
+            samples.append(elapsed_ms)
+
+        ground_truth[frame_index] = truth
+        hypotheses[frame_index] = [
+            (track.track_id, list(track.to_ltrb()))
+            for track in tracks
+            if track.is_confirmed() and track.time_since_update == 0
+        ]
+
+    latency = latency_summary(samples)
+    result = {'targets': num_targets, 'update': latency}
+    result.update(count_id_switches(hypotheses, ground_truth))
+    result['us_per_target'] = latency['mean_ms'] * 1000 / num_targets
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', type=int, nargs='+', default=[1, 5, 10, 50, 100, 250, 500])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--miss-rate', type=float, default=0.05, help="Probability a target is not detected")
+    parser.add_argument('--jitter', type=float, default=1.5, help="Detection center noise (pixels)")
+    parser.add_argument('--gating', action='store_true', help="Enable chi-square 95%% Mahalanobis gating")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', type=Path, help="Write full results to this file")
+    args = parser.parse_args(argv)
+
+    results = [run(n, args) for n in args.targets]
+
+    rows = [{
+        'targets': r['targets'],
+        'mean_ms': r['update']['mean_ms'],
+        'p99_ms': r['update']['p99_ms'],
+        'us/target': r['us_per_target'],
+        'id_sw': r['id_switches'],
+    } for r in results]
+    print(format_table(rows, ['targets', 'mean_ms', 'p99_ms', 'us/target', 'id_sw']))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Shared helpers for the offline evaluation and benchmark scripts.
+
+The scripts in this directory drive the real backend pipeline, so this module
+puts ``backend/`` on the import path the same way ``uvicorn main:app`` does
+when started from that directory.
+"""
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = REPO_ROOT / 'backend'
+DEFAULT_CLIP = REPO_ROOT / 'V_DRONE_FIRST_4_MIN.mp4'
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def run_pipeline(tracker, video, max_frames=None, warmup=5):
+    """Feed a clip through ``DroneTracker.process_frame`` and collect its output.
+
+    Returns (predictions, hypotheses, latencies_ms, frame_count) where
+    predictions are the detections handed to the tracker, hypotheses the
+    confirmed tracks updated on each frame, and latencies exclude the first
+    ``warmup`` frames.
+    """
+    cap = cv2.VideoCapture(str(video))
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video {video}")
+
+    predictions, hypotheses, latencies = {}, {}, []
+    frame_index = 0
+    try:
+        while max_frames is None or frame_index < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            start = time.perf_counter()
+            detections, tracks = tracker.process_frame(frame)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if frame_index >= warmup:
+                latencies.append(elapsed_ms)
+
+            predictions[frame_index] = [
+                (confidence, [x, y, x + w, y + h]) for (x, y, w, h), confidence, _ in detections
+            ]
+            hypotheses[frame_index] = [
+                (track.track_id, list(track.to_ltrb()))
+                for track in tracks
+                if track.is_confirmed() and track.time_since_update == 0
+            ]
+            frame_index += 1
+    finally:
+        cap.release()
+
+    return predictions, hypotheses, latencies, frame_index
+
+
+def synthetic_scene(num_targets, num_frames, width, height, seed=0):
+    """Yield [(target_id, [x1, y1, x2, y2]), ...] per frame for a swarm of smoothly moving targets"""
+    rng = np.random.default_rng(seed)
+    size = rng.uniform(16, 48, size=(num_targets, 2))
+    position = rng.uniform([0, 0], [width, height], size=(num_targets, 2))
+    velocity = rng.normal(0, 3, size=(num_targets, 2))
+
+    for _ in range(num_frames):
+        velocity += rng.normal(0, 0.2, size=velocity.shape)
+        position += velocity
+        # Bounce off the frame edges so targets stay in view
+        for axis, limit in ((0, width), (1, height)):
+            out = (position[:, axis] < 0) | (position[:, axis] > limit)
+            velocity[out, axis] *= -1
+            position[:, axis] = np.clip(position[:, axis], 0, limit)
+        yield [
+            (target_id, [x - w / 2, y - h / 2, x + w / 2, y + h / 2])
+            for target_id, ((x, y), (w, h)) in enumerate(zip(position.tolist(), size.tolist()))
+        ]
+
+
+def write_synthetic_clip(path, num_targets, num_frames=300, width=1280, height=720, fps=30, seed=0):
+    """Render dark drone-like blobs over a sky gradient into ``path`` and return the ground truth.
+
+    The ground truth is {frame_index: [(target_id, [x1, y1, x2, y2]), ...]}, the
+    same shape ``load_mot_ground_truth`` returns.
+    """
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot write {path}")
+    sky = np.empty((height, width, 3), dtype=np.uint8)
+    sky[:] = np.linspace((235, 206, 160), (250, 240, 225), height, dtype=np.uint8)[:, None, :]
+
+    ground_truth = {}
+    try:
+        for frame_index, targets in enumerate(synthetic_scene(num_targets, num_frames, width, height, seed)):
+            frame = sky.copy()
+            for _, (x1, y1, x2, y2) in targets:
+                center = (int((x1 + x2) / 2), int((y1 + y2) / 2))
+                axes = (max(int((x2 - x1) / 2), 1), max(int((y2 - y1) / 4), 1))
+                cv2.ellipse(frame, center, axes, 0, 0, 360, (40, 40, 40), -1)
+            writer.write(frame)
+            ground_truth[frame_index] = targets
+    finally:
+        writer.release()
+    return ground_truth
+
+
+def write_mot_ground_truth(path, ground_truth):
+    """Write {frame_index: [(id, [x1, y1, x2, y2]), ...]} as a MOTChallenge gt.txt"""
+    with open(path, 'w') as f:
+        for frame_index in sorted(ground_truth):
+            for target_id, (x1, y1, x2, y2) in ground_truth[frame_index]:
+                f.write(f"{frame_index + 1},{target_id},{x1:.2f},{y1:.2f},{x2 - x1:.2f},{y2 - y1:.2f},1\n")
+
+
+def load_mot_ground_truth(path):
+    """Load a MOTChallenge style ``gt.txt`` into {frame_index: [(gt_id, [x1, y1, x2, y2]), ...]}
+
+    Rows are ``frame, id, left, top, width, height[, conf, ...]`` with 1-based
+    frame numbers. Rows whose conf column is 0 are "ignore" regions and skipped.
+    """
+    ground_truth = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            fields = [float(v) for v in line.split(',')]
+            if len(fields) > 6 and fields[6] == 0:
+                continue
+            frame_index = int(fields[0]) - 1
+            left, top, width, height = fields[2:6]
+            ground_truth[frame_index].append((int(fields[1]), [left, top, left + width, top + height]))
+    return dict(ground_truth)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two sets of [x1, y1, x2, y2] boxes"""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+def average_precision(predictions, ground_truth, iou_threshold=0.5):
+    """Single-class AP with all-point interpolation.
+
+    predictions: {frame_index: [(confidence, [x1, y1, x2, y2]), ...]}
+    ground_truth: {frame_index: [(gt_id, [x1, y1, x2, y2]), ...]}
+    """
+    total_gt = sum(len(objects) for objects in ground_truth.values())
+    if total_gt == 0:
+        return 0.0
+
+    ranked = sorted(
+        ((confidence, frame_index, box)
+         for frame_index, frame_predictions in predictions.items()
+         for confidence, box in frame_predictions),
+        key=lambda item: -item[0]
+    )
+    matched = {frame_index: np.zeros(len(objects), dtype=bool) for frame_index, objects in ground_truth.items()}
+    true_positives = np.zeros(len(ranked))
+
+    for rank, (_, frame_index, box) in enumerate(ranked):
+        objects = ground_truth.get(frame_index)
+        if not objects:
+            continue
+        ious = iou_matrix([box], [gt_box for _, gt_box in objects])[0]
+        ious[matched[frame_index]] = 0.0
+        best = int(np.argmax(ious))
+        if ious[best] >= iou_threshold:
+            matched[frame_index][best] = True
+            true_positives[rank] = 1
+
+    cumulative_tp = np.cumsum(true_positives)
+    recall = cumulative_tp / total_gt
+    precision = cumulative_tp / np.arange(1, len(ranked) + 1)
+
+    # Precision envelope, then area under the stepwise PR curve
+    recall = np.concatenate(([0.0], recall, [1.0]))
+    precision = np.concatenate(([1.0], precision, [0.0]))
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.where(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+def mean_average_precision(predictions, ground_truth):
+    """AP@0.5 and COCO-style AP@[0.5:0.95] for a single-class detector"""
+    thresholds = np.arange(0.5, 0.96, 0.05)
+    per_threshold = [average_precision(predictions, ground_truth, t) for t in thresholds]
+    return {'map50': per_threshold[0], 'map50_95': float(np.mean(per_threshold))}
+
+
+def count_id_switches(hypotheses, ground_truth, iou_threshold=0.5):
+    """Count CLEAR-MOT identity switches of tracker output against ground truth.
+
+    hypotheses: {frame_index: [(track_id, [x1, y1, x2, y2]), ...]}
+    A ground-truth object keeps its previous track if they still overlap;
+    otherwise it is greedily matched by IoU, and matching a different track
+    than last time counts as one switch.
+    """
+    last_match = {}
+    switches = 0
+    matches = 0
+
+    for frame_index in sorted(set(ground_truth) | set(hypotheses)):
+        objects = ground_truth.get(frame_index, [])
+        tracks = hypotheses.get(frame_index, [])
+        if not objects or not tracks:
+            continue
+
+        ious = iou_matrix([box for _, box in objects], [box for _, box in tracks])
+        track_ids = [track_id for track_id, _ in tracks]
+        free_objects = set(range(len(objects)))
+        free_tracks = set(range(len(tracks)))
+
+        # Keep existing correspondences first
+        for i, (gt_id, _) in enumerate(objects):
+            previous = last_match.get(gt_id)
+            if previous in track_ids:
+                j = track_ids.index(previous)
+                if j in free_tracks and ious[i, j] >= iou_threshold:
+                    free_objects.discard(i)
+                    free_tracks.discard(j)
+                    matches += 1
+
+        # Greedy IoU matching for the rest
+        for flat in np.argsort(-ious, axis=None):
+            i, j = np.unravel_index(flat, ious.shape)
+            if ious[i, j] < iou_threshold:
+                break
+            if i not in free_objects or j not in free_tracks:
+                continue
+            free_objects.discard(i)
+            free_tracks.discard(j)
+            matches += 1
+            gt_id = objects[i][0]
+            if gt_id in last_match and last_match[gt_id] != track_ids[j]:
+                switches += 1
+            last_match[gt_id] = track_ids[j]
+
+    return {'id_switches': switches, 'matches': matches}
+
+
+def count_fragmentations(hypotheses, ground_truth, iou_threshold=0.5):
+    """Count CLEAR-MOT fragmentations: a ground-truth object that was tracked,
+    lost, and tracked again (by any track ID) counts once per interruption.
+    """
+    tracked_before = set()
+    interrupted = set()
+    fragmentations = 0
+
+    for frame_index in sorted(ground_truth):
+        objects = ground_truth[frame_index]
+        tracks = hypotheses.get(frame_index, [])
+        ious = iou_matrix([box for _, box in objects], [box for _, box in tracks])
+        covered = set()
+        if ious.size:
+            # Greedy one-to-one IoU matching, as in count_id_switches
+            free_tracks = set(range(len(tracks)))
+            for flat in np.argsort(-ious, axis=None):
+                i, j = np.unravel_index(flat, ious.shape)
+                if ious[i, j] < iou_threshold:
+                    break
+                if objects[i][0] in covered or j not in free_tracks:
+                    continue
+                covered.add(objects[i][0])
+                free_tracks.discard(j)
+
+        for gt_id, _ in objects:
+            if gt_id in covered:
+                if gt_id in interrupted:
+                    fragmentations += 1
+                    interrupted.discard(gt_id)
+                tracked_before.add(gt_id)
+            elif gt_id in tracked_before:
+                interrupted.add(gt_id)
+
+    return {'fragmentations': fragmentations}
+
+
+def latency_summary(samples_ms):
+    """Summarize a list of latencies (milliseconds) into the percentiles we report"""
+    if not samples_ms:
+        return {'count': 0}
+    values = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        'count': int(values.size),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p90_ms': float(np.percentile(values, 90)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def format_table(rows, columns):
+    """Render a list of dicts as a fixed-width text table"""
+    widths = {c: max(len(c), *(len(_format_cell(r.get(c))) for r in rows)) for c in columns}
+    lines = ['  '.join(c.ljust(widths[c]) for c in columns)]
+    lines.append('  '.join('-' * widths[c] for c in columns))
+    for row in rows:
+        lines.append('  '.join(_format_cell(row.get(c)).ljust(widths[c]) for c in columns))
+    return '\n'.join(lines)
+
+
+def _format_cell(value):
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return '-' if value is None else str(value)
@@ -0,0 +1,108 @@
+"""Compare video decode throughput of the capture backends.
+
+Decodes the clip with plain ``cv2.VideoCapture`` (the tracker's original
+path) and with each ``capture.py`` backend/mode, optionally resizing to the
+model input size at decode time. ``--work-ms`` simulates per-frame
+detection time on the reading thread, which shows how much of the decode
+the threaded PyAV backend hides behind inference:
+
+    python benchmarks/decode.py --output-size 640x640 --work-ms 20
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+from common import DEFAULT_CLIP, format_table
+
+from capture import PYAV_AVAILABLE, open_capture, parse_frame_size
+
+
+def decode_baseline(video, max_frames, output_size, work_ms):
+    """The tracker's original capture loop: cv2.VideoCapture.read() on the calling thread"""
+    cap = cv2.VideoCapture(str(video))
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video {video}")
+    frames = 0
+    start = time.perf_counter()
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if output_size is not None:
+                frame = cv2.resize(frame, output_size, interpolation=cv2.INTER_AREA)
+            if work_ms:
+                time.sleep(work_ms / 1000)
+            frames += 1
+    finally:
+        cap.release()
+    return frames, time.perf_counter() - start, 0
+
+
+def decode_backend(video, backend, mode, buffer_size, max_frames, output_size, work_ms):
+    cap = open_capture(str(video), backend=backend, mode=mode, buffer_size=buffer_size,
+                       output_size=output_size)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video {video}")
+    frames = 0
+    start = time.perf_counter()
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, _ = cap.read()
+            if not ret:
+                break
+            if work_ms:
+                time.sleep(work_ms / 1000)
+            frames += 1
+        elapsed = time.perf_counter() - start
+        dropped = cap.get_stats()['frames_dropped']
+    finally:
+        cap.release()
+    return frames, elapsed, dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--video', type=Path, default=DEFAULT_CLIP)
+    parser.add_argument('--max-frames', type=int)
+    parser.add_argument('--output-size', help="Resize at decode time, e.g. 640x640")
+    parser.add_argument('--buffer-size', type=int, default=4)
+    parser.add_argument('--work-ms', type=float, default=0.0, help="Simulated per-frame processing time")
+    parser.add_argument('--json', type=Path, help="Write full results to this file")
+    args = parser.parse_args(argv)
+
+    output_size = parse_frame_size(args.output_size)
+    runs = [('cv2.VideoCapture', lambda: decode_baseline(args.video, args.max_frames, output_size, args.work_ms))]
+    backends = [('opencv', 'throughput')]
+    if PYAV_AVAILABLE:
+        backends += [('pyav', 'throughput'), ('pyav', 'latency')]
+    else:
+        print("PyAV is not installed, skipping the pyav backend", file=sys.stderr)
+    for backend, mode in backends:
+        runs.append((f'{backend}/{mode}', lambda b=backend, m=mode: decode_backend(
+            args.video, b, m, args.buffer_size, args.max_frames, output_size, args.work_ms)))
+
+    results = []
+    for name, run in runs:
+        frames, elapsed, dropped = run()
+        results.append({
+            'backend': name,
+            'frames': frames,
+            'dropped': dropped,
+            'seconds': elapsed,
+            'fps': frames / elapsed if elapsed else 0.0,
+        })
+
+    print(format_table(results, ['backend', 'frames', 'dropped', 'seconds', 'fps']))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
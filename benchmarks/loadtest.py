@@ -0,0 +1,277 @@
+"""Load test for the FastAPI server: MJPEG viewers, WebSocket subscribers and queries.
+
+Opens N concurrent ``/video`` readers and M ``/ws`` subscribers and issues
+``/detections`` queries at a fixed (open-loop) rate for a set duration,
+then reports:
+
+* frame delivery rate per viewer (and bytes/s)
+* WebSocket notification latency for ``new_drone`` events (server event
+  timestamp to client receipt; client and server must share a clock, i.e.
+  run on the same machine) and ping/pong round trips
+* query latency percentiles and error counts
+
+``--spawn-server`` starts uvicorn with a file-based fake camera (the demo
+clip, looped) and starts the camera, so the numbers don't depend on
+hardware. Otherwise point ``--url`` at a running server.
+
+    python benchmarks/loadtest.py --spawn-server --viewers 10 --subscribers 50 --query-rate 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from common import BACKEND_DIR, DEFAULT_CLIP, format_table, latency_summary
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+BOUNDARY = b'--frame\r\n'
+
+
+async def http_request(url, method='GET', timeout=10.0):
+    """Minimal HTTP/1.1 request over asyncio streams; returns (status, body)"""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+    try:
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                     f"Content-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1]) if head else 0
+    return status, body
+
+
+async def mjpeg_viewer(base_url, deadline, stats):
+    """Read /video until the deadline, counting multipart frames as they arrive"""
+    parts = urlsplit(base_url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    frames = 0
+    received = 0
+    first_frame_at = None
+    try:
+        writer.write(f"GET /video HTTP/1.1\r\nHost: {parts.netloc}\r\n\r\n".encode())
+        await writer.drain()
+        tail = b''
+        while time.monotonic() < deadline:
+            try:
+                chunk = await asyncio.wait_for(reader.read(65536), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            if not chunk:
+                break
+            received += len(chunk)
+            # Boundaries may straddle reads, so search the previous tail too
+            data = tail + chunk
+            count = data.count(BOUNDARY)
+            if count and first_frame_at is None:
+                first_frame_at = time.monotonic()
+            frames += count
+            tail = data[-(len(BOUNDARY) - 1):]
+    finally:
+        writer.close()
+    stats.append({'frames': frames, 'bytes': received, 'first_frame_at': first_frame_at})
+
+
+async def ws_subscriber(base_url, deadline, ping_interval, stats):
+    """Subscribe to /ws, timing new_drone events and periodic ping round trips"""
+    ws_url = base_url.replace('http://', 'ws://', 1).rstrip('/') + '/ws'
+    event_latencies, ping_rtts = [], []
+    messages = 0
+    async with websockets.connect(ws_url, max_size=None) as websocket:
+        next_ping = time.monotonic()
+        ping_sent = None
+        while time.monotonic() < deadline:
+            if ping_sent is None and time.monotonic() >= next_ping:
+                ping_sent = time.perf_counter()
+                await websocket.send('ping')
+            # Wake up for the next ping unless one is still in flight
+            wake_at = min(deadline, next_ping) if ping_sent is None else deadline
+            try:
+                raw = await asyncio.wait_for(websocket.recv(), max(wake_at - time.monotonic(), 0.01))
+            except asyncio.TimeoutError:
+                continue
+            received_at = datetime.now()
+            messages += 1
+            message = json.loads(raw)
+            event = message.get('event')
+            if event == 'pong' and ping_sent is not None:
+                ping_rtts.append((time.perf_counter() - ping_sent) * 1000)
+                ping_sent = None
+                next_ping = time.monotonic() + ping_interval
+            elif event == 'new_drone' and message.get('timestamp'):
+                sent_at = datetime.fromisoformat(message['timestamp'])
+                event_latencies.append((received_at - sent_at).total_seconds() * 1000)
+    stats.append({'messages': messages, 'event_latencies': event_latencies, 'ping_rtts': ping_rtts})
+
+
+async def query_load(base_url, deadline, rate, paths, stats):
+    """Fire queries at a fixed rate regardless of how fast responses come back (open loop)"""
+    async def one(path):
+        started = time.perf_counter()
+        try:
+            status, _ = await http_request(base_url.rstrip('/') + path)
+        except (OSError, asyncio.TimeoutError):
+            status = 0
+        stats.append({'path': path, 'status': status, 'latency_ms': (time.perf_counter() - started) * 1000})
+
+    pending = []
+    interval = 1.0 / rate
+    next_at = time.monotonic()
+    index = 0
+    while next_at < deadline:
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        pending.append(asyncio.create_task(one(paths[index % len(paths)])))
+        index += 1
+        next_at += interval
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def run_load(args):
+    deadline = time.monotonic() + args.duration
+    viewer_stats, subscriber_stats, query_stats = [], [], []
+    tasks = [mjpeg_viewer(args.url, deadline, viewer_stats) for _ in range(args.viewers)]
+    if args.subscribers:
+        if not WEBSOCKETS_AVAILABLE:
+            raise SystemExit("The websockets package is required for --subscribers")
+        tasks += [ws_subscriber(args.url, deadline, args.ping_interval, subscriber_stats)
+                  for _ in range(args.subscribers)]
+    if args.query_rate > 0:
+        tasks.append(query_load(args.url, deadline, args.query_rate, args.query_paths, query_stats))
+
+    started = time.monotonic()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.monotonic() - started
+    failures = [repr(o) for o in outcomes if isinstance(o, BaseException)]
+    return summarize(viewer_stats, subscriber_stats, query_stats, elapsed, failures, args)
+
+
+def summarize(viewer_stats, subscriber_stats, query_stats, elapsed, failures, args):
+    viewer_fps = [v['frames'] / elapsed for v in viewer_stats]
+    event_latencies = [ms for s in subscriber_stats for ms in s['event_latencies']]
+    ping_rtts = [ms for s in subscriber_stats for ms in s['ping_rtts']]
+    query_latencies = [q['latency_ms'] for q in query_stats if 200 <= q['status'] < 300]
+    return {
+        'settings': vars(args),
+        'duration_s': elapsed,
+        'viewers': {
+            'connected': len(viewer_stats),
+            'fps_mean': sum(viewer_fps) / len(viewer_fps) if viewer_fps else 0.0,
+            'fps_min': min(viewer_fps, default=0.0),
+            'total_fps': sum(viewer_fps),
+            'bytes_per_s': sum(v['bytes'] for v in viewer_stats) / elapsed,
+        },
+        'websocket': {
+            'connected': len(subscriber_stats),
+            'messages': sum(s['messages'] for s in subscriber_stats),
+            'new_drone_latency': latency_summary(event_latencies),
+            'ping_rtt': latency_summary(ping_rtts),
+        },
+        'queries': {
+            'sent': len(query_stats),
+            'errors': sum(1 for q in query_stats if not 200 <= q['status'] < 300),
+            'achieved_rate': len(query_stats) / elapsed,
+            'latency': latency_summary(query_latencies),
+        },
+        'client_failures': failures,
+    }
+
+
+def spawn_server(args):
+    """Start uvicorn on the backend with the demo clip as a looping fake camera"""
+    env = dict(os.environ, CAMERA_SOURCE=str(args.clip.resolve()))
+    port = urlsplit(args.url).port or 8000
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env
+    )
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with code {process.returncode}")
+        try:
+            # /health answers before the model has loaded; /ready waits for it
+            status, _ = asyncio.run(http_request(args.url.rstrip('/') + '/ready', timeout=2))
+            if status == 200:
+                break
+        except (OSError, asyncio.TimeoutError):
+            pass
+        time.sleep(0.5)
+    else:
+        process.terminate()
+        raise SystemExit("Server did not become ready in time")
+    status, body = asyncio.run(http_request(args.url.rstrip('/') + '/camera/start', method='POST'))
+    if status != 200:
+        print(f"Could not start the camera ({status}): {body[:200]!r}", file=sys.stderr)
+    # Let the pipeline warm up before measuring
+    time.sleep(args.warmup)
+    return process
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--viewers', type=int, default=5, help="Concurrent /video readers")
+    parser.add_argument('--subscribers', type=int, default=20, help="Concurrent /ws subscribers")
+    parser.add_argument('--query-rate', type=float, default=10.0, help="/detections queries per second")
+    parser.add_argument('--query-paths', nargs='+', default=['/detections/today', '/detections/?limit=100'])
+    parser.add_argument('--ping-interval', type=float, default=1.0, help="Seconds between WebSocket pings")
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--spawn-server', action='store_true', help="Start a server with a file-based fake camera")
+    parser.add_argument('--clip', type=Path, default=DEFAULT_CLIP, help="Fake camera clip for --spawn-server")
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    parser.add_argument('--warmup', type=float, default=5.0, help="Seconds between camera start and measuring")
+    parser.add_argument('--json', type=Path, help="Write full results to this file")
+    args = parser.parse_args(argv)
+
+    server = spawn_server(args) if args.spawn_server else None
+    try:
+        report = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    viewers, ws, queries = report['viewers'], report['websocket'], report['queries']
+    print(format_table([{
+        'viewers': viewers['connected'],
+        'fps/viewer': viewers['fps_mean'],
+        'min_fps': viewers['fps_min'],
+        'MB/s': viewers['bytes_per_s'] / 1e6,
+        'ws': ws['connected'],
+        'event_p99_ms': ws['new_drone_latency'].get('p99_ms'),
+        'ping_p99_ms': ws['ping_rtt'].get('p99_ms'),
+        'q/s': queries['achieved_rate'],
+        'q_p50_ms': queries['latency'].get('p50_ms'),
+        'q_p99_ms': queries['latency'].get('p99_ms'),
+        'q_err': queries['errors'],
+    }], ['viewers', 'fps/viewer', 'min_fps', 'MB/s', 'ws', 'event_p99_ms', 'ping_p99_ms',
+         'q/s', 'q_p50_ms', 'q_p99_ms', 'q_err']))
+    if report['client_failures']:
+        print(f"{len(report['client_failures'])} clients failed, first: {report['client_failures'][0]}",
+              file=sys.stderr)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
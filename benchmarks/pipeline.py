@@ -0,0 +1,345 @@
+"""Headless benchmark suite for the DroneTracker detection-tracking pipeline.
+
+Runs ``DroneTracker.process_frame`` over the demo clip and over synthetic
+clips with a chosen number of targets, with no camera, display or database,
+on CPU. Each scenario runs in a fresh subprocess so startup time and peak RSS
+are measured from a cold start and don't leak between scenarios. Reported
+per scenario:
+
+* startup: import of the pipeline (torch/ultralytics), tracker construction,
+  first frame
+* throughput: frames per second over the timed frames, decode included
+* per-stage latency percentiles (read, preprocess, infer, extract, track,
+  bookkeep, draw, publish, frame), taken from the pipeline's own trace spans
+* peak RSS, plus ID switches and distinct tracks for synthetic clips
+
+Results are written as JSON together with the commit and machine they came
+from, and two result files can be compared:
+
+    python benchmarks/pipeline.py --model backend/best.pt --json bench/$(git rev-parse --short HEAD).json
+    python benchmarks/pipeline.py --model backend/best.pt --targets 1 10 50 --oracle --no-clip
+    python benchmarks/pipeline.py --compare bench/base.json bench/head.json
+
+``--oracle`` replaces the detector with the synthetic clip's ground truth,
+isolating tracking, drawing and encoding cost from the model at any target
+count (YOLO still loads, so startup numbers stay comparable).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from common import (
+    DEFAULT_CLIP, REPO_ROOT, count_id_switches, format_table, latency_summary,
+    load_mot_ground_truth, write_mot_ground_truth, write_synthetic_clip
+)
+
+STAGES = ('read', 'preprocess', 'infer', 'extract', 'track', 'bookkeep', 'draw', 'publish', 'frame')
+RESULT_PREFIX = 'BENCHMARK_RESULT '
+
+
+class _HostArray:
+    """Just enough of a CPU tensor for ``process_detections``"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy = _HostArray(xyxy)
+        self.conf = _HostArray(conf)
+
+    def __len__(self):
+        return len(self.conf.array)
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class OracleDetector:
+    """Stands in for the YOLO model and returns the synthetic clip's ground-truth boxes"""
+
+    def __init__(self, ground_truth, preprocessor=None, confidence=0.9):
+        self.ground_truth = ground_truth
+        self.preprocessor = preprocessor
+        self.confidence = confidence
+        self.frame_index = 0
+
+    def __call__(self, source, **kwargs):
+        boxes = np.array([box for _, box in self.ground_truth.get(self.frame_index, [])],
+                         dtype=np.float32).reshape(-1, 4)
+        self.frame_index += 1
+        if not isinstance(source, np.ndarray) and self.preprocessor is not None:
+            # The tracker handed over the letterboxed tensor, answer in model space
+            scale, pad_x, pad_y = self.preprocessor.letterbox_transform
+            boxes = boxes * scale + np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+        return [_Result(_Boxes(boxes, np.full(len(boxes), self.confidence, dtype=np.float32)))]
+
+
+def run_worker(spec):
+    """Benchmark one scenario in this process and return its result"""
+    started = time.perf_counter()
+    from tracker import DroneTracker  # torch and ultralytics load here
+    imported = time.perf_counter()
+
+    from capture import open_capture
+    from memory import peak_rss_bytes
+    from tracing import TRACER
+
+    drone_tracker = DroneTracker(
+        spec['model'],
+        confidence_threshold=spec['conf'],
+        persist_detections=False,
+        tracker_backend=spec['tracker_backend'],
+        render_overlay=spec['render']
+    )
+    initialized = time.perf_counter()
+
+    ground_truth = load_mot_ground_truth(spec['labels']) if spec.get('labels') else None
+    if spec['oracle']:
+        drone_tracker.model = OracleDetector(ground_truth, drone_tracker.preprocessor)
+
+    cap = open_capture(spec['video'], backend=spec['capture_backend'], mode='throughput')
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video {spec['video']}")
+
+    TRACER.start(capacity=max(1000, (spec['max_frames'] or 20000) * 12))
+    hypotheses = {}
+    first_frame_s = None
+    timed_start = None
+    frame_index = 0
+    try:
+        while spec['max_frames'] is None or frame_index < spec['max_frames']:
+            if frame_index == spec['warmup']:
+                # Percentiles and throughput cover the frames after warm-up only
+                TRACER.clear()
+                timed_start = time.perf_counter()
+
+            read_started = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            TRACER.add('read', read_started, time.perf_counter())
+
+            _, tracks = drone_tracker.process_frame(frame)
+            if spec['render']:
+                # What the capture loop does for connected viewers
+                encode_started = time.perf_counter()
+                cv2.imencode('.jpg', drone_tracker.display_frame)
+                TRACER.add('publish', encode_started, time.perf_counter())
+
+            if first_frame_s is None:
+                first_frame_s = time.perf_counter() - initialized
+            hypotheses[frame_index] = [
+                (track.track_id, list(track.to_ltrb()))
+                for track in tracks
+                if track.is_confirmed() and track.time_since_update == 0
+            ]
+            frame_index += 1
+        finished = time.perf_counter()
+    finally:
+        cap.release()
+        TRACER.stop()
+
+    samples = {}
+    for name, span_start, span_end, _, _ in TRACER.snapshot():
+        samples.setdefault(name, []).append((span_end - span_start) * 1000)
+
+    timed_frames = frame_index - spec['warmup']
+    wall_s = finished - timed_start if timed_start is not None else 0.0
+    result = {
+        'scenario': spec['name'],
+        'frames': frame_index,
+        'timed_frames': max(timed_frames, 0),
+        'startup': {
+            'import_s': imported - started,
+            'init_s': initialized - imported,
+            'first_frame_s': first_frame_s,
+        },
+        'fps': timed_frames / wall_s if wall_s > 0 else None,
+        'stages': {name: latency_summary(samples[name]) for name in STAGES if name in samples},
+        'peak_rss_mb': peak_rss_bytes() / (1024 * 1024),
+        'unique_tracks': len({track_id for tracks in hypotheses.values() for track_id, _ in tracks}),
+    }
+    if ground_truth is not None:
+        result.update(count_id_switches(hypotheses, ground_truth))
+    return result
+
+
+def run_scenario(spec, threads=None):
+    """Run one scenario in a fresh interpreter and parse its result"""
+    env = dict(os.environ)
+    if threads:
+        for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            env[var] = str(threads)
+    completed = subprocess.run(
+        [sys.executable, __file__, '--worker', json.dumps(spec)],
+        env=env, capture_output=True, text=True
+    )
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result.update({key: spec[key] for key in ('video', 'targets', 'oracle', 'render') if key in spec})
+            return result
+    sys.stderr.write(completed.stderr)
+    raise RuntimeError(f"Scenario {spec['name']} failed (exit code {completed.returncode})")
+
+
+def environment_info():
+    """Where the numbers came from, so results from different commits can be compared"""
+    def git(*command):
+        try:
+            return subprocess.run(['git', *command], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def summary_rows(results):
+    rows = []
+    for r in results:
+        stages = r['stages']
+        rows.append({
+            'scenario': r['scenario'],
+            'fps': r['fps'],
+            'frame_p50': stages.get('frame', {}).get('p50_ms'),
+            'frame_p99': stages.get('frame', {}).get('p99_ms'),
+            'infer_p50': stages.get('infer', {}).get('p50_ms'),
+            'track_p50': stages.get('track', {}).get('p50_ms'),
+            'startup_s': sum(v for v in r['startup'].values() if v is not None),
+            'rss_mb': r['peak_rss_mb'],
+            'id_sw': r.get('id_switches'),
+        })
+    return rows
+
+
+def compare(baseline, current):
+    """Table of per-scenario changes between two result files (negative latency delta = faster)"""
+    base_by_name = {r['scenario']: r for r in baseline['scenarios']}
+    rows = []
+    for result in current['scenarios']:
+        base = base_by_name.get(result['scenario'])
+        if base is None:
+            continue
+        metrics = [('fps', base['fps'], result['fps']),
+                   ('peak_rss_mb', base['peak_rss_mb'], result['peak_rss_mb'])]
+        for stage in STAGES:
+            if stage in base['stages'] and stage in result['stages']:
+                for percentile in ('p50_ms', 'p99_ms'):
+                    metrics.append((f"{stage}.{percentile}", base['stages'][stage].get(percentile),
+                                    result['stages'][stage].get(percentile)))
+        for name, before, after in metrics:
+            delta = (after - before) / before * 100 if before and after is not None else None
+            rows.append({'scenario': result['scenario'], 'metric': name,
+                         'base': before, 'current': after, 'delta_%': delta})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', type=Path, default=Path('best.pt'))
+    parser.add_argument('--video', type=Path, default=DEFAULT_CLIP)
+    parser.add_argument('--no-clip', action='store_true', help="Skip the real clip, run only synthetic scenarios")
+    parser.add_argument('--targets', type=int, nargs='*', default=[], help="Synthetic scenarios to run (target counts)")
+    parser.add_argument('--synthetic-frames', type=int, default=300)
+    parser.add_argument('--synthetic-size', default='1280x720')
+    parser.add_argument('--oracle', action='store_true', help="Use ground truth instead of the model on synthetic clips")
+    parser.add_argument('--tracker-backend', default='deepsort')
+    parser.add_argument('--capture-backend', default='opencv')
+    parser.add_argument('--no-render', action='store_true', help="Skip overlay drawing and JPEG encoding")
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--max-frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--threads', type=int, help="Pin OMP/MKL thread counts for repeatable numbers")
+    parser.add_argument('--json', type=Path, help="Write results to this file")
+    parser.add_argument('--baseline', type=Path, help="Compare this run against an earlier results file")
+    parser.add_argument('--compare', type=Path, nargs=2, metavar=('BASE', 'CURRENT'),
+                        help="Only compare two existing results files")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(RESULT_PREFIX + json.dumps(run_worker(json.loads(args.worker))))
+        return 0
+
+    if args.compare:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        print(format_table(compare(baseline, current), ['scenario', 'metric', 'base', 'current', 'delta_%']))
+        return 0
+
+    if not args.model.exists():
+        parser.error(f"Model not found: {args.model}")
+
+    common_spec = {
+        'model': str(args.model.resolve()),
+        'conf': args.conf,
+        'tracker_backend': args.tracker_backend,
+        'capture_backend': args.capture_backend,
+        'render': not args.no_render,
+        'max_frames': args.max_frames,
+        'warmup': args.warmup,
+        'oracle': False,
+    }
+    results = []
+    with tempfile.TemporaryDirectory(prefix='drone-bench-') as work_dir:
+        specs = []
+        if not args.no_clip:
+            specs.append({**common_spec, 'name': 'clip', 'video': str(args.video.resolve())})
+        width, height = (int(v) for v in args.synthetic_size.lower().split('x'))
+        for targets in args.targets:
+            video = Path(work_dir) / f"synthetic_{targets}.mp4"
+            labels = Path(work_dir) / f"synthetic_{targets}_gt.txt"
+            ground_truth = write_synthetic_clip(video, targets, args.synthetic_frames, width, height)
+            write_mot_ground_truth(labels, ground_truth)
+            specs.append({**common_spec, 'name': f"synthetic-{targets}", 'video': str(video),
+                          'labels': str(labels), 'targets': targets, 'oracle': args.oracle})
+
+        for spec in specs:
+            print(f"Running {spec['name']}...", file=sys.stderr)
+            results.append(run_scenario(spec, args.threads))
+
+    report = {'environment': environment_info(), 'settings': vars(args), 'scenarios': results}
+    print(format_table(summary_rows(results), ['scenario', 'fps', 'frame_p50', 'frame_p99', 'infer_p50',
+                                               'track_p50', 'startup_s', 'rss_mb', 'id_sw']))
+
+    if args.baseline:
+        print()
+        print(format_table(compare(json.loads(args.baseline.read_text()), report),
+                           ['scenario', 'metric', 'base', 'current', 'delta_%']))
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(report, indent=2, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
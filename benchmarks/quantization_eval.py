@@ -0,0 +1,142 @@
+"""Accuracy-vs-speed evaluation of FP32 / FP16 / INT8 variants of the drone model.
+
+Each variant is run through ``DroneTracker.process_frame`` - the same
+detection, DeepSORT and annotation path the live camera uses - over a
+labeled clip, and the results are reported side by side:
+
+    python benchmarks/quantization_eval.py --model backend/best.pt \\
+        --video V_DRONE_FIRST_4_MIN.mp4 --labels gt.txt --json results.json
+
+Labels use the MOTChallenge ``gt.txt`` format (frame, id, left, top, width,
+height, ...) so one file provides both boxes for mAP and identities for
+counting ID switches. Without ``--labels`` only latency is reported.
+
+Variants:
+  fp32  the original ``.pt`` weights
+  fp16  the same weights with half-precision inference; this only differs
+        from fp32 on CUDA, ultralytics silently runs FP32 on CPU
+  int8  ONNX export with dynamic INT8 weight quantization (onnxruntime)
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+from common import (
+    DEFAULT_CLIP, count_id_switches, format_table, latency_summary,
+    load_mot_ground_truth, mean_average_precision, run_pipeline
+)
+
+from artifact_cache import ArtifactCache
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = ('fp32', 'fp16', 'int8')
+
+
+def export_int8(model_path: Path, work_dir: Path, imgsz: int):
+    """ONNX export with dynamic INT8 weight quantization, cached under ``work_dir``"""
+    try:
+        return Path(ArtifactCache(work_dir).resolve(model_path, 'int8', imgsz))
+    except ImportError:
+        logger.warning("onnx/onnxruntime not installed, skipping the int8 variant")
+        return None
+
+
+def build_variants(model_path: Path, work_dir: Path, imgsz: int, selected):
+    """Return {name: (model_path, inference_kwargs)} for the requested variants"""
+    variants = {}
+    if 'fp32' in selected:
+        variants['fp32'] = (model_path, {})
+    if 'fp16' in selected:
+        variants['fp16'] = (model_path, {'half': True})
+    if 'int8' in selected:
+        int8_path = export_int8(model_path, work_dir, imgsz)
+        if int8_path:
+            variants['int8'] = (int8_path, {})
+    return variants
+
+
+def evaluate_variant(model_path: Path, inference_kwargs: dict, args, ground_truth):
+    """Run one model variant through the DroneTracker pipeline and score it"""
+    from tracker import DroneTracker
+
+    tracker = DroneTracker(
+        str(model_path),
+        confidence_threshold=args.conf,
+        inference_kwargs=inference_kwargs,
+        persist_detections=False,
+        # The tracker letterboxes to this size itself; the int8 export expects exactly it
+        input_size=args.imgsz
+    )
+
+    predictions, hypotheses, latencies, frame_count = run_pipeline(
+        tracker, args.video, max_frames=args.max_frames, warmup=args.warmup
+    )
+
+    result = {
+        'model': str(model_path),
+        'model_mb': model_path.stat().st_size / 1e6,
+        'frames': frame_count,
+        'latency': latency_summary(latencies),
+    }
+    if latencies:
+        result['fps'] = 1000.0 / result['latency']['mean_ms']
+    if ground_truth is not None:
+        result.update(mean_average_precision(predictions, ground_truth))
+        result.update(count_id_switches(hypotheses, ground_truth))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', type=Path, default=Path('best.pt'), help="FP32 weights to derive variants from")
+    parser.add_argument('--video', type=Path, default=DEFAULT_CLIP, help="Clip to evaluate on")
+    parser.add_argument('--labels', type=Path, help="MOTChallenge gt.txt for the clip")
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--conf', type=float, default=0.5, help="Pipeline confidence threshold")
+    parser.add_argument('--imgsz', type=int, default=640, help="Inference size, also used for the ONNX export")
+    parser.add_argument('--max-frames', type=int, help="Stop after this many frames")
+    parser.add_argument('--warmup', type=int, default=5, help="Frames excluded from latency statistics")
+    parser.add_argument('--work-dir', type=Path, default=Path('quantization_artifacts'))
+    parser.add_argument('--json', type=Path, help="Write full results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.model.exists():
+        parser.error(f"Model not found: {args.model}")
+    args.work_dir.mkdir(parents=True, exist_ok=True)
+
+    ground_truth = load_mot_ground_truth(args.labels) if args.labels else None
+    variants = build_variants(args.model, args.work_dir, args.imgsz, args.variants)
+
+    results = {}
+    for name, (model_path, inference_kwargs) in variants.items():
+        logger.info(f"Evaluating {name} ({model_path})")
+        results[name] = evaluate_variant(model_path, inference_kwargs, args, ground_truth)
+
+    rows = []
+    for name, result in results.items():
+        latency = result['latency']
+        rows.append({
+            'variant': name,
+            'size_mb': result['model_mb'],
+            'map50': result.get('map50'),
+            'map50_95': result.get('map50_95'),
+            'id_sw': result.get('id_switches'),
+            'p50_ms': latency.get('p50_ms'),
+            'p90_ms': latency.get('p90_ms'),
+            'p99_ms': latency.get('p99_ms'),
+            'fps': result.get('fps'),
+        })
+    print(format_table(rows, ['variant', 'size_mb', 'map50', 'map50_95', 'id_sw',
+                              'p50_ms', 'p90_ms', 'p99_ms', 'fps']))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Tune tracker parameters by replaying a recorded detection log.
+
+The live pipeline records raw per-frame detections (and DeepSORT
+embeddings) when ``DETECTION_LOG_DIR`` is set; a recording of a clip is
+made by pointing ``CAMERA_SOURCE`` at the file. This tool feeds such a log
+into fresh trackers as fast as they go - no camera, model or decoding - for
+every combination of the given parameters, spread over a process pool, and
+reports per configuration:
+
+* with MOTChallenge labels (frames numbered as in the log): CLEAR-MOT ID
+  switches and fragmentations
+* always: confirmed tracks, short-lived tracks and re-links (a new track
+  starting within ``--relink-frames`` of where another one ended), a
+  label-free estimate of identity breaks
+
+    python benchmarks/replay_tracking.py data/logs/20260101-120000.dlog \\
+        --max-age 5 10 20 --n-init 2 3 --max-cosine-distance 0.2 0.4 --conf 0.4 0.5
+
+DeepSORT replays need a log recorded with embeddings; the motion-only
+backend replays any log. The best configuration is printed as the
+environment variables ``main.py`` reads.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from common import count_fragmentations, count_id_switches, format_table, load_mot_ground_truth
+
+PARAM_ENV = {
+    'max_age': 'TRACKER_MAX_AGE',
+    'n_init': 'TRACKER_N_INIT',
+    'max_cosine_distance': 'DEEPSORT_MAX_COSINE_DISTANCE',
+    'iou_threshold': 'SORT_IOU_THRESHOLD',
+}
+
+_loaded_logs = {}  # per worker process, so a worker reads each log once
+
+
+def _load_log(path):
+    from detection_log import read_detection_log
+
+    if path not in _loaded_logs:
+        _loaded_logs[path] = read_detection_log(path)
+    return _loaded_logs[path]
+
+
+def replay(spec):
+    """Run one tracker configuration over a log; returns its hypotheses and timing"""
+    from tracker_config import create_tracker, detections_from_boxes
+
+    _, frames = _load_log(spec['log'])
+    tracker = create_tracker(spec['backend'], spec['conf'], spec['nn_budget'], spec['params'], embedder=None)
+    hypotheses = {}
+    started = time.perf_counter()
+    for frame_index, (_, boxes, embeds) in enumerate(frames):
+        detections, keep = detections_from_boxes(boxes, spec['conf'])
+        if spec['backend'] == 'deepsort':
+            if detections and embeds is None:
+                raise ValueError(f"{spec['log']} has no embeddings, replay it with --backend sort")
+            embeds = [e.astype(np.float32) for e in embeds[keep]] if detections else []
+            tracks = tracker.update_tracks(detections, embeds=embeds)
+        else:
+            tracks = tracker.update_tracks(detections)
+        hypotheses[frame_index] = [
+            (track.track_id, list(track.to_ltrb()))
+            for track in tracks
+            if track.is_confirmed() and track.time_since_update == 0
+        ]
+    elapsed = time.perf_counter() - started
+    return hypotheses, len(frames), elapsed
+
+
+def track_continuity(hypotheses, relink_frames, short_frames):
+    """Label-free track statistics: tracks, short tracks and re-links"""
+    spans = {}  # track_id -> [first frame, last frame, first box, last box]
+    for frame_index in sorted(hypotheses):
+        for track_id, box in hypotheses[frame_index]:
+            span = spans.setdefault(track_id, [frame_index, frame_index, box, box])
+            span[1], span[3] = frame_index, box
+
+    relinks = 0
+    ended = sorted((span[1], span[3]) for span in spans.values())
+    for first, _, box, _ in spans.values():
+        center = np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2])
+        size = max(box[2] - box[0], box[3] - box[1], 1.0)
+        for last, last_box in ended:
+            if last >= first:
+                break
+            if first - last > relink_frames:
+                continue
+            last_center = np.array([(last_box[0] + last_box[2]) / 2, (last_box[1] + last_box[3]) / 2])
+            if np.linalg.norm(center - last_center) <= 2 * size:
+                relinks += 1
+                break
+    return {
+        'tracks': len(spans),
+        'short_tracks': sum(1 for first, last, _, _ in spans.values() if last - first + 1 < short_frames),
+        'relinks': relinks,
+    }
+
+
+def evaluate(spec):
+    """Pool task: replay one configuration and score it"""
+    hypotheses, frames, elapsed = replay(spec)
+    result = {
+        'backend': spec['backend'],
+        'conf': spec['conf'],
+        **spec['params'],
+        'frames': frames,
+        'replay_fps': frames / elapsed if elapsed else None,
+    }
+    result.update(track_continuity(hypotheses, spec['relink_frames'], spec['short_frames']))
+    if spec.get('labels'):
+        ground_truth = load_mot_ground_truth(spec['labels'])
+        result.update(count_id_switches(hypotheses, ground_truth))
+        result.update(count_fragmentations(hypotheses, ground_truth))
+    return result
+
+
+def _init_worker():
+    # One core per configuration; the pool provides the parallelism
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def build_specs(args):
+    grid = {
+        'max_age': args.max_age,
+        'n_init': args.n_init,
+        'max_cosine_distance': args.max_cosine_distance if args.backend == 'deepsort' else [None],
+        'iou_threshold': args.iou_threshold if args.backend == 'sort' else [None],
+    }
+    names = list(grid)
+    specs = []
+    for log in args.logs:
+        for conf, values in itertools.product(args.conf, itertools.product(*grid.values())):
+            params = {name: value for name, value in zip(names, values) if value is not None}
+            specs.append({
+                'log': str(log.resolve()),
+                'labels': str(args.labels.resolve()) if args.labels else None,
+                'backend': args.backend,
+                'conf': conf,
+                'nn_budget': args.nn_budget,
+                'params': params,
+                'relink_frames': args.relink_frames,
+                'short_frames': args.short_frames,
+            })
+    return specs
+
+
+def main(argv=None):
+    from tracker_config import DEFAULT_TRACKER_PARAMS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('logs', type=Path, nargs='+', help="Detection logs (.dlog) to replay")
+    parser.add_argument('--labels', type=Path, help="MOTChallenge gt.txt aligned with the log's frames")
+    parser.add_argument('--backend', choices=('deepsort', 'sort'), default='deepsort')
+    parser.add_argument('--conf', type=float, nargs='+', default=[0.5], help="Confidence thresholds")
+    parser.add_argument('--max-age', type=int, nargs='+', default=[DEFAULT_TRACKER_PARAMS['max_age']])
+    parser.add_argument('--n-init', type=int, nargs='+', default=[DEFAULT_TRACKER_PARAMS['n_init']])
+    parser.add_argument('--max-cosine-distance', type=float, nargs='+',
+                        default=[DEFAULT_TRACKER_PARAMS['max_cosine_distance']])
+    parser.add_argument('--iou-threshold', type=float, nargs='+', default=[DEFAULT_TRACKER_PARAMS['iou_threshold']])
+    parser.add_argument('--nn-budget', type=int, default=100)
+    parser.add_argument('--relink-frames', type=int, default=30, help="Max gap for a new track to count as a re-link")
+    parser.add_argument('--short-frames', type=int, default=10, help="Tracks shorter than this count as short")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="Configurations replayed in parallel")
+    parser.add_argument('--json', type=Path, help="Write full results to this file")
+    args = parser.parse_args(argv)
+
+    specs = build_specs(args)
+    print(f"Replaying {len(specs)} configurations on {min(args.jobs, len(specs))} processes", file=sys.stderr)
+    started = time.perf_counter()
+    # Spawned workers start with clean thread pools instead of a fork of this one
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker) as pool:
+        results = list(pool.map(evaluate, specs))
+    elapsed = time.perf_counter() - started
+
+    # Fewest identity breaks first: labelled metrics when available, else re-links
+    if args.labels:
+        results.sort(key=lambda r: (r['id_switches'] + r['fragmentations'], r['tracks']))
+    else:
+        results.sort(key=lambda r: (r['relinks'], r['short_tracks'], r['tracks']))
+    param_columns = [name for name in PARAM_ENV if any(name in r for r in results)]
+    metric_columns = ['id_switches', 'fragmentations'] if args.labels else []
+    print(format_table(results, ['backend', 'conf', *param_columns, *metric_columns,
+                                 'relinks', 'short_tracks', 'tracks', 'replay_fps']))
+    print(f"\n{len(specs)} replays in {elapsed:.1f}s", file=sys.stderr)
+
+    best = results[0]
+    print("\nBest configuration:")
+    for name in param_columns:
+        print(f"  {PARAM_ENV[name]}={best[name]}")
+    print(f"  (confidence threshold {best['conf']})")
+
+    if args.json:
+        args.json.write_text(json.dumps({'settings': vars(args), 'results': results}, indent=2, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
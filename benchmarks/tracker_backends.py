@@ -0,0 +1,117 @@
+"""Compare tracker backends (DeepSORT, budgeted DeepSORT, motion-only SORT) on a clip.
+
+Every configuration runs the full ``DroneTracker.process_frame`` pipeline
+so the FPS numbers include detection; the tracker's own update time is
+measured separately. With MOTChallenge labels the ID switches are counted,
+otherwise the number of distinct confirmed track IDs is a rough proxy
+(fewer is better for the same footage).
+
+    python benchmarks/tracker_backends.py --model backend/best.pt --labels gt.txt
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+from common import (
+    DEFAULT_CLIP, count_id_switches, format_table, latency_summary,
+    load_mot_ground_truth, run_pipeline
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TimedTracker:
+    """Wraps a tracker backend and records how long each update_tracks call takes"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.samples_ms = []
+
+    def update_tracks(self, *args, **kwargs):
+        start = time.perf_counter()
+        tracks = self.backend.update_tracks(*args, **kwargs)
+        self.samples_ms.append((time.perf_counter() - start) * 1000)
+        return tracks
+
+
+def benchmark_backend(name, tracker_backend, nn_budget, args, ground_truth):
+    """Run the pipeline with one tracker configuration"""
+    from tracker import DroneTracker
+
+    drone_tracker = DroneTracker(
+        str(args.model),
+        confidence_threshold=args.conf,
+        persist_detections=False,
+        tracker_backend=tracker_backend,
+        nn_budget=nn_budget
+    )
+    timed = TimedTracker(drone_tracker.tracker)
+    drone_tracker.tracker = timed
+
+    _, hypotheses, latencies, frame_count = run_pipeline(
+        drone_tracker, args.video, max_frames=args.max_frames, warmup=args.warmup
+    )
+
+    result = {
+        'backend': name,
+        'frames': frame_count,
+        'pipeline': latency_summary(latencies),
+        'tracker_update': latency_summary(timed.samples_ms[args.warmup:]),
+        'unique_tracks': len({track_id for tracks in hypotheses.values() for track_id, _ in tracks}),
+    }
+    if latencies:
+        result['fps'] = 1000.0 / result['pipeline']['mean_ms']
+    if ground_truth is not None:
+        result.update(count_id_switches(hypotheses, ground_truth))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', type=Path, default=Path('best.pt'))
+    parser.add_argument('--video', type=Path, default=DEFAULT_CLIP)
+    parser.add_argument('--labels', type=Path, help="MOTChallenge gt.txt for the clip")
+    parser.add_argument('--conf', type=float, default=0.5)
+    parser.add_argument('--nn-budget', type=int, default=100, help="Budget for the bounded DeepSORT run")
+    parser.add_argument('--max-frames', type=int)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--json', type=Path, help="Write full results to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.model.exists():
+        parser.error(f"Model not found: {args.model}")
+
+    ground_truth = load_mot_ground_truth(args.labels) if args.labels else None
+    configurations = [
+        ('deepsort-unbounded', 'deepsort', None),
+        (f'deepsort-budget{args.nn_budget}', 'deepsort', args.nn_budget),
+        ('sort', 'sort', None),
+    ]
+
+    results = []
+    for name, tracker_backend, nn_budget in configurations:
+        logger.info(f"Benchmarking {name}")
+        results.append(benchmark_backend(name, tracker_backend, nn_budget, args, ground_truth))
+
+    rows = [{
+        'backend': r['backend'],
+        'fps': r.get('fps'),
+        'p99_ms': r['pipeline'].get('p99_ms'),
+        'track_ms': r['tracker_update'].get('mean_ms'),
+        'track_p99_ms': r['tracker_update'].get('p99_ms'),
+        'id_sw': r.get('id_switches'),
+        'tracks': r['unique_tracks'],
+    } for r in results]
+    print(format_table(rows, ['backend', 'fps', 'p99_ms', 'track_ms', 'track_p99_ms', 'id_sw', 'tracks']))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,13 +21,17 @@ import {
   Refresh,
   Delete,
   LocationOn,
+  PlayCircle,
   Schedule
 } from '@mui/icons-material'
 import { format, parseISO, differenceInMinutes } from 'date-fns'
+import { getDetectionVideoUrl, getThumbnailUrl } from '../services/api'
 
 const DetectionTable = ({ detections, loading, onRefresh, onDeleteDetection }) => {
   const [page, setPage] = useState(0)
   const [rowsPerPage, setRowsPerPage] = useState(10)
+  // Thumbnails that failed to load (e.g. evicted from the server's cache) show the placeholder
+  const [brokenThumbnails, setBrokenThumbnails] = useState(() => new Set())
   const [orderBy, setOrderBy] = useState('start_time')
   const [order, setOrder] = useState('desc')
 
@@ -150,6 +154,8 @@ const DetectionTable = ({ detections, loading, onRefresh, onDeleteDetection }) =
             <Table stickyHeader>
               <TableHead>
                 <TableRow>
+                  <TableCell>Thumbnail</TableCell>
+                  
                   <TableCell>
                     <TableSortLabel
                       active={orderBy === 'daily_id'}
@@ -195,6 +201,23 @@ const DetectionTable = ({ detections, loading, onRefresh, onDeleteDetection }) =
                     hover
                     sx={{ '&:nth-of-type(odd)': { backgroundColor: 'action.hover' } }}
                   >
+                    <TableCell>
+                      {detection.thumbnail && !brokenThumbnails.has(detection.thumbnail) ? (
+                        <Box
+                          component="img"
+                          src={getThumbnailUrl(detection.thumbnail)}
+                          alt={`Drone #${detection.daily_id}`}
+                          loading="lazy"
+                          onError={() => setBrokenThumbnails((broken) => new Set(broken).add(detection.thumbnail))}
+                          sx={{ width: 64, height: 64, objectFit: 'cover', borderRadius: 1, display: 'block' }}
+                        />
+                      ) : (
+                        <Typography variant="caption" color="text.secondary">
+                          —
+                        </Typography>
+                      )}
+                    </TableCell>
+                    
                     <TableCell>
                       <Chip
                         label={`#${detection.daily_id}`}
@@ -253,6 +276,17 @@ const DetectionTable = ({ detections, loading, onRefresh, onDeleteDetection }) =
                     </TableCell>
                     
                     <TableCell>
+                      <Tooltip title="Play archived video">
+                        <IconButton
+                          size="small"
+                          href={getDetectionVideoUrl(detection.id)}
+                          target="_blank"
+                          rel="noopener noreferrer"
+                          color="primary"
+                        >
+                          <PlayCircle fontSize="small" />
+                        </IconButton>
+                      </Tooltip>
                       {onDeleteDetection && (
                         <Tooltip title="Delete detection">
                           <IconButton
@@ -117,6 +117,16 @@ export const getVideoStreamUrl = () => {
   return `${API_BASE_URL}${API_ENDPOINTS.VIDEO}`
 }
 
+// Utility function to get the archived video of a detection (MJPEG)
+export const getDetectionVideoUrl = (detectionId) => {
+  return `${API_BASE_URL}${API_ENDPOINTS.DETECTION_VIDEO.replace(':id', detectionId)}`
+}
+
+// Utility function to get the URL of a detection thumbnail by its key
+export const getThumbnailUrl = (key) => {
+  return `${API_BASE_URL}${API_ENDPOINTS.THUMBNAIL.replace(':key', key)}`
+}
+
 // Utility function to get WebSocket URL
 export const getWebSocketUrl = () => {
   const wsProtocol = API_BASE_URL.startsWith('https') ? 'wss' : 'ws'
@@ -9,6 +9,8 @@ export const API_ENDPOINTS = {
   CAMERA_STATUS: '/camera/status',
   DETECTIONS_TODAY: '/detections/today',
   DETECTIONS_ALL: '/detections',
+  DETECTION_VIDEO: '/detections/:id/video',
+  THUMBNAIL: '/thumbnails/:key',
   WEBSOCKET: '/ws',
   HEALTH: '/health'
 }